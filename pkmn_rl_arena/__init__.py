@@ -5,4 +5,10 @@ ROM_PATH = os.path.join(BASE_DIR, "../pokeemerald_ai_rl/pokeemerald_modern.elf")
 BIOS_PATH = os.path.join(BASE_DIR, "../rustboyadvance-ng-for-rl/gba_bios.bin")
 MAP_PATH = os.path.join(BASE_DIR, "../pokeemerald_ai_rl/pokeemerald_modern.map")
 POKEMON_CSV_PATH = os.path.join(BASE_DIR, "../data/csv_data/pokemon_data.csv")
-SAVE_PATH = os.path.join(BASE_DIR, "../savestate")
\ No newline at end of file
+MOVES_CSV_PATH = os.path.join(BASE_DIR, "../data/csv_data/moves_data.csv")
+SAVE_PATH = os.path.join(BASE_DIR, "../savestate")
+
+import logging
+
+# Library is silent unless the application configures logging
+logging.getLogger(__name__).addHandler(logging.NullHandler())
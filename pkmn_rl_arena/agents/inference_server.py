@@ -0,0 +1,377 @@
+"""
+Batched policy inference in one server process shared by many env workers.
+
+    server = InferenceServer(load_model, num_slots=64, max_batch=64)
+    pool = ForkServer()
+    pool.spawn(run_episodes, 64, args=(server.clients(),))
+    ...
+    server.close()
+
+    def run_episodes(core, worker_id, clients):
+        policy = clients[worker_id]  # policy(core, agent, legal_actions)
+        ...
+
+The server process calls policy_factory() once and owns the only copy of
+the model. Every worker owns one slot of a shared memory block holding its
+observation, legal action mask, chosen action and status. A request writes
+the slot, releases a semaphore shared by all slots and waits on the slot's
+event, so no observation goes through a pipe. The server wakes on the first
+request, keeps collecting requests for at most max_latency seconds or
+until max_batch are pending, runs the policy once on the whole batch and
+writes the actions back.
+
+If policy_factory() raises or the server stops, every slot is marked
+failed and its waiting client raises. Clients waiting on a request also
+check every POLL_INTERVAL that the server process still runs, so a killed
+server makes act() raise instead of hanging.
+
+A batch policy is called as policy(obs, masks) -> actions with obs of shape
+(B, *obs_shape), masks (B, num_actions) bool and actions (B,) integers.
+"""
+
+from pkmn_rl_arena.data.pokemon_data import MON_FEATURE_SIZE, TEAM_SIZE
+from pkmn_rl_arena.data.trajectory import NUM_ACTIONS
+
+import logging
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BatchPolicy = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+# Own team then opponent team, encoded by ObservationManager
+DEFAULT_OBS_SHAPE = (2, TEAM_SIZE, MON_FEATURE_SIZE)
+
+# Slot status
+IDLE, PENDING, DONE, FAILED = 0, 1, 2, 3
+
+# Server state
+STARTING, RUNNING, STOPPED = 0, 1, 2
+
+# Seconds between two stop checks of an idle server
+POLL_INTERVAL = 0.1
+
+OPPONENT = {"player": "enemy", "enemy": "player"}
+
+
+class SlotLayout:
+    """Numpy views of the slot arrays laid out in one shared memory buffer"""
+
+    def __init__(
+        self,
+        num_slots: int,
+        obs_shape: Tuple[int, ...],
+        obs_dtype: np.dtype,
+        num_actions: int,
+    ):
+        self.num_slots = num_slots
+        self.obs_shape = tuple(obs_shape)
+        self.obs_dtype = np.dtype(obs_dtype)
+        self.num_actions = num_actions
+        self.fields = [
+            ("obs", (num_slots, *self.obs_shape), self.obs_dtype),
+            ("masks", (num_slots, num_actions), np.dtype(bool)),
+            ("actions", (num_slots,), np.dtype(np.int64)),
+            ("status", (num_slots,), np.dtype(np.uint8)),
+        ]
+
+    @property
+    def nbytes(self) -> int:
+        offset = 0
+        for _, shape, dtype in self.fields:
+            offset = _align(offset, dtype.itemsize)
+            offset += int(np.prod(shape)) * dtype.itemsize
+        return offset
+
+    def views(self, buffer) -> Dict[str, np.ndarray]:
+        """Map every field onto buffer"""
+        views = {}
+        offset = 0
+        for name, shape, dtype in self.fields:
+            offset = _align(offset, dtype.itemsize)
+            views[name] = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            offset += views[name].nbytes
+        return views
+
+
+def _align(offset: int, alignment: int) -> int:
+    return -(-offset // alignment) * alignment
+
+
+class InferenceClient:
+    """
+    Handle on one slot of an InferenceServer, used from a single worker.
+
+    Also a policy(core, agent, legal_actions) -> action callable for the
+    default observation layout, so it plugs into env/evaluation.py and the
+    generate CLI.
+    """
+
+    def __init__(
+        self,
+        slot: int,
+        shm_name: str,
+        layout: SlotLayout,
+        requests,
+        ready,
+        state,
+        server_pid: int,
+        timeout: Optional[float] = None,
+    ):
+        self.slot = slot
+        self.shm_name = shm_name
+        self.layout = layout
+        self.requests = requests
+        self.ready = ready
+        self.state = state
+        self.server_pid = server_pid
+        self.timeout = timeout
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._views: Optional[Dict[str, np.ndarray]] = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_shm"] = state["_views"] = None
+        return state
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        if self._views is None:
+            self._shm = shared_memory.SharedMemory(name=self.shm_name)
+            self._views = self.layout.views(self._shm.buf)
+        return self._views
+
+    def server_alive(self) -> bool:
+        """False once the server stopped or its process is gone"""
+        if self.state.value == STOPPED:
+            return False
+        try:
+            os.kill(self.server_pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def act(self, obs: np.ndarray, mask, timeout: Optional[float] = None) -> int:
+        """
+        Submit one observation and legal action mask, wait for the action.
+
+        Args:
+            obs: Observation of obs_shape
+            mask: Legal action mask
+            timeout: Seconds to wait for the action, defaults to the client
+                timeout, None waits as long as the server runs
+
+        Raises:
+            RuntimeError: The policy failed or the server is not running
+            TimeoutError: No action within timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+        arrays = self._arrays()
+        slot = self.slot
+        arrays["obs"][slot] = obs
+        arrays["masks"][slot] = mask
+        self.ready.clear()
+        arrays["status"][slot] = PENDING
+        self.requests.release()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.ready.wait(POLL_INTERVAL):
+            if not self.server_alive():
+                arrays["status"][slot] = IDLE
+                raise RuntimeError(f"Inference server is not running (slot {slot})")
+            if deadline is not None and time.monotonic() > deadline:
+                arrays["status"][slot] = IDLE
+                raise TimeoutError(f"No action for slot {slot} after {timeout}s")
+        status = arrays["status"][slot]
+        arrays["status"][slot] = IDLE
+        if status != DONE:
+            raise RuntimeError(f"Inference failed for slot {slot}")
+        return int(arrays["actions"][slot])
+
+    def __call__(self, core, agent: str, legal_actions: List[int]) -> int:
+        encoded = core.observation_manager.get_encoded_observations()
+        obs = np.stack([encoded[agent], encoded[OPPONENT[agent]]])
+        return self.act(obs, core.action_manager.get_legal_action_mask(agent))
+
+
+class InferenceServer:
+    """
+    Policy server process batching the requests of many workers, see the
+    module doc.
+    """
+
+    def __init__(
+        self,
+        policy_factory: Callable[[], BatchPolicy],
+        num_slots: int,
+        max_batch: Optional[int] = None,
+        max_latency: float = 0.002,
+        obs_shape: Tuple[int, ...] = DEFAULT_OBS_SHAPE,
+        obs_dtype=np.float32,
+        num_actions: int = NUM_ACTIONS,
+        ctx: Optional[Any] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Args:
+            policy_factory: Builds the batch policy in the server process,
+                must be picklable if ctx does not fork
+            num_slots: Number of clients, one per worker
+            max_batch: Largest batch passed to the policy, defaults to
+                num_slots
+            max_latency: Seconds the server waits for more requests after
+                the first one of a batch
+            obs_shape: Shape of one observation
+            obs_dtype: Dtype of the observations
+            num_actions: Size of the action masks
+            ctx: Multiprocessing context, defaults to "fork" like ForkServer
+            timeout: Default seconds a client waits for an action, None
+                waits as long as the server runs
+        """
+        self.ctx = ctx or multiprocessing.get_context("fork")
+        self.num_slots = num_slots
+        self.max_batch = max_batch or num_slots
+        self.max_latency = max_latency
+        self.timeout = timeout
+        self.layout = SlotLayout(num_slots, obs_shape, obs_dtype, num_actions)
+        self.shm = shared_memory.SharedMemory(create=True, size=self.layout.nbytes)
+        self.arrays = self.layout.views(self.shm.buf)
+        self.arrays["status"][:] = IDLE
+
+        self.requests = self.ctx.Semaphore(0)
+        self.ready = [self.ctx.Event() for _ in range(num_slots)]
+        self.stop = self.ctx.Event()
+        self.state = self.ctx.Value("b", STARTING, lock=False)
+        self.process = self.ctx.Process(
+            target=_serve,
+            args=(
+                policy_factory,
+                self.shm.name,
+                self.layout,
+                self.requests,
+                self.ready,
+                self.stop,
+                self.state,
+                self.max_batch,
+                max_latency,
+            ),
+            name="pkmn-inference-server",
+            daemon=True,
+        )
+        self.process.start()
+
+    def client(self, slot: int) -> InferenceClient:
+        """Client of one slot, pass it to the worker using it"""
+        if not 0 <= slot < self.num_slots:
+            raise IndexError(f"Slot {slot} out of range [0, {self.num_slots})")
+        return InferenceClient(
+            slot,
+            self.shm.name,
+            self.layout,
+            self.requests,
+            self.ready[slot],
+            self.state,
+            self.process.pid,
+            self.timeout,
+        )
+
+    def clients(self) -> List[InferenceClient]:
+        """One client per slot"""
+        return [self.client(slot) for slot in range(self.num_slots)]
+
+    def close(self):
+        """Stop the server process and free the shared memory"""
+        if self.process is not None:
+            self.stop.set()
+            self.requests.release()
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+        if self.shm is not None:
+            self.arrays = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def __enter__(self) -> "InferenceServer":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _collect(requests, max_batch: int, max_latency: float) -> bool:
+    """
+    Block until a request arrives, then take more until max_batch or the
+    latency window ends. Returns False if nothing arrived before the poll
+    interval.
+    """
+    if not requests.acquire(timeout=POLL_INTERVAL):
+        return False
+    taken = 1
+    deadline = time.perf_counter() + max_latency
+    while taken < max_batch:
+        remaining = deadline - time.perf_counter()
+        if not requests.acquire(timeout=max(remaining, 0.0)):
+            break
+        taken += 1
+    return True
+
+
+def _serve(
+    policy_factory: Callable[[], BatchPolicy],
+    shm_name: str,
+    layout: SlotLayout,
+    requests,
+    ready,
+    stop,
+    state,
+    max_batch: int,
+    max_latency: float,
+):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    arrays = layout.views(shm.buf)
+    obs, masks, actions, status = (
+        arrays["obs"],
+        arrays["masks"],
+        arrays["actions"],
+        arrays["status"],
+    )
+    try:
+        try:
+            policy = policy_factory()
+        except Exception:
+            logger.exception("Inference server failed to build its policy")
+            return
+        state.value = RUNNING
+        while not stop.is_set():
+            if not _collect(requests, max_batch, max_latency):
+                continue
+            # Slots marked pending before their release was taken are served
+            # now, their token only causes an extra empty wakeup later
+            slots = np.flatnonzero(status == PENDING)[:max_batch]
+            if not len(slots):
+                continue
+            try:
+                actions[slots] = policy(obs[slots], masks[slots])
+                status[slots] = DONE
+            except Exception:
+                logger.exception("Policy failed on a batch of %d", len(slots))
+                status[slots] = FAILED
+            for slot in slots:
+                ready[slot].set()
+    finally:
+        # Fail the waiting clients, later requests see the stopped state
+        state.value = STOPPED
+        status[:] = FAILED
+        for event in ready:
+            event.set()
+        del obs, masks, actions, status, arrays
+        shm.close()
@@ -0,0 +1,292 @@
+"""
+Simultaneous move Monte Carlo tree search on emulator snapshots.
+
+    with EmulatorPool(8) as pool:
+        agent = MCTSAgent(pool, simulations=256)
+        action = agent(core, "enemy", core.action_manager.get_legal_actions("enemy"))
+
+The agent is a policy callable (core, agent, legal_actions) -> action, so it
+plugs into env/evaluation.py and the generate CLI.
+
+Selection is decoupled UCT: at GENERAL turns each side picks its own action
+with UCB1 on its own statistics and the pair leads to the child, at PLAYER
+and ENEMY turns only the acting side picks. Leaves are expanded in batches
+of one per pool worker: the worker restores the parent snapshot, plays the
+pair, snapshots the child, then plays random legal actions for
+rollout_depth turns and returns an HP based value. Virtual loss spreads a
+batch over different leaves. The tree below the state actually reached is
+kept for the next decision.
+"""
+
+from pkmn_rl_arena.data.pokemon_data import (
+    CURRENT_HP_OFFSET,
+    ID_OFFSET,
+    MAX_HP_OFFSET,
+    MON_DUMP_SIZE,
+    TEAM_SIZE,
+    is_team_defeated,
+)
+from pkmn_rl_arena.env.emulator_pool import EmulatorPool
+from pkmn_rl_arena.env.save_state import Snapshot
+
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+AGENTS = ("player", "enemy")
+
+# (player action, enemy action), None for the side that does not act
+JointAction = Tuple[Optional[int], Optional[int]]
+
+
+def team_hp_fraction(dump: List[int]) -> float:
+    """Remaining hp over max hp of the mons present in a team dump"""
+    current = total = 0
+    for i in range(TEAM_SIZE):
+        start = i * MON_DUMP_SIZE
+        if dump[start + ID_OFFSET] != 0:
+            current += dump[start + CURRENT_HP_OFFSET]
+            total += dump[start + MAX_HP_OFFSET]
+    return current / total if total else 0.0
+
+
+def evaluate_dumps(player: List[int], enemy: List[int]) -> float:
+    """Player value in [0, 1], exact when a side is defeated, HP based otherwise"""
+    player_defeated = is_team_defeated(player)
+    enemy_defeated = is_team_defeated(enemy)
+    if player_defeated or enemy_defeated:
+        return 0.5 if player_defeated == enemy_defeated else float(enemy_defeated)
+    return 0.5 + 0.5 * (team_hp_fraction(player) - team_hp_fraction(enemy))
+
+
+def _legal_actions(core) -> Dict[str, List[int]]:
+    required = core.get_required_agents()
+    return {
+        agent: core.action_manager.get_legal_actions(agent) if agent in required else []
+        for agent in AGENTS
+    }
+
+
+@dataclass
+class Expansion:
+    """Child state produced by a worker and the value of its rollout"""
+
+    snapshot: Snapshot
+    state_hash: bytes
+    legal: Dict[str, List[int]]
+    terminal: bool
+    value: float
+
+
+def expand_and_rollout(core, item) -> Expansion:
+    """
+    Pool function: play a joint action from a snapshot, snapshot the child,
+    then roll out with random legal actions.
+    """
+    snapshot, joint, rollout_depth, seed = item
+    rng = random.Random(seed)
+    turn_manager = core.turn_manager
+    turn_manager.state = core.save_state_manager.restore(snapshot)
+    actions = {a: act for a, act in zip(AGENTS, joint) if act is not None}
+    turn_manager.process_turn(actions)
+    turn_manager.advance_to_next_turn()
+
+    terminal = turn_manager.is_battle_done()
+    child = core.save_state_manager.snapshot(turn_manager.state)
+    state_hash = core.state_hash()
+    legal = _legal_actions(core)
+
+    for _ in range(rollout_depth):
+        if turn_manager.is_battle_done():
+            break
+        rollout_actions = {}
+        for agent in core.get_required_agents():
+            legal_actions = core.action_manager.get_legal_actions(agent)
+            if legal_actions:
+                rollout_actions[agent] = rng.choice(legal_actions)
+        turn_manager.process_turn(rollout_actions)
+        turn_manager.advance_to_next_turn()
+
+    value = evaluate_dumps(
+        core.battle_core.read_team_data("player"),
+        core.battle_core.read_team_data("enemy"),
+    )
+    return Expansion(child, state_hash, legal, terminal, value)
+
+
+@dataclass
+class Node:
+    """Search node, per side statistics for decoupled UCT"""
+
+    snapshot: Snapshot
+    state_hash: bytes
+    legal: Dict[str, List[int]]
+    terminal: bool = False
+    terminal_value: float = 0.5
+    visits: int = 0
+    # Per side: action -> [visits, summed value from that side's view]
+    stats: Dict[str, Dict[int, List[float]]] = field(default_factory=dict)
+    children: Dict[JointAction, "Node"] = field(default_factory=dict)
+
+    def __post_init__(self):
+        for agent in AGENTS:
+            self.stats.setdefault(
+                agent, {action: [0, 0.0] for action in self.legal.get(agent, [])}
+            )
+
+
+class MCTSAgent:
+    """
+    Decoupled UCT agent searching with an EmulatorPool, see module doc.
+    """
+
+    def __init__(
+        self,
+        pool: EmulatorPool,
+        simulations: int = 256,
+        rollout_depth: int = 4,
+        exploration: float = 1.4,
+        batch_size: Optional[int] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            pool: Workers running the expansions and rollouts
+            simulations: Simulations per decision
+            rollout_depth: Random turns played after each expansion
+            exploration: UCB1 exploration constant
+            batch_size: Leaves expanded in parallel, defaults to the pool size
+            seed: Seed of the rollout seeds
+        """
+        self.pool = pool
+        self.simulations = simulations
+        self.rollout_depth = rollout_depth
+        self.exploration = exploration
+        self.batch_size = batch_size or pool.num_workers
+        self.rng = random.Random(seed)
+        self.root: Optional[Node] = None
+        self._searched_hash: Optional[bytes] = None
+
+    def __call__(self, core, agent: str, legal_actions: List[int]) -> int:
+        """Search from the current state of core and return the action of agent"""
+        state_hash = core.state_hash()
+        if self._searched_hash != state_hash:
+            self._set_root(core, state_hash)
+            self.search(self.simulations)
+            self._searched_hash = state_hash
+        return self.best_action(agent, legal_actions)
+
+    def _set_root(self, core, state_hash: bytes):
+        """Reuse the subtree of the reached state if it was searched"""
+        if self.root is not None:
+            for node in self._nodes_near_root():
+                if node.state_hash == state_hash:
+                    self.root = node
+                    return
+        self.root = Node(
+            core.save_state_manager.snapshot(core.turn_manager.state),
+            state_hash,
+            _legal_actions(core),
+        )
+
+    def _nodes_near_root(self) -> List[Node]:
+        """Children and grandchildren of the root, the states one decision away"""
+        nodes = list(self.root.children.values())
+        for child in list(nodes):
+            nodes.extend(child.children.values())
+        return nodes
+
+    def best_action(self, agent: str, legal_actions: List[int]) -> int:
+        """Most visited root action of agent, a random legal action if none"""
+        stats = self.root.stats.get(agent, {})
+        visited = [a for a in legal_actions if a in stats and stats[a][0] > 0]
+        if not visited:
+            return self.rng.choice(legal_actions)
+        return max(visited, key=lambda a: stats[a][0])
+
+    def _ucb(self, node: Node, agent: str) -> Optional[int]:
+        stats = node.stats[agent]
+        if not stats:
+            return None
+        unvisited = [a for a, (n, _) in stats.items() if n == 0]
+        if unvisited:
+            return self.rng.choice(unvisited)
+        log_visits = math.log(max(node.visits, 1))
+        return max(
+            stats,
+            key=lambda a: stats[a][1] / stats[a][0]
+            + self.exploration * math.sqrt(log_visits / stats[a][0]),
+        )
+
+    def _select(self) -> Tuple[List[Tuple[Node, JointAction]], Optional[Node]]:
+        """
+        Descend with decoupled UCB1, applying virtual loss on the way.
+        Returns the path and the terminal node reached, if any.
+        """
+        path = []
+        node = self.root
+        while True:
+            if node.terminal:
+                return path, node
+            joint = (self._ucb(node, "player"), self._ucb(node, "enemy"))
+            # Virtual loss: the visit counts now, its value on backup
+            node.visits += 1
+            for agent, action in zip(AGENTS, joint):
+                if action is not None:
+                    node.stats[agent][action][0] += 1
+            path.append((node, joint))
+            child = node.children.get(joint)
+            if child is None:
+                return path, None
+            node = child
+
+    def _backup(self, path: List[Tuple[Node, JointAction]], value: float):
+        for node, joint in path:
+            player_action, enemy_action = joint
+            if player_action is not None:
+                node.stats["player"][player_action][1] += value
+            if enemy_action is not None:
+                node.stats["enemy"][enemy_action][1] += 1.0 - value
+
+    def search(self, simulations: int):
+        """Run simulations from the root, batch_size leaves at a time"""
+        if self.root.terminal:
+            return
+        done = 0
+        while done < simulations:
+            batch = []
+            for _ in range(min(self.batch_size, simulations - done)):
+                path, terminal = self._select()
+                done += 1
+                if terminal is not None:
+                    self._backup(path, terminal.terminal_value)
+                else:
+                    batch.append(path)
+            if not batch:
+                continue
+            items = [
+                (
+                    path[-1][0].snapshot,
+                    path[-1][1],
+                    self.rollout_depth,
+                    self.rng.getrandbits(32),
+                )
+                for path in batch
+            ]
+            for path, expansion in zip(batch, self.pool.map(expand_and_rollout, items)):
+                parent, joint = path[-1]
+                if joint not in parent.children:
+                    parent.children[joint] = Node(
+                        expansion.snapshot,
+                        expansion.state_hash,
+                        expansion.legal,
+                        terminal=expansion.terminal,
+                        terminal_value=expansion.value,
+                    )
+                self._backup(path, expansion.value)
+
+    def reset(self):
+        """Drop the tree, e.g. between episodes"""
+        self.root = None
+        self._searched_hash = None
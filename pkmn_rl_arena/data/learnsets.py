@@ -0,0 +1,25 @@
+from pkmn_rl_arena import POKEMON_CSV_PATH
+
+import ast
+import csv
+from typing import Dict, List, Tuple
+
+Learnset = Tuple[int, List[int]]
+
+_learnsets: Dict[str, List[Learnset]] = {}
+
+
+def get_learnsets(csv_path: str = POKEMON_CSV_PATH) -> List[Learnset]:
+    """
+    Get the (species id, learnable move ids) pairs of every real species
+    (id 0 excluded), parsing the csv once per process.
+    """
+    if csv_path not in _learnsets:
+        learnsets = []
+        with open(csv_path, newline="") as f:
+            for row in csv.DictReader(f):
+                species_id = int(row["id"])
+                if species_id != 0:
+                    learnsets.append((species_id, ast.literal_eval(row["moves"])))
+        _learnsets[csv_path] = learnsets
+    return _learnsets[csv_path]
@@ -0,0 +1,52 @@
+from pkmn_rl_arena import POKEMON_CSV_PATH, MOVES_CSV_PATH
+
+import csv
+from typing import Dict, Optional, Tuple
+
+
+def _read_id_to_name(csv_path: str, name_column: str) -> Dict[int, str]:
+    """Read an id -> name table from one of the scraped csv files"""
+    table = {}
+    with open(csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            table[int(row["id"])] = row[name_column]
+    return table
+
+
+class NameIndex:
+    """
+    Preloaded id -> name tables for species and moves.
+    Lookups are plain dict accesses, no DataFrame filtering.
+    """
+
+    def __init__(
+        self,
+        pokemon_csv_path: str = POKEMON_CSV_PATH,
+        moves_csv_path: Optional[str] = MOVES_CSV_PATH,
+    ):
+        self.species = _read_id_to_name(pokemon_csv_path, "speciesName")
+        self.moves = (
+            _read_id_to_name(moves_csv_path, "moveName") if moves_csv_path else {}
+        )
+
+    def species_name(self, species_id: int) -> str:
+        """Get the species name for a species id"""
+        return self.species.get(int(species_id), "Unknown")
+
+    def move_name(self, move_id: int) -> str:
+        """Get the move name for a move id"""
+        return self.moves.get(int(move_id), f"Move {move_id}")
+
+
+_name_indexes: Dict[Tuple[str, Optional[str]], NameIndex] = {}
+
+
+def get_name_index(
+    pokemon_csv_path: str = POKEMON_CSV_PATH,
+    moves_csv_path: Optional[str] = MOVES_CSV_PATH,
+) -> NameIndex:
+    """Get the name index for the given csv files, loading it once per process"""
+    key = (pokemon_csv_path, moves_csv_path)
+    if key not in _name_indexes:
+        _name_indexes[key] = NameIndex(pokemon_csv_path, moves_csv_path)
+    return _name_indexes[key]
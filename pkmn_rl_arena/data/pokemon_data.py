@@ -1,94 +1,103 @@
-import pandas as pd
+# Layout of the team dumps written by the rom (monDataPlayer / monDataEnemy)
+MON_DUMP_SIZE = 35
+TEAM_SIZE = 6
+ID_OFFSET = 1
+CURRENT_HP_OFFSET = 21
+MAX_HP_OFFSET = 24
+# Raw words followed by the hp fraction and a usable (present, not fainted) flag
+MON_FEATURE_SIZE = MON_DUMP_SIZE + 2
 
-def to_pandas_mon_dump_data(array):
-    """Convert Pokemon data array to pandas DataFrame with named columns"""
-    data = {
-        'isActive': array[0],
-        'id': array[1],
-        'baseAttack': array[2],
-        'baseDefense': array[3],
-        'baseSpeed': array[4],
-        'baseSpAttack': array[5],
-        'baseSpDefense': array[6],
+
+def mon_dump_to_dict(array, start=0):
+    """Convert the 35 words of one mon, starting at start, to named fields"""
+    return {
+        'isActive': array[start],
+        'id': array[start + 1],
+        'baseAttack': array[start + 2],
+        'baseDefense': array[start + 3],
+        'baseSpeed': array[start + 4],
+        'baseSpAttack': array[start + 5],
+        'baseSpDefense': array[start + 6],
         
-        'moves': [array[7], array[8], array[9], array[10]],
+        'moves': [array[start + 7], array[start + 8], array[start + 9], array[start + 10]],
         
-        'hp_iv': array[11],
-        'atk_iv': array[12],
-        'def_iv': array[13],
-        'speed_iv': array[14],
-        'spatk_iv': array[15],
-        'spdef_iv': array[16],
+        'hp_iv': array[start + 11],
+        'atk_iv': array[start + 12],
+        'def_iv': array[start + 13],
+        'speed_iv': array[start + 14],
+        'spatk_iv': array[start + 15],
+        'spdef_iv': array[start + 16],
         
-        'ability_num': array[17],
-        'ability': array[18],
-        'type0': array[19],  
-        'type1': array[20], 
+        'ability_num': array[start + 17],
+        'ability': array[start + 18],
+        'type0': array[start + 19],  
+        'type1': array[start + 20], 
         
-        'current_hp': array[21],
-        'level': array[22],
-        'friendship': array[23],
-        'max_hp': array[24],
-        'held_item': array[25],
-        'pp_bonuses': array[26],
-        'personality': array[27],
-        'status1': array[28],
-        'status2': array[29],
-        'status3': array[30],
+        'current_hp': array[start + 21],
+        'level': array[start + 22],
+        'friendship': array[start + 23],
+        'max_hp': array[start + 24],
+        'held_item': array[start + 25],
+        'pp_bonuses': array[start + 26],
+        'personality': array[start + 27],
+        'status1': array[start + 28],
+        'status2': array[start + 29],
+        'status3': array[start + 30],
         
-        'move1_pp': array[31],
-        'move2_pp': array[32],
-        'move3_pp': array[33],
-        'move4_pp': array[34]
+        'move1_pp': array[start + 31],
+        'move2_pp': array[start + 32],
+        'move3_pp': array[start + 33],
+        'move4_pp': array[start + 34]
     }
-    
-    return pd.DataFrame([data])
+
+def to_pandas_mon_dump_data(array):
+    """Convert Pokemon data array to pandas DataFrame with named columns"""
+    import pandas as pd
+
+    return pd.DataFrame([mon_dump_to_dict(array)])
+
+def team_rows_to_pandas(rows):
+    """Build a team DataFrame from the per mon dicts of mon_dump_to_dict"""
+    import pandas as pd
+
+    return pd.DataFrame(rows)
 
 def to_pandas_team_dump_data(array):
     """Convert a Pokémon team data array to a pandas DataFrame"""
-    team_data = []
-    for i in range(6): 
-        start = i * 35
-        end = start + 35
-        mon_data = {
-            'isActive': array[start],
-            'id': array[start + 1],
-            'baseAttack': array[start + 2],
-            'baseDefense': array[start + 3],
-            'baseSpeed': array[start + 4],
-            'baseSpAttack': array[start + 5],
-            'baseSpDefense': array[start + 6],
-            
-            'moves': [array[start + 7], array[start + 8], array[start + 9], array[start + 10]],
-            
-            'hp_iv': array[start + 11],
-            'atk_iv': array[start + 12],
-            'def_iv': array[start + 13],
-            'speed_iv': array[start + 14],
-            'spatk_iv': array[start + 15],
-            'spdef_iv': array[start + 16],
-            
-            'ability_num': array[start + 17],
-            'ability': array[start + 18],
-            'type0': array[start + 19],  
-            'type1': array[start + 20], 
-            
-            'current_hp': array[start + 21],
-            'level': array[start + 22],
-            'friendship': array[start + 23],
-            'max_hp': array[start + 24],
-            'held_item': array[start + 25],
-            'pp_bonuses': array[start + 26],
-            'personality': array[start + 27],
-            'status1': array[start + 28],
-            'status2': array[start + 29],
-            'status3': array[start + 30],
-            
-            'move1_pp': array[start + 31],
-            'move2_pp': array[start + 32],
-            'move3_pp': array[start + 33],
-            'move4_pp': array[start + 34]
-        }
-        team_data.append(mon_data)
-    
-    return pd.DataFrame(team_data)
+    return team_rows_to_pandas(
+        [mon_dump_to_dict(array, i * MON_DUMP_SIZE) for i in range(TEAM_SIZE)]
+    )
+
+
+def encode_mon(array, start, out):
+    """
+    Write the numeric features of the mon starting at start into out, a float
+    array of MON_FEATURE_SIZE values.
+    """
+    block = array[start : start + MON_DUMP_SIZE]
+    out[:MON_DUMP_SIZE] = block
+    current_hp = block[CURRENT_HP_OFFSET]
+    max_hp = block[MAX_HP_OFFSET]
+    out[MON_DUMP_SIZE] = current_hp / max_hp if max_hp else 0.0
+    out[MON_DUMP_SIZE + 1] = float(block[ID_OFFSET] != 0 and current_hp > 0)
+
+
+def count_usable_mons(array) -> int:
+    """Count the mons of a team dump that are present and not fainted"""
+    usable = 0
+    for i in range(TEAM_SIZE):
+        start = i * MON_DUMP_SIZE
+        if array[start + ID_OFFSET] != 0 and array[start + CURRENT_HP_OFFSET] > 0:
+            usable += 1
+    return usable
+
+
+def is_team_defeated(array) -> bool:
+    """
+    Check whether a team dump has no usable mon left.
+    An empty dump (no species written yet) is not considered defeated.
+    """
+    has_mon = any(
+        array[i * MON_DUMP_SIZE + ID_OFFSET] != 0 for i in range(TEAM_SIZE)
+    )
+    return has_mon and count_usable_mons(array) == 0
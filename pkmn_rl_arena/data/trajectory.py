@@ -0,0 +1,325 @@
+"""
+Chunked columnar trajectory storage for offline datasets.
+
+A dataset is a directory of shards, one per worker. Each shard holds fixed
+size chunks, one .npy file per column, and an index.json listing the chunks
+fully written so far:
+
+    dataset/
+        shard_0000/
+            index.json
+            chunk_000000.obs.npy
+            chunk_000000.mask.npy
+            ...
+
+Row t of a shard is the transition taken from observation t: the raw team
+dumps and legal action masks seen by the agents, the actions they played
+(-1 for an agent not required this turn), the rewards and done flag
+returned by the step.
+"""
+
+from pkmn_rl_arena.data.pokemon_data import MON_DUMP_SIZE, TEAM_SIZE
+
+import json
+import logging
+import os
+import queue
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+AGENTS = ("player", "enemy")
+NUM_ACTIONS = 10
+INDEX_FILE = "index.json"
+
+# Column name -> (per row shape, dtype)
+COLUMNS: Dict[str, Tuple[Tuple[int, ...], type]] = {
+    "obs": ((len(AGENTS), MON_DUMP_SIZE * TEAM_SIZE), np.uint32),
+    "mask": ((len(AGENTS), NUM_ACTIONS), np.bool_),
+    "action": ((len(AGENTS),), np.int8),
+    "reward": ((len(AGENTS),), np.float32),
+    "done": ((), np.bool_),
+}
+
+
+def shard_dir(output_dir: str, shard: int) -> str:
+    """Directory of a shard"""
+    return os.path.join(output_dir, f"shard_{shard:04d}")
+
+
+def read_index(path: str) -> Dict:
+    """Read the index of a shard directory, empty if nothing was written yet"""
+    index_path = os.path.join(path, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return {"chunk_size": None, "chunks": []}
+    with open(index_path) as f:
+        return json.load(f)
+
+
+def _write_index(path: str, index: Dict):
+    tmp_index = os.path.join(path, INDEX_FILE + ".tmp")
+    with open(tmp_index, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_index, os.path.join(path, INDEX_FILE))
+
+
+def _chunk_path(path: str, number: int, name: str) -> str:
+    return os.path.join(path, f"chunk_{number:06d}.{name}.npy")
+
+
+def drop_partial_episode(output_dir: str, shard: int) -> int:
+    """
+    Remove the rows after the last done flag of a shard, the unfinished
+    episode of an interrupted run, so that appending starts a new episode.
+
+    The chunk holding the last done flag is rewritten truncated under a new
+    chunk number, then the index is replaced in one atomic write, so a crash
+    at any point leaves either the old or the trimmed shard.
+
+    Returns:
+        Number of rows dropped
+    """
+    path = shard_dir(output_dir, shard)
+    index = read_index(path)
+    chunks = index["chunks"]
+    keep = len(chunks)
+    last_rows = None
+    for i in range(len(chunks) - 1, -1, -1):
+        done = np.load(_chunk_path(path, chunks[i]["number"], "done"), mmap_mode="r")
+        ends = np.flatnonzero(done[: chunks[i]["rows"]])
+        if len(ends):
+            keep, last_rows = i + 1, int(ends[-1]) + 1
+            break
+        keep = i
+    if keep == len(chunks) and (not chunks or last_rows == chunks[-1]["rows"]):
+        return 0
+
+    dropped_chunks = chunks[keep:]
+    new_chunks = chunks[:keep]
+    dropped = sum(chunk["rows"] for chunk in dropped_chunks)
+    if last_rows is not None and last_rows < new_chunks[-1]["rows"]:
+        old = new_chunks[-1]
+        dropped += old["rows"] - last_rows
+        number = 1 + max(chunk["number"] for chunk in chunks)
+        for name in COLUMNS:
+            column = np.load(_chunk_path(path, old["number"], name))
+            tmp_path = _chunk_path(path, number, name) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, column[:last_rows])
+            os.replace(tmp_path, _chunk_path(path, number, name))
+        new_chunks[-1] = {"number": number, "rows": last_rows}
+        dropped_chunks.append(old)
+
+    index["chunks"] = new_chunks
+    _write_index(path, index)
+    for chunk in dropped_chunks:
+        for name in COLUMNS:
+            try:
+                os.remove(_chunk_path(path, chunk["number"], name))
+            except FileNotFoundError:
+                pass
+    logger.info("Dropped %d rows of an unfinished episode in %s", dropped, path)
+    return dropped
+
+
+def _allocate_chunk(chunk_size: int) -> Dict[str, np.ndarray]:
+    return {
+        name: np.zeros((chunk_size,) + shape, dtype=dtype)
+        for name, (shape, dtype) in COLUMNS.items()
+    }
+
+
+class TrajectoryWriter:
+    """
+    Appends transitions into preallocated column chunks and writes full
+    chunks from a background thread.
+
+    append() only copies one row into the current chunk. A full chunk is
+    handed to the writer thread and replaced by a recycled buffer, or a new
+    one when the writer falls behind, so the env step never waits on disk.
+    Files are written under a temporary name and renamed, and a chunk is
+    listed in index.json only once every column is on disk, so a killed
+    worker leaves a shard that is readable up to its last complete chunk.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        shard: int = 0,
+        chunk_size: int = 4096,
+        max_pending_chunks: int = 8,
+    ):
+        """
+        Args:
+            output_dir: Dataset directory
+            shard: Shard number, one per worker
+            chunk_size: Rows per chunk file
+            max_pending_chunks: Pending chunks above which a warning is logged
+        """
+        self.path = shard_dir(output_dir, shard)
+        os.makedirs(self.path, exist_ok=True)
+        self.index = read_index(self.path)
+        if self.index["chunk_size"] not in (None, chunk_size):
+            raise ValueError(
+                f"Shard {self.path} was written with chunk_size "
+                f"{self.index['chunk_size']}, got {chunk_size}"
+            )
+        self.index["chunk_size"] = chunk_size
+        self.chunk_size = chunk_size
+        self.max_pending_chunks = max_pending_chunks
+
+        # Rows of this shard, including rows written by previous runs
+        self.rows = sum(chunk["rows"] for chunk in self.index["chunks"])
+        self._next_chunk = 1 + max(
+            (chunk["number"] for chunk in self.index["chunks"]), default=-1
+        )
+        self._chunk = _allocate_chunk(chunk_size)
+        self._row = 0
+        self._free: List[Dict[str, np.ndarray]] = []
+        self._free_lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="pkmn-trajectory", daemon=True
+        )
+        self._thread.start()
+
+    def append(
+        self,
+        obs: Dict[str, List[int]],
+        mask: Dict[str, List[bool]],
+        actions: Dict[str, int],
+        rewards: Dict[str, float],
+        done: bool,
+    ):
+        """
+        Append one transition, agent keyed dicts as used by PokemonRLCore.
+
+        Args:
+            obs: Raw team dump (210 u32) per agent, before the step
+            mask: Legal action mask (10 bool) per agent, before the step
+            actions: Action per agent that played, others are stored as -1
+            rewards: Reward per agent returned by the step
+            done: Done flag returned by the step
+        """
+        row = self._row
+        chunk = self._chunk
+        for i, agent in enumerate(AGENTS):
+            chunk["obs"][row, i] = obs[agent]
+            chunk["mask"][row, i] = mask[agent]
+            chunk["action"][row, i] = actions.get(agent, -1)
+            chunk["reward"][row, i] = rewards.get(agent, 0.0)
+        chunk["done"][row] = done
+        self._row += 1
+        self.rows += 1
+        if self._row == self.chunk_size:
+            self._submit()
+
+    def _submit(self):
+        """Hand the current chunk to the writer thread and take a fresh one"""
+        self._queue.put((self._next_chunk, self._chunk, self._row))
+        self._next_chunk += 1
+        pending = self._queue.qsize()
+        if pending > self.max_pending_chunks:
+            logger.warning(
+                "%d trajectory chunks waiting for disk in %s", pending, self.path
+            )
+        with self._free_lock:
+            self._chunk = (
+                self._free.pop() if self._free else _allocate_chunk(self.chunk_size)
+            )
+        self._row = 0
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            number, chunk, rows = item
+            try:
+                self._write_chunk(number, chunk, rows)
+            except OSError as e:
+                logger.error("Failed to write chunk %d of %s: %s", number, self.path, e)
+            with self._free_lock:
+                self._free.append(chunk)
+
+    def _write_chunk(self, number: int, chunk: Dict[str, np.ndarray], rows: int):
+        for name, column in chunk.items():
+            path = _chunk_path(self.path, number, name)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, column[:rows])
+            os.replace(tmp_path, path)
+        self.index["chunks"].append({"number": number, "rows": rows})
+        _write_index(self.path, self.index)
+
+    def flush(self):
+        """Submit the partially filled chunk, if any"""
+        if self._row:
+            self._submit()
+
+    def close(self, timeout: Optional[float] = None):
+        """Flush, write every pending chunk and stop the writer thread"""
+        self.flush()
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def __enter__(self) -> "TrajectoryWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryReader:
+    """
+    Reads a dataset written by TrajectoryWriter, every chunk memory mapped.
+    """
+
+    def __init__(self, output_dir: str, shards: Optional[List[int]] = None):
+        """
+        Args:
+            output_dir: Dataset directory
+            shards: Shard numbers to read, defaults to every shard
+        """
+        self.output_dir = output_dir
+        if shards is not None:
+            self.shards = [os.path.basename(shard_dir("", shard)) for shard in shards]
+        else:
+            self.shards = sorted(
+                entry
+                for entry in os.listdir(output_dir)
+                if entry.startswith("shard_")
+                and os.path.isdir(os.path.join(output_dir, entry))
+            )
+
+    def iter_chunks(self) -> Iterator[Dict[str, np.ndarray]]:
+        """Yield every complete chunk as {column: read only memmap}"""
+        for shard in self.shards:
+            path = os.path.join(self.output_dir, shard)
+            for chunk in read_index(path)["chunks"]:
+                yield {
+                    name: np.load(
+                        _chunk_path(path, chunk["number"], name), mmap_mode="r"
+                    )
+                    for name in COLUMNS
+                }
+
+    def __len__(self) -> int:
+        return sum(
+            chunk["rows"]
+            for shard in self.shards
+            for chunk in read_index(os.path.join(self.output_dir, shard))["chunks"]
+        )
+
+    def column(self, name: str) -> np.ndarray:
+        """Concatenate a column over every chunk (loads it in memory)"""
+        if name not in COLUMNS:
+            raise KeyError(f"Unknown column: {name}")
+        shape, dtype = COLUMNS[name]
+        parts = [chunk[name] for chunk in self.iter_chunks()]
+        if not parts:
+            return np.zeros((0,) + shape, dtype=dtype)
+        return np.concatenate(parts)
@@ -0,0 +1,24 @@
+import importlib
+
+# Public name -> defining submodule, imported on first attribute access so that
+# `import pkmn_rl_arena.env` stays cheap in worker processes.
+_LAZY_ATTRS = {
+    "PokemonRLCore": ".pokemon_rl_core",
+    "BattleCore": ".battle_core",
+    "TurnType": ".battle_state",
+    "BattleState": ".battle_state",
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
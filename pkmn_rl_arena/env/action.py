@@ -12,6 +12,7 @@ class ActionManager:
     def __init__(self, battle_core: BattleCore):
         self.battle_core = battle_core
         self.action_space_size = 10  # Actions 0-9
+        self._legal_actions: Dict[str, List[int]] = {}
 
     def is_valid_action(self, action: int) -> bool:
         """Check if action is valid (simplified version)"""
@@ -31,27 +32,38 @@ class ActionManager:
                 self.battle_core.write_action("enemy", actions["enemy"])
 
     def get_legal_actions(self, agent: str) -> List[int]:
+        """
+        Get the legal actions of an agent, moves 0-3 then switches 4-9.
+        Recomputed only when the legal action arrays changed in memory.
+        """
         if agent == "player":
-            legal_moves = self.battle_core.gba.read_u16_list(
-                self.battle_core.addrs["legalMoveActionsPlayer"], 4
-            )
-            legal_switches = self.battle_core.gba.read_u16_list(
-                self.battle_core.addrs["legalSwitchActionsPlayer"], 6
-            )
+            suffix = "Player"
         elif agent == "enemy":
-            legal_moves = self.battle_core.gba.read_u16_list(
-                self.battle_core.addrs["legalMoveActionsEnemy"], 4
-            )
-            legal_switches = self.battle_core.gba.read_u16_list(
-                self.battle_core.addrs["legalSwitchActionsEnemy"], 6
-            )
+            suffix = "Enemy"
         else:
             raise ValueError(f"Unknown agent: {agent}")
 
+        legal_moves, moves_dirty = self.battle_core.read_watched(
+            f"legalMoveActions{suffix}"
+        )
+        legal_switches, switches_dirty = self.battle_core.read_watched(
+            f"legalSwitchActions{suffix}"
+        )
+        if not moves_dirty and not switches_dirty and agent in self._legal_actions:
+            return list(self._legal_actions[agent])
+
         valid_moves = [i for i, move in enumerate(legal_moves) if move]
         valid_switches = [
             i + 4 for i, switch in enumerate(legal_switches) if switch
         ]  # Offset switches by 4
 
         # Combine moves and switches into a single list of legal actions
-        return valid_moves + valid_switches
+        self._legal_actions[agent] = valid_moves + valid_switches
+        return list(self._legal_actions[agent])
+
+    def get_legal_action_mask(self, agent: str) -> List[bool]:
+        """Get a mask of the action space, True for the legal actions of agent"""
+        mask = [False] * self.action_space_size
+        for action in self.get_legal_actions(agent):
+            mask[action] = True
+        return mask
@@ -1,12 +1,30 @@
 import rustboyadvance_py
-from pkmn_rl_arena import SAVE_PATH,ROM_PATH,BIOS_PATH
+from pkmn_rl_arena import SAVE_PATH
+from pkmn_rl_arena.log import counters
 import pkmn_rl_arena.data.parser
 import pkmn_rl_arena.data.pokemon_data
 
 from .battle_state import TurnType
+from .memory_watch import MemoryWatch
 
+import logging
 import os
-from typing import List
+import tempfile
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Battle RNG state in pokeemerald, optional in the map
+RNG_SYMBOL = "gRngValue"
+
+# Pseudo stop id returned when the outcome is read from memory before the end stop
+OUTCOME_DECIDED_STOP_ID = -2
+
+# Savestates of bindings without a bytes API go through files here, in memory
+# when tmpfs is available
+STATE_TMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+_warned_state_files = False
+
 
 class BattleCore:
     """
@@ -21,21 +39,30 @@ class BattleCore:
         map_path: str,
         steps: int = 32000,
         setup: bool = True,
+        early_termination: bool = False,
     ):
         self.rom_path = rom_path
         self.bios_path = bios_path
         self.map_path = map_path
         self.steps = steps
+        # End the battle as soon as a team dump shows a side without usable mon
+        self.early_termination = early_termination
         # Initialize parser and GBA emulator
         self.parser = pkmn_rl_arena.data.parser.MapAnalyzer(map_path)
         self.gba = rustboyadvance_py.RustGba()
+        # load() copies the rom into each emulator. Sharing it between workers
+        # needs a rustboyadvance_py entry point booting from a shared buffer
         self.gba.load(bios_path, rom_path)
+        self.memory_watch = MemoryWatch(self.gba)
+        # Called with the emulator after every emulation chunk, e.g. a recorder
+        self.frame_hook = None
 
         if setup:
             self.addrs = {}  # filled in fctn below
             self.addrs = self.setup_addresses()
             self.stop_ids = {}  # filled in fctn below
             self.setup_stops()
+            self.setup_watches()
 
     def setup_addresses(self):
         """Setup memory addresses from the map file"""
@@ -70,6 +97,9 @@ class BattleCore:
             "actionDonePlayer": int(self.parser.get_address("actionDonePlayer"), 16),
             "actionDoneEnemy": int(self.parser.get_address("actionDoneEnemy"), 16),
         }
+        rng_addr = self.parser.get_address(RNG_SYMBOL)
+        if rng_addr is not None:
+            self.addrs[RNG_SYMBOL] = int(rng_addr, 16)
         return self.addrs
 
     def setup_stops(self):
@@ -101,27 +131,73 @@ class BattleCore:
             2: TurnType.PLAYER,
             3: TurnType.ENEMY,
             4: TurnType.DONE,
+            OUTCOME_DECIDED_STOP_ID: TurnType.DONE,
         }
 
+    def setup_watches(self):
+        """Watch the team dumps and legal action arrays read at every decision"""
+        self.memory_watch.watch("monDataPlayer", self.addrs["monDataPlayer"], 35 * 6)
+        self.memory_watch.watch("monDataEnemy", self.addrs["monDataEnemy"], 35 * 6)
+        for agent in ("Player", "Enemy"):
+            self.memory_watch.watch(
+                f"legalMoveActions{agent}",
+                self.addrs[f"legalMoveActions{agent}"],
+                4,
+                word_size=2,
+            )
+            self.memory_watch.watch(
+                f"legalSwitchActions{agent}",
+                self.addrs[f"legalSwitchActions{agent}"],
+                6,
+                word_size=2,
+            )
+
+    def read_watched(self, name: str) -> Tuple[List[int], bool]:
+        """Read a watched range, returns (data, changed since last read)"""
+        return self.memory_watch.read(name)
+
     def add_stop_addr(self, addr: int, size: int, read: bool, name: str, stop_id: int):
         """Add a stop address to the GBA emulator"""
         self.gba.add_stop_addr(addr, size, read, name, stop_id)
 
-    def run_to_next_stop(self, max_steps=2000000) -> int:
-        """Run the emulator until we hit a stop condition"""
+    def run_to_next_stop(self, max_steps=2000000, check_outcome: bool = False) -> int:
+        """
+        Run the emulator until we hit a stop condition.
+
+        Args:
+            max_steps: Maximum number of emulation chunks before giving up
+            check_outcome: Between chunks, read the team dumps and return
+                OUTCOME_DECIDED_STOP_ID as soon as one side has no usable mon,
+                skipping faint animations and end of battle screens.
+        """
+        frame_hook = self.frame_hook
         stop_id = self.gba.run_to_next_stop(self.steps)
+        if frame_hook is not None:
+            frame_hook(self.gba)
 
         # Keep running if we didn't hit a stop
         while stop_id == -1:
+            if check_outcome and self.is_outcome_decided():
+                return OUTCOME_DECIDED_STOP_ID
             max_steps -= 1
             if max_steps <= 0:
                 raise TimeoutError(
                     "Reached maximum steps without hitting a stop condition"
                 )
             stop_id = self.gba.run_to_next_stop(self.steps)
+            if frame_hook is not None:
+                frame_hook(self.gba)
 
         return stop_id
 
+    def is_outcome_decided(self) -> bool:
+        """Check whether one side has no usable mon left in its team dump"""
+        return pkmn_rl_arena.data.pokemon_data.is_team_defeated(
+            self.read_team_data("player")
+        ) or pkmn_rl_arena.data.pokemon_data.is_team_defeated(
+            self.read_team_data("enemy")
+        )
+
     def get_turn_type(self, stop_id: int) -> TurnType:
         """Convert stop ID to turn type"""
         return self.stop_ids.get(stop_id, TurnType.DONE)
@@ -135,6 +211,19 @@ class BattleCore:
         else:
             raise ValueError(f"Unknown agent: {agent}")
 
+    def get_rng(self) -> int:
+        """Read the game RNG state"""
+        return self.gba.read_u32(self._rng_addr())
+
+    def set_rng(self, value: int):
+        """Overwrite the game RNG state, e.g. to replay the same luck"""
+        self.gba.write_u32(self._rng_addr(), value & 0xFFFFFFFF)
+
+    def _rng_addr(self) -> int:
+        if RNG_SYMBOL not in self.addrs:
+            raise RuntimeError(f"{RNG_SYMBOL} is not in the map file {self.map_path}")
+        return self.addrs[RNG_SYMBOL]
+
     def write_action(self, agent: str, action: int):
         """Write action for specified agent"""
         if agent == "player":
@@ -149,7 +238,7 @@ class BattleCore:
         if turn_type == TurnType.CREATE_TEAM:
             self.gba.write_u16(self.addrs["stopHandleTurnCreateTeam"], 0)
         elif turn_type == TurnType.GENERAL:
-            print("Turn = general ")
+            counters.incr("env.general_turns")
             self.gba.write_u16(self.addrs["stopHandleTurn"], 0)
         elif turn_type == TurnType.PLAYER:
             self.gba.write_u16(self.addrs["stopHandleTurnPlayer"], 0)
@@ -178,8 +267,53 @@ class BattleCore:
         """Load a saved state"""
         save_path = os.path.join(SAVE_PATH, f"{name}.savestate")
         if os.path.exists(save_path):
-            self.gba.load_savestate(save_path, BIOS_PATH, ROM_PATH)
+            self.gba.load_savestate(save_path, self.bios_path, self.rom_path)
+            self.memory_watch.invalidate()
             return True
         else:
-            print(f"Save state {save_path} does not exist.")
+            logger.warning("Save state %s does not exist.", save_path)
             return False
+
+    def supports_state_bytes(self) -> bool:
+        """Check whether the emulator binding can (de)serialize states in memory"""
+        return hasattr(self.gba, "save_savestate_bytes") and hasattr(
+            self.gba, "load_savestate_bytes"
+        )
+
+    def _warn_state_files(self):
+        global _warned_state_files
+        counters.incr("env.savestate_file_fallback")
+        if not _warned_state_files:
+            logger.warning(
+                "rustboyadvance_py has no save/load_savestate_bytes, in memory "
+                "snapshots go through temporary files in %s",
+                STATE_TMP_DIR or tempfile.gettempdir(),
+            )
+            _warned_state_files = True
+
+    def save_savestate_bytes(self) -> bytes:
+        """
+        Get the current state of the emulator as bytes, through a temporary
+        file when the binding cannot serialize in memory (logged once).
+        """
+        if self.supports_state_bytes():
+            return bytes(self.gba.save_savestate_bytes())
+        self._warn_state_files()
+        with tempfile.TemporaryDirectory(dir=STATE_TMP_DIR) as tmp_dir:
+            path = os.path.join(tmp_dir, "state.savestate")
+            self.gba.save_savestate(path)
+            with open(path, "rb") as f:
+                return f.read()
+
+    def load_savestate_bytes(self, data: bytes):
+        """Restore a state returned by save_savestate_bytes"""
+        if self.supports_state_bytes():
+            self.gba.load_savestate_bytes(data, self.bios_path, self.rom_path)
+        else:
+            self._warn_state_files()
+            with tempfile.TemporaryDirectory(dir=STATE_TMP_DIR) as tmp_dir:
+                path = os.path.join(tmp_dir, "state.savestate")
+                with open(path, "wb") as f:
+                    f.write(data)
+                self.gba.load_savestate(path, self.bios_path, self.rom_path)
+        self.memory_watch.invalidate()
@@ -23,6 +23,7 @@ class BattleState:
     waiting_for_action: bool = False
     episode_steps: int = 0
     pending_actions: Dict[str, Optional[int]] = None
+    outcome_decided_early: bool = False
 
     def __post_init__(self):
         if self.pending_actions is None:
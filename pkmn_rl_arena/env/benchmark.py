@@ -1,50 +1,372 @@
-import sys
+"""
+Env throughput benchmarks.
+
+Measures cold construction, reset latency, step latency per TurnType,
+emulation speed, observation decode cost, savestate load cost and scaling
+across worker processes, then writes the results as JSON.
+
+    python -m pkmn_rl_arena.env.benchmark --output bench.json
+    python -m pkmn_rl_arena.env.benchmark --baseline bench.json --threshold 0.1
+
+With --baseline, the run exits with status 1 when a metric regressed by more
+than the threshold (latencies compared on their median).
+
+Timings depend on the machine, so no baseline is shipped with the package.
+Record one on the machine that runs the comparison and keep it next to the
+checkout, e.g.
+
+    python -m pkmn_rl_arena.env.benchmark --baseline bench_baseline.json \
+        --update-baseline
+
+Observation cost is reported for the three paths of ObservationManager on
+the states reached by the step case: "observation_decode" decodes every
+slot again, "observation_refresh" re-reads the team dumps with the memory
+watch invalidated and decodes the slots that changed (none here), and
+"observation_cached" is the call made again on a clean watch.
+"""
+
+from pkmn_rl_arena import ROM_PATH, BIOS_PATH, MAP_PATH
+
+import argparse
+import json
+import math
+import multiprocessing
 import os
+import platform
 import random
+import sys
 import time
-from pkmn_rl_arena.env.core import PokemonRLCore, TurnType
-import rustboyadvance_py
-import pkmn_rl_arena.data.parser
-import pkmn_rl_arena.data.pokemon_data
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_THRESHOLD = 0.10
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples (seconds) with percentiles"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        k = (len(ordered) - 1) * p / 100.0
+        lo, hi = math.floor(k), math.ceil(k)
+        return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "min": ordered[0],
+        "p50": percentile(50),
+        "p90": percentile(90),
+        "p99": percentile(99),
+        "max": ordered[-1],
+    }
+
+
+def random_actions(core) -> Dict[str, int]:
+    """Pick a random legal action for every agent required this turn"""
+    actions = {}
+    for agent in core.get_required_agents():
+        legal_actions = core.action_manager.get_legal_actions(agent)
+        if legal_actions:
+            actions[agent] = random.choice(legal_actions)
+    return actions
+
+
+class _CountingGba:
+    """Proxy around the emulator that counts and times run_to_next_stop chunks"""
+
+    def __init__(self, gba):
+        self._gba = gba
+        self.chunks = 0
+        self.seconds = 0.0
+
+    def run_to_next_stop(self, steps):
+        start = time.perf_counter()
+        stop_id = self._gba.run_to_next_stop(steps)
+        self.seconds += time.perf_counter() - start
+        self.chunks += 1
+        return stop_id
+
+    def __getattr__(self, name):
+        return getattr(self._gba, name)
 
-STEPS = 50
-from pkmn_rl_arena import ROM_PATH, BIOS_PATH, MAP_PATH
 
 class Benchmark:
-    def __init__(self):
-        self.rl_core = PokemonRLCore(ROM_PATH, BIOS_PATH, MAP_PATH)
-        obs = self.rl_core.reset()
-
-    def run(self):
-        step_times = []
-        last_time = time.time()
-        for step in range(STEPS):
-            current_turn = self.rl_core.get_current_turn_type()
-            required_agents = self.rl_core.get_required_agents()
-            
-            actions = {}
-            for agent in required_agents:
-                legal_actions = self.rl_core.action_manager.get_legal_actions(agent)
-                if legal_actions:
-                    actions[agent] = random.choice(legal_actions)  # Choose a random legal action
-                else:
-                    print(f"No legal actions available for {agent}")
-            
-            observations, rewards, done, info = self.rl_core.step(actions)
-            
-            now = time.time()
-            step_time = now - last_time
-            step_times.append(step_time)
-            last_time = now
-
-            if done:
-                print("Episode finished!")
-                break
-
-        if step_times:
-            avg_time = sum(step_times) / len(step_times)
-            print(f"Average step time: {avg_time:.4f} seconds")
+    """
+    Runs the benchmark cases against PokemonRLCore instances.
+    """
+
+    def __init__(
+        self,
+        rom_path: str = ROM_PATH,
+        bios_path: str = BIOS_PATH,
+        map_path: str = MAP_PATH,
+        steps: int = 200,
+        resets: int = 20,
+        constructions: int = 3,
+    ):
+        self.rom_path = rom_path
+        self.bios_path = bios_path
+        self.map_path = map_path
+        self.steps = steps
+        self.resets = resets
+        self.constructions = constructions
+
+    def _make_core(self):
+        from .pokemon_rl_core import PokemonRLCore
+
+        return PokemonRLCore(self.rom_path, self.bios_path, self.map_path)
+
+    def bench_construction(self) -> Dict[str, float]:
+        """Time building a core, i.e. map parsing, bios/rom load and boot"""
+        samples = []
+        for _ in range(self.constructions):
+            start = time.perf_counter()
+            self._make_core()
+            samples.append(time.perf_counter() - start)
+        return summarize(samples)
+
+    def bench_reset(self, core) -> Dict[str, float]:
+        """Time reset(), savestate load + team sampling + first turn"""
+        core.reset()  # make sure the savestate exists
+        samples = []
+        for _ in range(self.resets):
+            start = time.perf_counter()
+            core.reset()
+            samples.append(time.perf_counter() - start)
+        return summarize(samples)
+
+    def bench_savestate_load(self, core) -> Dict[str, float]:
+        """Time restoring the state_before_create_team savestate alone"""
+        samples = []
+        for _ in range(self.resets):
+            start = time.perf_counter()
+            core.save_state_manager.load_state("state_before_create_team")
+            samples.append(time.perf_counter() - start)
+        return summarize(samples)
+
+    def bench_steps(self, core) -> Dict[str, Any]:
+        """
+        Time step() per turn type, the emulation chunks it runs and the
+        observation costs on the same states, see the module doc.
+        """
+        gba_proxy = _CountingGba(core.battle_core.gba)
+        core.battle_core.gba = gba_proxy
+        try:
+            core.reset()
+            gba_proxy.chunks, gba_proxy.seconds = 0, 0.0
+            per_turn: Dict[str, List[float]] = {}
+            observation_samples: Dict[str, List[float]] = {
+                "observation_decode": [],
+                "observation_refresh": [],
+                "observation_cached": [],
+            }
+            total = 0.0
+            for _ in range(self.steps):
+                turn = core.get_current_turn_type()
+                actions = random_actions(core)
+                start = time.perf_counter()
+                _, _, done, _ = core.step(actions)
+                elapsed = time.perf_counter() - start
+                total += elapsed
+                per_turn.setdefault(turn.value if turn else "none", []).append(elapsed)
+
+                for name, samples in observation_samples.items():
+                    samples.append(_time_observations(core, name))
+
+                if done:
+                    chunks, seconds = gba_proxy.chunks, gba_proxy.seconds
+                    core.reset()
+                    gba_proxy.chunks, gba_proxy.seconds = chunks, seconds
+        finally:
+            core.battle_core.gba = gba_proxy._gba
+
+        emulation_seconds = gba_proxy.seconds or float("nan")
+        return {
+            "step": {turn: summarize(samples) for turn, samples in per_turn.items()},
+            "steps_per_s": self.steps / total if total else float("nan"),
+            "emulation": {
+                "chunks_per_s": gba_proxy.chunks / emulation_seconds,
+                # Upper bound, the last chunk of a turn stops early on the stop
+                "cycles_per_s": gba_proxy.chunks
+                * core.battle_core.steps
+                / emulation_seconds,
+                "share_of_step_time": gba_proxy.seconds / total if total else 0.0,
+            },
+            **{
+                name: summarize(samples)
+                for name, samples in observation_samples.items()
+            },
+        }
+
+    def bench_scaling(self, max_workers: int) -> Dict[str, Dict[str, float]]:
+        """Aggregate steps/s with 1, 2, 4 ... max_workers worker processes"""
+        results = {}
+        counts = sorted(
+            {min(2**i, max_workers) for i in range(max_workers.bit_length() + 1)}
+        )
+        ctx = multiprocessing.get_context()
+        for count in counts:
+            barrier = ctx.Barrier(count + 1)
+            queue = ctx.Queue()
+            workers = [
+                ctx.Process(
+                    target=_scaling_worker,
+                    args=(self._worker_args(), barrier, queue, seed),
+                )
+                for seed in range(count)
+            ]
+            for worker in workers:
+                worker.start()
+            barrier.wait()  # every worker is constructed and reset
+            start = time.perf_counter()
+            done_steps = sum(queue.get() for _ in workers)
+            wall = time.perf_counter() - start
+            for worker in workers:
+                worker.join()
+            results[str(count)] = {
+                "steps_per_s": done_steps / wall,
+                "steps_per_s_per_worker": done_steps / wall / count,
+            }
+        return results
+
+    def _worker_args(self) -> Tuple[str, str, str, int]:
+        return (self.rom_path, self.bios_path, self.map_path, self.steps)
+
+    def run(self, max_workers: int = 1) -> Dict[str, Any]:
+        """Run every case and return the JSON-serialisable report"""
+        results: Dict[str, Any] = {"construction": self.bench_construction()}
+        core = self._make_core()
+        results["reset"] = self.bench_reset(core)
+        results["savestate_load"] = self.bench_savestate_load(core)
+        results.update(self.bench_steps(core))
+        if max_workers > 0:
+            results["scaling"] = self.bench_scaling(max_workers)
+        return {
+            "meta": {
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "steps": self.steps,
+                "resets": self.resets,
+                "timestamp": time.time(),
+            },
+            "results": results,
+        }
+
+
+def _time_observations(core, case: str) -> float:
+    """Time get_observations() on the path named by case, see the module doc"""
+    observation_manager = core.observation_manager
+    if case == "observation_decode":
+        # Also empties the history, which the benchmark core does not keep
+        observation_manager.reset()
+    if case != "observation_cached":
+        core.battle_core.memory_watch.invalidate()
+    start = time.perf_counter()
+    observation_manager.get_observations()
+    return time.perf_counter() - start
+
+
+def _scaling_worker(args, barrier, queue, seed):
+    rom_path, bios_path, map_path, steps = args
+    from .pokemon_rl_core import PokemonRLCore
+
+    random.seed(seed)
+    core = PokemonRLCore(rom_path, bios_path, map_path)
+    core.reset()
+    barrier.wait()
+    for _ in range(steps):
+        _, _, done, _ = core.step(random_actions(core))
+        if done:
+            core.reset()
+    queue.put(steps)
+
+
+def flatten_metrics(report: Dict[str, Any]) -> Dict[str, Tuple[float, bool]]:
+    """
+    Flatten a report into {metric: (value, higher_is_better)}.
+    Latency summaries contribute their median.
+    """
+    metrics = {}
+
+    def visit(prefix: str, node: Any):
+        if isinstance(node, dict) and "count" in node:
+            if node.get("count"):
+                metrics[f"{prefix}.p50"] = (node["p50"], False)
+        elif isinstance(node, dict):
+            for key, value in node.items():
+                visit(f"{prefix}.{key}" if prefix else key, value)
+        elif isinstance(node, (int, float)) and not math.isnan(node):
+            higher_is_better = prefix.rsplit(".", 1)[-1].endswith("_per_s")
+            if higher_is_better:
+                metrics[prefix] = (float(node), True)
+
+    visit("", report["results"])
+    return metrics
+
+
+def compare(
+    report: Dict[str, Any], baseline: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD
+) -> List[str]:
+    """Return a description of every metric that regressed past the threshold"""
+    current = flatten_metrics(report)
+    regressions = []
+    for name, (base_value, higher_is_better) in flatten_metrics(baseline).items():
+        if name not in current or base_value == 0:
+            continue
+        value = current[name][0]
+        change = (value - base_value) / base_value
+        regressed = change < -threshold if higher_is_better else change > threshold
+        if regressed:
+            regressions.append(
+                f"{name}: {base_value:.6g} -> {value:.6g} ({change:+.1%})"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--resets", type=int, default=20)
+    parser.add_argument("--constructions", type=int, default=3)
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="max worker processes for the scaling case, 0 to skip it",
+    )
+    parser.add_argument("--output", help="write the JSON report to this path")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument(
+        "--update-baseline", action="store_true",
+        help="overwrite --baseline with this run",
+    )
+    args = parser.parse_args(argv)
+
+    report = Benchmark(
+        steps=args.steps, resets=args.resets, constructions=args.constructions
+    ).run(max_workers=args.workers)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(text)
+    elif args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
 
 if __name__ == "__main__":
-    benchmark = Benchmark()
-    benchmark.run()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Curriculum resets from a pool of mid-battle snapshots.
+
+    pool = StatePool(capacity=512, strategy="rarity")
+    observations = core.reset(state_pool=pool)
+
+While an episode started with a pool runs, the core adds a snapshot to it
+every `collect_every` decision points. Later resets start from a sampled
+snapshot with probability `reset_probability`, from a fresh battle
+otherwise, so late game situations are trained on as often as openings.
+"""
+
+from pkmn_rl_arena.data.pokemon_data import TEAM_SIZE
+from .save_state import AnySnapshot
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+STRATEGIES = ("uniform", "recency", "rarity", "loss")
+
+
+def situation_key(usable_player: int, usable_enemy: int) -> int:
+    """Rarity bucket of a snapshot, from the usable mon count of each side"""
+    return usable_player * (TEAM_SIZE + 1) + usable_enemy
+
+
+class StatePool:
+    """
+    Bounded pool of snapshots sampled with vectorized weights.
+
+    Per entry metadata (insertion time, rarity key, size, policy loss) lives
+    in preallocated numpy arrays indexed by slot, so weights are computed
+    in one pass over the pool. When the pool is over capacity or max_bytes,
+    the oldest entry of the most populated rarity bucket is evicted.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 512,
+        max_bytes: Optional[int] = None,
+        strategy: str = "uniform",
+        reset_probability: float = 0.5,
+        collect_every: int = 10,
+        recency_half_life: float = 1000.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            capacity: Maximum number of snapshots
+            max_bytes: Maximum total size of the snapshots, unbounded if None
+            strategy: Sampling weights, one of "uniform", "recency" (newer
+                snapshots first), "rarity" (inverse population of the
+                snapshot situation) or "loss" (policy loss set with
+                update_loss)
+            reset_probability: Probability that a reset starts from the pool
+            collect_every: Decision points between two collected snapshots
+            recency_half_life: Insertions after which a snapshot weight
+                halves with the "recency" strategy
+            seed: Seed of the sampling generator
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown sampling strategy: {strategy}")
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.strategy = strategy
+        self.reset_probability = reset_probability
+        self.collect_every = collect_every
+        self.recency_half_life = recency_half_life
+        self.rng = np.random.default_rng(seed)
+
+        self.snapshots: List[Optional[AnySnapshot]] = [None] * capacity
+        self.used = np.zeros(capacity, dtype=bool)
+        self.added_at = np.zeros(capacity, dtype=np.int64)
+        self.keys = np.zeros(capacity, dtype=np.int64)
+        self.sizes = np.zeros(capacity, dtype=np.int64)
+        self.losses = np.full(capacity, np.nan, dtype=np.float64)
+        self.total_bytes = 0
+        self.insertions = 0
+
+    def __len__(self) -> int:
+        return int(self.used.sum())
+
+    def add(self, snapshot: AnySnapshot, key: int = 0) -> int:
+        """Add a snapshot in rarity bucket key, returns its slot"""
+        while self.used.all() or (
+            self.max_bytes is not None
+            and len(self)
+            and self.total_bytes + snapshot.nbytes > self.max_bytes
+        ):
+            self._evict()
+        slot = int(np.argmin(self.used))
+        self.snapshots[slot] = snapshot
+        self.used[slot] = True
+        self.added_at[slot] = self.insertions
+        self.keys[slot] = key
+        self.sizes[slot] = snapshot.nbytes
+        self.losses[slot] = np.nan
+        self.total_bytes += snapshot.nbytes
+        self.insertions += 1
+        return slot
+
+    def _evict(self):
+        """Drop the oldest snapshot of the most populated bucket"""
+        slots = np.flatnonzero(self.used)
+        keys, inverse, counts = np.unique(
+            self.keys[slots], return_inverse=True, return_counts=True
+        )
+        crowded = slots[inverse == np.argmax(counts)]
+        self.remove(int(crowded[np.argmin(self.added_at[crowded])]))
+
+    def remove(self, slot: int):
+        """Drop the snapshot of a slot"""
+        if self.used[slot]:
+            self.total_bytes -= int(self.sizes[slot])
+            self.used[slot] = False
+            self.snapshots[slot] = None
+
+    def weights(self) -> np.ndarray:
+        """Sampling probability of every slot (0 for empty slots)"""
+        used = self.used
+        weights = np.zeros(self.capacity, dtype=np.float64)
+        if self.strategy == "uniform":
+            weights[used] = 1.0
+        elif self.strategy == "recency":
+            age = self.insertions - self.added_at[used]
+            weights[used] = np.exp2(-age / self.recency_half_life)
+        elif self.strategy == "rarity":
+            _, inverse, counts = np.unique(
+                self.keys[used], return_inverse=True, return_counts=True
+            )
+            weights[used] = 1.0 / counts[inverse]
+        else:
+            losses = self.losses[used]
+            known = ~np.isnan(losses)
+            # Unscored snapshots are sampled like an average one
+            default = losses[known].mean() if known.any() else 1.0
+            weights[used] = np.where(known, losses, default) + 1e-6
+        total = weights.sum()
+        return weights / total if total > 0 else weights
+
+    def sample(self) -> Optional[AnySnapshot]:
+        """Draw a snapshot according to the strategy, None if the pool is empty"""
+        index = self.sample_slot()
+        return None if index is None else self.snapshots[index]
+
+    def sample_slot(self) -> Optional[int]:
+        """Draw the slot of a snapshot, None if the pool is empty"""
+        if not self.used.any():
+            return None
+        return int(self.rng.choice(self.capacity, p=self.weights()))
+
+    def should_reset_from_pool(self) -> bool:
+        """Draw whether the next reset starts from a pooled snapshot"""
+        return bool(self.used.any()) and self.rng.random() < self.reset_probability
+
+    def update_loss(self, slots: Sequence[int], losses: Sequence[float]):
+        """Set the policy loss observed from snapshots, for the "loss" strategy"""
+        self.losses[np.asarray(slots, dtype=np.int64)] = losses
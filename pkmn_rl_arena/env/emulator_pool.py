@@ -0,0 +1,104 @@
+from .fork_server import ForkServer
+
+import logging
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# func(core, item) -> result, must be importable (pickled by reference)
+PoolFunction = Callable[[Any, Any], Any]
+
+
+class EmulatorPool:
+    """
+    Pool of forked PokemonRLCore workers running func(core, item) calls.
+
+    Every worker owns an emulator booted once by the ForkServer. Items are
+    sent over one Pipe per worker and dispatched to whichever worker is
+    idle, so a slow item does not hold back the others. Workers usually
+    restore a snapshot carried by the item before emulating.
+    """
+
+    def __init__(
+        self, num_workers: int, server: Optional[ForkServer] = None, **server_kwargs
+    ):
+        """
+        Args:
+            num_workers: Number of worker processes
+            server: Fork server to start workers from, built from
+                server_kwargs if None
+            server_kwargs: ForkServer arguments
+        """
+        self.server = server or ForkServer(**server_kwargs)
+        self.connections: List[Connection] = []
+        for _ in range(num_workers):
+            parent_conn, child_conn = self.server.ctx.Pipe()
+            self.server.spawn(_pool_worker, 1, args=(child_conn,))
+            child_conn.close()
+            self.connections.append(parent_conn)
+
+    @property
+    def num_workers(self) -> int:
+        return len(self.connections)
+
+    def map(self, func: PoolFunction, items: Iterable[Any]) -> List[Any]:
+        """Run func(core, item) for every item, results in item order"""
+        pending = list(enumerate(items))
+        pending.reverse()
+        results: List[Any] = [None] * len(pending)
+        idle = list(self.connections)
+        busy = []
+        error = None
+        while (pending and error is None) or busy:
+            while pending and idle and error is None:
+                conn = idle.pop()
+                conn.send((*pending.pop(), func))
+                busy.append(conn)
+            for conn in wait(busy):
+                index, ok, result = conn.recv()
+                busy.remove(conn)
+                idle.append(conn)
+                if not ok and error is None:
+                    error = f"Pool item {index} failed: {result}"
+                results[index] = result
+        # Raised once every busy worker has replied, so that no stale result
+        # is left in a pipe for the next map call
+        if error is not None:
+            raise RuntimeError(error)
+        return results
+
+    def close(self):
+        """Stop the workers"""
+        for conn in self.connections:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        self.server.join(timeout=5)
+        self.server.terminate()
+        for conn in self.connections:
+            conn.close()
+        self.connections = []
+
+    def __enter__(self) -> "EmulatorPool":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _pool_worker(core, worker_id: int, conn: Connection):
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        index, item, func = message
+        try:
+            conn.send((index, True, func(core, item)))
+        except Exception as e:
+            logger.exception("Pool worker %d failed on item %d", worker_id, index)
+            conn.send((index, False, repr(e)))
@@ -0,0 +1,156 @@
+from pkmn_rl_arena import ROM_PATH, BIOS_PATH, MAP_PATH, POKEMON_CSV_PATH
+from pkmn_rl_arena.data.learnsets import get_learnsets
+from .battle_state import TurnType
+from .pokemon_rl_core import PokemonRLCore
+
+import importlib
+import logging
+import multiprocessing
+import multiprocessing.util
+import random
+import sys
+from typing import Any, Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BOOT_STATE = "state_before_create_team"
+
+# Seconds a terminated worker gets to exit before it is killed
+STOP_TIMEOUT = 5.0
+
+# Imported once in the server so forked workers never pay for them
+DEFAULT_PRELOAD_MODULES = (
+    "pandas",
+    "pkmn_rl_arena.data.pokemon_data",
+    "pkmn_rl_arena.env.observation",
+)
+
+WorkerTarget = Callable[..., Any]
+
+
+class ForkServer:
+    """
+    Starts PokemonRLCore worker processes from one booted emulator.
+
+    The server builds a single core (map parsing, bios/rom load, boot up to the
+    create team stop), saves the boot savestate and imports everything workers
+    need. Workers are then forked and inherit the booted core copy-on-write,
+    so starting N workers costs about as much as starting one.
+
+    Workers are not daemonic, so they can start processes of their own, e.g.
+    an EmulatorPool inside a VectorEnv worker. The workers still running when
+    the interpreter exits are terminated before multiprocessing joins them.
+
+    Workers must be started before the server spawns any thread. Requires the
+    "fork" start method (Linux, macOS with care).
+    """
+
+    def __init__(
+        self,
+        rom_path: str = ROM_PATH,
+        bios_path: str = BIOS_PATH,
+        map_path: str = MAP_PATH,
+        preload_modules: Iterable[str] = DEFAULT_PRELOAD_MODULES,
+        base_seed: Optional[int] = None,
+        **core_kwargs,
+    ):
+        """
+        Args:
+            rom_path: Path to the rom elf
+            bios_path: Path to the gba bios
+            map_path: Path to the rom map file
+            preload_modules: Modules imported in the server before forking
+            base_seed: Worker i seeds `random` with base_seed + i, defaults
+                to a seed drawn from the server's `random`
+            core_kwargs: Extra PokemonRLCore arguments
+        """
+        self.ctx = multiprocessing.get_context("fork")
+        for module in preload_modules:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                logger.warning("Could not preload %s", module)
+        get_learnsets(POKEMON_CSV_PATH)
+
+        self.core = PokemonRLCore(rom_path, bios_path, map_path, **core_kwargs)
+        self._boot()
+        self.base_seed = (
+            base_seed if base_seed is not None else random.randrange(2**31)
+        )
+        self.workers: List[multiprocessing.Process] = []
+        # Runs before multiprocessing joins the non daemonic children at exit
+        multiprocessing.util.Finalize(
+            None, _stop_workers, args=(self.workers,), exitpriority=10
+        )
+
+    def _boot(self):
+        """Run the server core to the create team stop and save the boot state"""
+        turn = self.core.turn_manager.advance_to_next_turn()
+        if turn != TurnType.CREATE_TEAM:
+            raise RuntimeError("Expected to boot to the CREATE_TEAM turn")
+        if not self.core.save_state_manager.has_state(BOOT_STATE):
+            self.core.save_state_manager.save_state(BOOT_STATE)
+
+    def spawn(
+        self, target: WorkerTarget, num_workers: int, args: tuple = ()
+    ) -> List[multiprocessing.Process]:
+        """
+        Fork num_workers processes running target(core, worker_id, *args).
+
+        Each worker gets its own copy of the booted core, reseeded so that
+        workers do not sample the same teams.
+        """
+        start_id = len(self.workers)
+        processes = []
+        for worker_id in range(start_id, start_id + num_workers):
+            process = self.ctx.Process(
+                target=_worker_main,
+                args=(target, self.core, worker_id, self.base_seed + worker_id, args),
+                name=f"pkmn-worker-{worker_id}",
+            )
+            process.start()
+            processes.append(process)
+        self.workers.extend(processes)
+        return processes
+
+    def join(self, timeout: Optional[float] = None):
+        """Wait for every spawned worker"""
+        for process in self.workers:
+            process.join(timeout)
+
+    def terminate(self, timeout: float = STOP_TIMEOUT):
+        """
+        Stop every worker still running, killing those that did not exit
+        within timeout seconds of SIGTERM.
+        """
+        _stop_workers(self.workers, timeout)
+
+    def __enter__(self) -> "ForkServer":
+        return self
+
+    def __exit__(self, *exc):
+        self.terminate()
+
+
+def _stop_workers(
+    workers: List[multiprocessing.Process], timeout: float = STOP_TIMEOUT
+):
+    for process in workers:
+        if process.is_alive():
+            process.terminate()
+    for process in workers:
+        process.join(timeout)
+        if process.is_alive():
+            logger.warning("Killing worker %s stuck after SIGTERM", process.name)
+            process.kill()
+            process.join()
+
+
+def _worker_main(
+    target: WorkerTarget, core: PokemonRLCore, worker_id: int, seed: int, args: tuple
+):
+    random.seed(seed)
+    numpy = sys.modules.get("numpy")
+    if numpy is not None:
+        numpy.random.seed(seed % 2**32)
+    target(core, worker_id, *args)
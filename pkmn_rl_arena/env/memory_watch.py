@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class WatchedRange:
+    """An emulator memory range whose last read value is kept"""
+
+    addr: int
+    count: int
+    word_size: int = 4
+    handle: Optional[int] = None  # id of the range in the emulator, if native
+    cache: Optional[List[int]] = None
+
+
+class MemoryWatch:
+    """
+    Decode cache key for watched memory ranges: tells callers whether a range
+    changed since their last read, so they can skip decoding it again.
+
+    The rustboyadvance_py binding has no write tracking, so every read() does
+    one bulk read of the range and compares it with the previous read (a
+    list comparison in C). That costs as much memory access as a plain read;
+    the saving is the decode that callers skip, see the observation_decode /
+    observation_cached cases of env/benchmark.py.
+
+    A binding exposing watch_range / take_dirty is used when present: clean
+    ranges are then answered from the cache without touching emulator memory.
+    """
+
+    def __init__(self, gba):
+        self.gba = gba
+        self.native = hasattr(gba, "watch_range") and hasattr(gba, "take_dirty")
+        self.ranges: Dict[str, WatchedRange] = {}
+
+    def watch(self, name: str, addr: int, count: int, word_size: int = 4):
+        """Register (or re-register) a range of count words of word_size bytes"""
+        if word_size not in (2, 4):
+            raise ValueError(f"Unsupported word size: {word_size}")
+        watched = WatchedRange(addr, count, word_size)
+        if self.native:
+            watched.handle = self.gba.watch_range(addr, count * word_size)
+        self.ranges[name] = watched
+
+    def _read(self, watched: WatchedRange) -> List[int]:
+        if watched.word_size == 4:
+            return self.gba.read_u32_list(watched.addr, watched.count)
+        return self.gba.read_u16_list(watched.addr, watched.count)
+
+    def read(self, name: str) -> Tuple[List[int], bool]:
+        """
+        Get the content of a watched range and whether it changed since the
+        previous call. The returned list must not be modified.
+        """
+        watched = self.ranges[name]
+        if self.native:
+            # Always take the flag, so that a first read clears it as well
+            dirty = self.gba.take_dirty(watched.handle)
+            if watched.cache is not None and not dirty:
+                return watched.cache, False
+            data = self._read(watched)
+        else:
+            data = self._read(watched)
+            if watched.cache is not None and data == watched.cache:
+                return watched.cache, False
+        watched.cache = data
+        return data, True
+
+    def invalidate(self, name: Optional[str] = None):
+        """Forget cached content so the next read reports the range as dirty"""
+        targets = self.ranges.values() if name is None else [self.ranges[name]]
+        for watched in targets:
+            watched.cache = None
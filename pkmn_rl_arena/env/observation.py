@@ -1,32 +1,160 @@
 from pkmn_rl_arena.data import pokemon_data
 from .battle_core import BattleCore
 
-from typing import Dict
+import numpy as np
+from typing import TYPE_CHECKING, Dict, List, Optional
 
-import pandas as pd
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Watched memory range holding the team dump of each agent
+TEAM_RANGES = {"player": "monDataPlayer", "enemy": "monDataEnemy"}
 
 
 class ObservationManager:
     """
     Manages extraction and formatting of observations from the battle state.
+
+    Team dumps are read through the battle core memory watch, which still
+    reads the whole dump on every call with the current binding. An unchanged
+    dump is answered from the cache; otherwise it is compared slot by slot
+    with the previous read and only mon slots whose 35 word block changed are
+    decoded and encoded again. The slots that changed during the
+    last refresh are exposed as a per-slot mask. Returned DataFrames and
+    arrays are shared with this cache and must not be modified in place.
+
+    With history > 0, the encoded features of the last `history` turns are
+    kept in a preallocated ring buffer, see push_history / get_history.
     """
 
-    def __init__(self, battle_core: BattleCore):
+    def __init__(self, battle_core: BattleCore, history: int = 0):
         self.battle_core = battle_core
+        self.history = history
+        self._raw: Dict[str, Optional[List[int]]] = {}
+        self._rows: Dict[str, List[Optional[dict]]] = {}
+        self._frames: Dict[str, Optional["pd.DataFrame"]] = {}
+        self.features: Dict[str, np.ndarray] = {
+            agent: np.zeros(
+                (pokemon_data.TEAM_SIZE, pokemon_data.MON_FEATURE_SIZE),
+                dtype=np.float32,
+            )
+            for agent in TEAM_RANGES
+        }
+        self.changed: Dict[str, np.ndarray] = {
+            agent: np.zeros(pokemon_data.TEAM_SIZE, dtype=bool) for agent in TEAM_RANGES
+        }
+        if history > 0:
+            # (turn, agent, slot, feature), written at _head then _head moves on
+            self._history = np.zeros(
+                (
+                    history,
+                    len(TEAM_RANGES),
+                    pokemon_data.TEAM_SIZE,
+                    pokemon_data.MON_FEATURE_SIZE,
+                ),
+                dtype=np.float32,
+            )
+            # Row i lists the buffer indices oldest first when _head == i
+            steps = np.arange(history)
+            self._history_orders = (steps[:, None] + steps[None, :]) % history
+        self._head = 0
+        self.history_length = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Forget previous reads, the next refresh re-decodes every slot.
+        Also empties the history.
+        """
+        self.clear_history()
+        for agent in TEAM_RANGES:
+            self._raw[agent] = None
+            self._rows[agent] = [None] * pokemon_data.TEAM_SIZE
+            self._frames[agent] = None
+            self.features[agent].fill(0.0)
+            self.changed[agent].fill(False)
+
+    def _refresh_team(self, agent: str):
+        """Re-decode the slots of a team whose raw block changed"""
+        changed = self.changed[agent]
+        data, dirty = self.battle_core.read_watched(TEAM_RANGES[agent])
+        if not dirty and self._frames[agent] is not None:
+            changed.fill(False)
+            return
+
+        previous = self._raw[agent]
+        rows = self._rows[agent]
+        features = self.features[agent]
+        size = pokemon_data.MON_DUMP_SIZE
+        for slot in range(pokemon_data.TEAM_SIZE):
+            start = slot * size
+            changed[slot] = (
+                previous is None
+                or rows[slot] is None
+                or previous[start : start + size] != data[start : start + size]
+            )
+            if changed[slot]:
+                rows[slot] = pokemon_data.mon_dump_to_dict(data, start)
+                pokemon_data.encode_mon(data, start, features[slot])
+
+        self._raw[agent] = data
+        if changed.any() or self._frames[agent] is None:
+            self._frames[agent] = pokemon_data.team_rows_to_pandas(rows)
+
+    def get_observations(self) -> Dict[str, "pd.DataFrame"]:
+        """Refresh from emulator memory and get observations for both agents"""
+        for agent in TEAM_RANGES:
+            self._refresh_team(agent)
+        return {agent: self._frames[agent] for agent in TEAM_RANGES}
+
+    def get_raw_observations(self) -> Dict[str, List[int]]:
+        """
+        Get the raw team dumps (210 u32) of both agents, as of the last
+        get_observations call.
+        """
+        return {agent: self._raw[agent] for agent in TEAM_RANGES}
+
+    def get_encoded_observations(self) -> Dict[str, np.ndarray]:
+        """
+        Get the (TEAM_SIZE, MON_FEATURE_SIZE) float32 features of both agents,
+        as of the last get_observations call.
+        """
+        return self.features
 
-    def get_observations(self) -> Dict[str, pd.DataFrame]:
-        """Get observations for both agents"""
-        observations = {}
+    def get_changed_mask(self) -> Dict[str, np.ndarray]:
+        """
+        Get the (TEAM_SIZE,) bool mask of mon slots whose raw data changed
+        during the last get_observations call, per agent.
+        """
+        return self.changed
 
-        # Get team data for both agents
-        player_data = self.battle_core.read_team_data("player")
-        enemy_data = self.battle_core.read_team_data("enemy")
+    def clear_history(self):
+        """Empty the history, older turns read back as zeros"""
+        if self.history > 0:
+            self._history.fill(0.0)
+        self._head = 0
+        self.history_length = 0
 
-        # Convert to pandas DataFrames
-        observations["player"] = pokemon_data.to_pandas_team_dump_data(player_data)
-        observations["enemy"] = pokemon_data.to_pandas_team_dump_data(enemy_data)
+    def push_history(self):
+        """Append the features of the last refresh to the history"""
+        if self.history <= 0:
+            return
+        frame = self._history[self._head]
+        for i, agent in enumerate(TEAM_RANGES):
+            frame[i] = self.features[agent]
+        self._head = (self._head + 1) % self.history
+        self.history_length = min(self.history_length + 1, self.history)
 
-        return observations
+    def get_history(self) -> np.ndarray:
+        """
+        Get the last `history` turns as a (history, 2, TEAM_SIZE,
+        MON_FEATURE_SIZE) float32 array ordered oldest first, agents in
+        (player, enemy) order. Turns before the start of the episode are
+        zeros. The array is a fresh copy built with a single index gather.
+        """
+        if self.history <= 0:
+            raise RuntimeError("Observation history is disabled (history=0)")
+        return self._history[self._history_orders[self._head]]
 
     def get_observation_space_size(self) -> int:
         """Get the size of the observation space (to be implemented)"""
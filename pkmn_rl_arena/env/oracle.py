@@ -0,0 +1,118 @@
+"""
+One-turn outcomes of every legal action pair, computed on an EmulatorPool.
+
+    with EmulatorPool(8) as pool:
+        oracle = OneTurnOracle(pool)
+        outcomes, valid = oracle.query_core(core)
+        # outcomes[p, e] holds the team dumps after the player played p and
+        # the enemy played e, where valid[p, e]
+"""
+
+from pkmn_rl_arena.data.pokemon_data import MON_DUMP_SIZE, TEAM_SIZE
+from .battle_state import TurnType
+from .emulator_pool import EmulatorPool
+from .save_state import Snapshot
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+NUM_ACTIONS = 10
+TEAM_DUMP_WORDS = MON_DUMP_SIZE * TEAM_SIZE
+
+
+def play_one_turn(core, item: Tuple[Snapshot, List[Dict[str, int]]]) -> List[tuple]:
+    """
+    Pool function: for every actions dict, restore the snapshot, play the
+    turn and read both team dumps at the next stop.
+    """
+    snapshot, action_list = item
+    results = []
+    for actions in action_list:
+        core.turn_manager.state = core.save_state_manager.restore(snapshot)
+        core.turn_manager.process_turn(actions)
+        core.turn_manager.advance_to_next_turn()
+        results.append(
+            (
+                core.battle_core.read_team_data("player"),
+                core.battle_core.read_team_data("enemy"),
+            )
+        )
+    return results
+
+
+class OneTurnOracle:
+    """
+    Fans the up to 10 x 10 action pairs of a decision point out over the
+    pool workers, each restoring the same snapshot.
+
+    Pairs are split into one batch per worker so the snapshot is sent once
+    per worker and query. At PLAYER and ENEMY turns only one agent acts, its
+    outcomes are broadcast along the other agent's axis.
+    """
+
+    def __init__(self, pool: EmulatorPool):
+        self.pool = pool
+
+    def query(
+        self,
+        snapshot: Snapshot,
+        legal_player: List[int],
+        legal_enemy: List[int],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            snapshot: Decision point to branch from
+            legal_player: Legal actions of the player (ignored at ENEMY turns)
+            legal_enemy: Legal actions of the enemy (ignored at PLAYER turns)
+
+        Returns:
+            outcomes: (10, 10, 2, 210) uint32 team dumps (player, enemy)
+                after the turn, indexed by player then enemy action
+            valid: (10, 10) bool mask of the pairs in outcomes
+        """
+        turn = snapshot.battle_state.current_turn
+        if turn == TurnType.GENERAL:
+            pairs = [(p, e) for p in legal_player for e in legal_enemy]
+            action_list = [{"player": p, "enemy": e} for p, e in pairs]
+        elif turn == TurnType.PLAYER:
+            pairs = [(p, None) for p in legal_player]
+            action_list = [{"player": p} for p in legal_player]
+        elif turn == TurnType.ENEMY:
+            pairs = [(None, e) for e in legal_enemy]
+            action_list = [{"enemy": e} for e in legal_enemy]
+        else:
+            raise ValueError(f"No action to take at turn {turn}")
+
+        outcomes = np.zeros(
+            (NUM_ACTIONS, NUM_ACTIONS, 2, TEAM_DUMP_WORDS), dtype=np.uint32
+        )
+        valid = np.zeros((NUM_ACTIONS, NUM_ACTIONS), dtype=bool)
+        if not action_list:
+            return outcomes, valid
+
+        batches = np.array_split(
+            np.arange(len(action_list)), min(self.pool.num_workers, len(action_list))
+        )
+        results = self.pool.map(
+            play_one_turn,
+            [(snapshot, [action_list[i] for i in batch]) for batch in batches],
+        )
+        flat = [outcome for batch_results in results for outcome in batch_results]
+        for (p, e), (player_dump, enemy_dump) in zip(pairs, flat):
+            # None indexes the whole axis of the agent that does not act
+            rows = slice(None) if p is None else p
+            cols = slice(None) if e is None else e
+            outcomes[rows, cols, 0] = player_dump
+            outcomes[rows, cols, 1] = enemy_dump
+            valid[rows, cols] = True
+        return outcomes, valid
+
+    def query_core(self, core) -> Tuple[np.ndarray, np.ndarray]:
+        """Query the current decision point of a PokemonRLCore"""
+        snapshot = core.save_state_manager.snapshot(core.turn_manager.state)
+        return self.query(
+            snapshot,
+            core.action_manager.get_legal_actions("player"),
+            core.action_manager.get_legal_actions("enemy"),
+        )
@@ -0,0 +1,94 @@
+import numpy as np
+
+SCREEN_WIDTH = 240
+SCREEN_HEIGHT = 160
+
+# ITU-R BT.601 luma weights scaled by 256
+GRAY_WEIGHTS = (77, 150, 29)
+
+
+def supports_buffer_fill(gba) -> bool:
+    """Check whether the emulator binding can write the frame into a numpy buffer"""
+    return hasattr(gba, "fill_frame_buffer")
+
+
+class FrameProcessor:
+    """
+    Converts the emulator frame buffer to pixel observations.
+
+    Every buffer is allocated once. With a binding exposing
+    fill_frame_buffer(buffer), the BGRA frame is written straight into a
+    preallocated uint8 array, otherwise the list returned by get_frame_buffer()
+    is copied into it in one conversion. Channel swizzling is a strided view,
+    downsampling averages d x d blocks and grayscale uses integer luma weights,
+    all in vectorized numpy.
+
+    The array returned by capture() is reused by the next capture, copy it to
+    keep it.
+    """
+
+    def __init__(self, grayscale: bool = False, downsample: int = 1):
+        """
+        Args:
+            grayscale: Output (H, W, 1) luma instead of (H, W, 3) RGB
+            downsample: Block size averaged per output pixel, 1, 2 or 4
+        """
+        if downsample not in (1, 2, 4):
+            raise ValueError(f"Unsupported downsample factor: {downsample}")
+        self.grayscale = grayscale
+        self.downsample = downsample
+        self.height = SCREEN_HEIGHT // downsample
+        self.width = SCREEN_WIDTH // downsample
+        self.channels = 1 if grayscale else 3
+
+        self._bgra = np.zeros((SCREEN_HEIGHT, SCREEN_WIDTH, 4), dtype=np.uint8)
+        self._words = self._bgra.reshape(-1).view(np.uint32)
+        # Strided view, no copy: B, G, R -> R, G, B
+        self._rgb = self._bgra[..., 2::-1]
+        self._acc = np.zeros((self.height, self.width, 3), dtype=np.uint16)
+        self._luma = np.zeros((self.height, self.width), dtype=np.uint16)
+        self.frame = np.zeros((self.height, self.width, self.channels), dtype=np.uint8)
+
+    @property
+    def shape(self):
+        """Shape of the frames returned by capture()"""
+        return self.frame.shape
+
+    def read(self, gba) -> np.ndarray:
+        """Copy the current emulator frame into the BGRA buffer and return it"""
+        if supports_buffer_fill(gba):
+            gba.fill_frame_buffer(self._bgra)
+        else:
+            self._words[:] = gba.get_frame_buffer()
+        return self._bgra
+
+    def process(self) -> np.ndarray:
+        """Convert the BGRA buffer to the output format"""
+        d = self.downsample
+        if d == 1 and not self.grayscale:
+            self.frame[:] = self._rgb
+            return self.frame
+
+        if d == 1:
+            self._acc[:] = self._rgb
+        else:
+            self._acc.fill(0)
+            for dy in range(d):
+                for dx in range(d):
+                    self._acc += self._rgb[dy::d, dx::d]
+            self._acc //= d * d
+
+        if self.grayscale:
+            np.multiply(self._acc[..., 0], GRAY_WEIGHTS[0], out=self._luma)
+            self._luma += self._acc[..., 1] * GRAY_WEIGHTS[1]
+            self._luma += self._acc[..., 2] * GRAY_WEIGHTS[2]
+            self._luma >>= 8
+            self.frame[..., 0] = self._luma
+        else:
+            self.frame[:] = self._acc
+        return self.frame
+
+    def capture(self, gba) -> np.ndarray:
+        """Read the emulator frame and return it as a (H, W, C) uint8 array"""
+        self.read(gba)
+        return self.process()
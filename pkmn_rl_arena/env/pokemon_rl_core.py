@@ -1,26 +1,44 @@
 from pkmn_rl_arena import ROM_PATH, BIOS_PATH, MAP_PATH, POKEMON_CSV_PATH, SAVE_PATH
+from pkmn_rl_arena.data.learnsets import get_learnsets
+from pkmn_rl_arena.data.pokemon_data import count_usable_mons
 from .action import ActionManager
-from .battle_core import BattleCore
-from .battle_state import TurnType
+from .battle_core import RNG_SYMBOL, BattleCore
+from .battle_state import BattleState, TurnType
+from .curriculum import situation_key
+from .transposition import Transition, TranspositionTable, actions_key, battle_hash
 from .episode import EpisodeManager
 from .observation import ObservationManager
+from .profiler import StepProfiler, profiling_requested
 from .save_state import SaveStateManager
 from .turn_manager import TurnManager
 
+import logging
 import random
 import sys
 import os
-import pandas as pd
-from typing import Dict, Any, Tuple, Optional, List
-from rich.console import Console
-from rich.table import Table
+from typing import TYPE_CHECKING, Dict, Any, Tuple, Optional, List
 import shutil
 
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+    from .curriculum import StatePool
+    from .save_state import AnySnapshot
+
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
 sys.path.insert(0, project_root)
 
 random.seed(124)
 
+logger = logging.getLogger(__name__)
+
+# step() info entries that refer to live buffers, not cached by branch_step
+VOLATILE_INFO = ("changed_slots", "pixels", "episode_info")
+
+# Turns at which agents choose an action
+DECISION_TURNS = (TurnType.GENERAL, TurnType.PLAYER, TurnType.ENEMY)
+
 
 def clear_save_path():
     """Delete all files and folders inside SAVE_PATH."""
@@ -33,7 +51,7 @@ def clear_save_path():
                 elif os.path.isdir(file_path):
                     shutil.rmtree(file_path)
             except Exception as e:
-                print(f"Failed to delete {file_path}: {e}")
+                logger.warning("Failed to delete %s: %s", file_path, e)
 
 
 class PokemonRLCore:
@@ -43,24 +61,131 @@ class PokemonRLCore:
     """
 
     def __init__(
-        self, rom_path: str, bios_path: str, map_path: str, max_steps: int = 200000
+        self,
+        rom_path: str,
+        bios_path: str,
+        map_path: str,
+        max_steps: int = 200000,
+        early_termination: bool = False,
+        profile: Optional[bool] = None,
+        observation_history: int = 0,
+        pixel_observations: bool = False,
+        pixel_grayscale: bool = False,
+        pixel_downsample: int = 1,
+        transposition_capacity: int = 0,
+        slim_snapshots: bool = False,
     ):
+        """
+        Args:
+            rom_path: Path to the rom elf
+            bios_path: Path to the gba bios
+            map_path: Path to the rom map file
+            max_steps: Emulated cycles per run_to_next_stop chunk
+            early_termination: End the episode as soon as the team dumps show
+                that one side has no usable mon, instead of emulating faint
+                animations and end of battle screens up to stopHandleTurnEnd.
+                The next reset restores the savestate as usual.
+            profile: Attribute wall time per layer (emulation, memory,
+                observation, team sampling, turn logic, callback), see
+                env/profiler.py. Defaults to the PKMN_RL_PROFILE env var.
+            observation_history: Number of past turns of encoded observations
+                kept for frame stacking, see get_observation_history. 0
+                disables the history.
+            pixel_observations: Capture the screen at every decision point
+                (after reset and each step), returned in info["pixels"] and
+                by get_pixel_observation. Intermediate emulated frames are
+                never converted.
+            pixel_grayscale: Capture (H, W, 1) luma instead of RGB
+            pixel_downsample: Average 2x2 or 4x4 pixel blocks
+            transposition_capacity: Entries of the LRU transposition table
+                used by branch_step, 0 disables it
+            slim_snapshots: In memory snapshots (state pool, transposition
+                table) are stored as compressed deltas against the first
+                snapshot, see SlimSnapshot and validate_snapshots
+        """
         # Initialize core components
-        self.battle_core = BattleCore(rom_path, bios_path, map_path, max_steps)
-        self.observation_manager = ObservationManager(self.battle_core)
+        self.battle_core = BattleCore(
+            rom_path,
+            bios_path,
+            map_path,
+            max_steps,
+            early_termination=early_termination,
+        )
+        self.observation_manager = ObservationManager(
+            self.battle_core, history=observation_history
+        )
         self.action_manager = ActionManager(self.battle_core)
         self.turn_manager = TurnManager(self.battle_core, self.action_manager)
         self.episode_manager = EpisodeManager()
-        self.save_state_manager = SaveStateManager(self.battle_core)
+        self.save_state_manager = SaveStateManager(
+            self.battle_core, slim=slim_snapshots
+        )
 
         # Environment configuration
         self.agents = ["player", "enemy"]
         self.action_space_size = 10
 
+        self.frame_processor = None
+        self.pixels = None
+        if pixel_observations:
+            from .pixels import FrameProcessor
+
+            self.frame_processor = FrameProcessor(pixel_grayscale, pixel_downsample)
+
+        # Rendering, built on first use
+        self.renderer = None
+        self._renderer_csv_path = None
+        self.async_renderer = None
+        self.recorder = None
+
+        # Without the RNG in the hash, states differing only by their RNG
+        # would share cached transitions that play out differently
+        self._hash_has_rng = RNG_SYMBOL in self.battle_core.addrs
+        self._warned_hash_rng = False
+        if transposition_capacity > 0 and not self._hash_has_rng:
+            logger.warning(
+                "%s is not in the map file %s, transposition table disabled",
+                RNG_SYMBOL,
+                map_path,
+            )
+            transposition_capacity = 0
+        self.transposition_table = (
+            TranspositionTable(transposition_capacity)
+            if transposition_capacity > 0
+            else None
+        )
+
+        # Curriculum pool of the current episode, see reset()
+        self.state_pool = None
+        self.pool_slot = None
+
+        self.profiler = None
+        if profile or (profile is None and profiling_requested()):
+            self.profiler = StepProfiler.from_env()
+            self.profiler.attach(self)
+
     def reset(
-        self, save_state: Optional[str] = "state_before_create_team"
-    ) -> Dict[str, pd.DataFrame]:
-        """Reset the environment"""
+        self,
+        save_state: Optional[str] = "state_before_create_team",
+        state_pool: Optional["StatePool"] = None,
+    ) -> Dict[str, "pd.DataFrame"]:
+        """
+        Reset the environment.
+
+        Args:
+            save_state: Savestate the battle is created from
+            state_pool: Curriculum pool (env/curriculum.py). The episode may
+                start from one of its mid-battle snapshots, and snapshots of
+                this episode are collected into it.
+        """
+        self.state_pool = state_pool
+        self.pool_slot = None
+        if state_pool is not None and state_pool.should_reset_from_pool():
+            slot = state_pool.sample_slot()
+            observations = self.reset_from_snapshot(state_pool.snapshots[slot])
+            self.pool_slot = slot
+            return observations
+
         # Load save state if provided
         if save_state is not None and self.save_state_manager.has_state(save_state):
             loaded = self.save_state_manager.load_state(save_state)
@@ -75,6 +200,9 @@ class PokemonRLCore:
 
             self.save_state_manager.save_state(save_state)
 
+        if self.recorder is not None:
+            self.recorder.new_episode()
+
         # Reset managers
         self.episode_manager.reset_episode()
         self.turn_manager.state = BattleState()
@@ -96,12 +224,29 @@ class PokemonRLCore:
         # Advance to first turn
         self.turn_manager.advance_to_next_turn()
 
-        # Get initial observations
-        return self.observation_manager.get_observations()
+        return self._initial_observations()
+
+    def reset_from_snapshot(
+        self, snapshot: "AnySnapshot"
+    ) -> Dict[str, "pd.DataFrame"]:
+        """Start a new episode from an in memory snapshot of a decision point"""
+        self.turn_manager.state = self.save_state_manager.restore(snapshot)
+        if self.recorder is not None:
+            self.recorder.new_episode()
+        self.episode_manager.reset_episode()
+        return self._initial_observations()
+
+    def _initial_observations(self) -> Dict[str, "pd.DataFrame"]:
+        """Get the first observations of an episode, every slot reported as changed"""
+        self.observation_manager.reset()
+        observations = self.observation_manager.get_observations()
+        self.observation_manager.push_history()
+        self._capture_pixels()
+        return observations
 
     def step(
         self, actions: Dict[str, int]
-    ) -> Tuple[Dict[str, pd.DataFrame], Dict[str, float], bool, Dict[str, Any]]:
+    ) -> Tuple[Dict[str, "pd.DataFrame"], Dict[str, float], bool, Dict[str, Any]]:
         """
         Execute one step in the environment.
 
@@ -128,6 +273,8 @@ class PokemonRLCore:
 
         # Get new observations
         observations = self.observation_manager.get_observations()
+        self.observation_manager.push_history()
+        self._capture_pixels()
 
         # Calculate rewards (placeholder)
         rewards = {"player": 0.0, "enemy": 0.0}
@@ -139,15 +286,183 @@ class PokemonRLCore:
         # Update episode
         self.episode_manager.update_episode(rewards)
 
+        if (
+            self.state_pool is not None
+            and not episode_done
+            and self.episode_manager.episode_steps % self.state_pool.collect_every
+            == 0
+        ):
+            self._collect_state()
+
         # Prepare info
         info = {
             "current_turn": self.turn_manager.get_current_turn(),
             "battle_done": battle_done,
+            "outcome_decided_early": self.turn_manager.state.outcome_decided_early,
+            "changed_slots": self.observation_manager.get_changed_mask(),
+            "pixels": self.pixels,
+            "state_pool_slot": self.pool_slot,
             "episode_info": self.episode_manager.get_episode_info(),
         }
 
         return observations, rewards, episode_done, info
 
+    def state_hash(self) -> bytes:
+        """
+        Hash of the team dumps, game RNG and pending turn type, see
+        env/transposition.py. The RNG counts as 0 when the map file has no
+        gRngValue symbol, which is logged once.
+        """
+        if self._hash_has_rng:
+            rng = self.battle_core.get_rng()
+        else:
+            if not self._warned_hash_rng:
+                logger.warning(
+                    "%s is not in the map file, state hashes ignore the RNG",
+                    RNG_SYMBOL,
+                )
+                self._warned_hash_rng = True
+            rng = 0
+        turn = self.turn_manager.state.current_turn
+        return battle_hash(
+            self.battle_core.read_team_data("player"),
+            self.battle_core.read_team_data("enemy"),
+            rng,
+            turn.value if turn is not None else None,
+        )
+
+    def branch_step(
+        self, actions: Dict[str, int]
+    ) -> Tuple[Dict[str, "pd.DataFrame"], Dict[str, float], bool, Dict[str, Any]]:
+        """
+        step() through the transposition table: when the same actions were
+        already played from a state with the same hash, the resulting
+        snapshot is restored instead of emulating the turn again. Meant for
+        search over restored snapshots, info["transposition_hit"] tells
+        whether the turn was emulated.
+        """
+        table = self.transposition_table
+        if table is None:
+            observations, rewards, done, info = self.step(actions)
+            info["transposition_hit"] = False
+            return observations, rewards, done, info
+
+        key = (self.state_hash(), actions_key(actions))
+        cached = table.get(key)
+        if cached is None:
+            observations, rewards, done, info = self.step(actions)
+            table.put(
+                key,
+                Transition(
+                    self.save_state_manager.snapshot(self.turn_manager.state),
+                    dict(rewards),
+                    done,
+                    {k: v for k, v in info.items() if k not in VOLATILE_INFO},
+                ),
+            )
+            info["transposition_hit"] = False
+            return observations, rewards, done, info
+
+        self.turn_manager.state = self.save_state_manager.restore(cached.snapshot)
+        observations = self.observation_manager.get_observations()
+        self.observation_manager.push_history()
+        self._capture_pixels()
+        self.episode_manager.update_episode(cached.rewards)
+        info = dict(
+            cached.info,
+            changed_slots=self.observation_manager.get_changed_mask(),
+            pixels=self.pixels,
+            episode_info=self.episode_manager.get_episode_info(),
+            transposition_hit=True,
+        )
+        return observations, dict(cached.rewards), cached.done, info
+
+    def validate_snapshots(self, turns: int = 4) -> bool:
+        """
+        Check that restored snapshots continue exactly like the original run.
+
+        Plays up to turns decision points from here with the first legal
+        actions, taking a snapshot at each of them. Then restores every
+        snapshot, replays its actions up to the next decision point and
+        compares state hash, turn and legal actions with the original run.
+        The starting state is restored afterwards. Use it to validate slim
+        snapshots on a given rom.
+        """
+        manager = self.save_state_manager
+        start = manager.snapshot(self.turn_manager.state, slim=False)
+        # (snapshot, actions played from it, decision point they led to)
+        stops = []
+        for _ in range(turns):
+            if self.turn_manager.is_battle_done():
+                break
+            snapshot = manager.snapshot(self.turn_manager.state)
+            actions = self._first_legal_actions()
+            self._advance(actions)
+            stops.append((snapshot, actions, self._decision_point()))
+
+        valid = True
+        for snapshot, actions, expected in stops:
+            self.turn_manager.state = manager.restore(snapshot)
+            self._advance(actions)
+            if self._decision_point() != expected:
+                valid = False
+                break
+        self.turn_manager.state = manager.restore(start)
+        return valid
+
+    def _first_legal_actions(self) -> Dict[str, int]:
+        actions = {}
+        for agent in self.get_required_agents():
+            legal_actions = self.action_manager.get_legal_actions(agent)
+            if legal_actions:
+                actions[agent] = legal_actions[0]
+        return actions
+
+    def _advance(self, actions: Dict[str, int]):
+        """Emulate up to the next decision point, without episode bookkeeping"""
+        if self.turn_manager.process_turn(actions):
+            self.turn_manager.advance_to_next_turn()
+
+    def _decision_point(self) -> Tuple:
+        return (
+            self.state_hash(),
+            self.turn_manager.state.current_turn,
+            self.action_manager.get_legal_actions("player"),
+            self.action_manager.get_legal_actions("enemy"),
+        )
+
+    def get_observation_history(self) -> "np.ndarray":
+        """
+        Get the encoded observations of the last observation_history turns,
+        oldest first, shape (K, 2, 6, MON_FEATURE_SIZE).
+        """
+        return self.observation_manager.get_history()
+
+    def _collect_state(self):
+        """Add a snapshot of the current decision point to the state pool"""
+        if self.turn_manager.state.current_turn not in DECISION_TURNS:
+            return
+        raw = self.observation_manager.get_raw_observations()
+        key = situation_key(
+            count_usable_mons(raw["player"]), count_usable_mons(raw["enemy"])
+        )
+        self.state_pool.add(
+            self.save_state_manager.snapshot(self.turn_manager.state), key
+        )
+
+    def _capture_pixels(self):
+        """Convert the current screen if pixel observations are enabled"""
+        if self.frame_processor is not None:
+            self.pixels = self.frame_processor.capture(self.battle_core.gba)
+
+    def get_pixel_observation(self) -> Optional["np.ndarray"]:
+        """
+        Get the screen captured at the last decision point as a (H, W, C)
+        uint8 array, None when pixel observations are disabled. The array is
+        overwritten by the next step.
+        """
+        return self.pixels
+
     def get_current_turn_type(self) -> TurnType:
         """Get current turn type"""
         return self.turn_manager.get_current_turn()
@@ -171,9 +486,7 @@ class PokemonRLCore:
             List[int]: A flat list of integers representing the team in the format:
                     [id, level, move0, move1, move2, move3, ...]
         """
-        df = pd.read_csv(csv)
-        df = df[df["id"] != 0]
-        random_species_list = df.sample(n=6)
+        random_species_list = random.sample(get_learnsets(csv), 6)
 
         # Define item ranges
         item_range_1 = list(range(225, 178, -1))
@@ -181,110 +494,102 @@ class PokemonRLCore:
         all_items = item_range_1 + item_range_2
 
         team = []
-        for _, random_species in random_species_list.iterrows():
-            moves_list = eval(random_species["moves"])
+        for species_id, moves_list in random_species_list:
             random_moves = random.sample(moves_list, min(len(moves_list), 4))
             while len(random_moves) < 4:
                 random_moves.append(0)
             hp_percent = 100
             item_id = random.choice(all_items)
-            team.extend(
-                [random_species["id"], 10] + random_moves + [hp_percent, item_id]
-            )
+            team.extend([species_id, 10] + random_moves + [hp_percent, item_id])
 
-        print(f"Created random team: {team}")
+        logger.debug("Created random team: %s", team)
         return team
 
-    def render(self, observations: Dict[str, pd.DataFrame], csv_path: str):
+    def render(
+        self, observations: Dict[str, "pd.DataFrame"], csv_path: Optional[str] = None
+    ):
         """
         Render the current state of the battle using the rich library.
+        When a render thread is running, a copy of the observations is queued
+        instead and this returns immediately.
 
         Args:
             observations: Dictionary containing observation DataFrames for 'player' and 'enemy'.
-            csv_path: Path to the CSV file containing Pokémon data.
+            csv_path: Path to the CSV file containing Pokémon data (defaults to POKEMON_CSV_PATH).
+        """
+        if self.async_renderer is not None:
+            self.async_renderer.submit(observations)
+        else:
+            self._get_renderer(csv_path).render(observations)
+
+    def start_render_thread(
+        self, rate: float = 2.0, queue_size: int = 4, csv_path: Optional[str] = None
+    ):
         """
-        # Load Pokémon data from the CSV file
-        pokemon_data = pd.read_csv(csv_path)
+        Render on a background thread from now on.
 
-        # Initialize the rich console
-        console = Console()
+        Args:
+            rate: Maximum number of frames rendered per second
+            queue_size: Number of observation copies waiting to be rendered
+            csv_path: Path to the CSV file containing Pokémon data
+        """
+        from .render import AsyncBattleRenderer
 
-        # Create a table with two columns: Player and Enemy
-        table = Table(
-            title="Battle State", show_header=True, header_style="bold magenta"
+        self.stop_render_thread()
+        self.async_renderer = AsyncBattleRenderer(
+            self._get_renderer(csv_path), rate, queue_size
         )
-        table.add_column("Player", justify="center", style="cyan", no_wrap=True)
-        table.add_column("Enemy", justify="center", style="red", no_wrap=True)
-
-        # Helper function to get Pokémon name by ID
-        def get_pokemon_name(pokemon_id):
-            row = pokemon_data[pokemon_data["id"] == pokemon_id]
-            return row["speciesName"].values[0] if not row.empty else "Unknown"
-
-        # Get the current Pokémon for both player and enemy
-        player_current = observations["player"][observations["player"]["isActive"] == 1]
-        enemy_current = observations["enemy"][observations["enemy"]["isActive"] == 1]
-
-        # Player's current Pokémon details
-        player_current_details = ""
-        if not player_current.empty:
-            player_mon = player_current.iloc[0]
-            player_name = get_pokemon_name(player_mon["id"])
-            player_moves = player_mon["moves"]
-            player_pp = [
-                player_mon["move1_pp"],
-                player_mon["move2_pp"],
-                player_mon["move3_pp"],
-                player_mon["move4_pp"],
-            ]
-            # Add HP information for the active Pokémon
-            player_current_details = f"[bold]{player_name}[/bold] - HP: {player_mon['current_hp']}/{player_mon['max_hp']}\n"
-            for move, pp in zip(player_moves, player_pp):
-                player_current_details += f"Move {move}: PP {pp}\n"
-
-        # Enemy's current Pokémon details
-        enemy_current_details = ""
-        if not enemy_current.empty:
-            enemy_mon = enemy_current.iloc[0]
-            enemy_name = get_pokemon_name(enemy_mon["id"])
-            enemy_moves = enemy_mon["moves"]
-            enemy_pp = [
-                enemy_mon["move1_pp"],
-                enemy_mon["move2_pp"],
-                enemy_mon["move3_pp"],
-                enemy_mon["move4_pp"],
-            ]
-            # Add HP information for the active Pokémon
-            enemy_current_details = f"[bold]{enemy_name}[/bold] - HP: {enemy_mon['current_hp']}/{enemy_mon['max_hp']}\n"
-            for move, pp in zip(enemy_moves, enemy_pp):
-                enemy_current_details += f"Move {move}: PP {pp}\n"
-
-        # Add current Pokémon details to the table
-        table.add_row(player_current_details, enemy_current_details)
-
-        # Player's team Pokémon names and HP
-        player_team = observations["player"][observations["player"]["isActive"] != 1]
-        player_team_details = ""
-        for _, mon in player_team.iterrows():
-            mon_name = get_pokemon_name(mon["id"])
-            player_team_details += (
-                f"{mon_name}: HP {mon['current_hp']}/{mon['max_hp']}\n"
-            )
 
-        # Enemy's team Pokémon names and HP
-        enemy_team = observations["enemy"][observations["enemy"]["isActive"] != 1]
-        enemy_team_details = ""
-        for _, mon in enemy_team.iterrows():
-            mon_name = get_pokemon_name(mon["id"])
-            enemy_team_details += (
-                f"{mon_name}: HP {mon['current_hp']}/{mon['max_hp']}\n"
-            )
+    def stop_render_thread(self):
+        """Flush and stop the background render thread if any"""
+        if self.async_renderer is not None:
+            self.async_renderer.close()
+            self.async_renderer = None
+
+    def start_recording(
+        self,
+        output_dir: str,
+        frame_skip: int = 1,
+        queue_size: int = 64,
+        chunk_size: int = 256,
+        fmt: str = "npz",
+    ):
+        """
+        Record the emulated frames of every following episode on a background
+        thread, see env/recorder.py.
 
-        # Add team details to the table
-        table.add_row(player_team_details, enemy_team_details)
+        Args:
+            output_dir: Directory receiving the recordings
+            frame_skip: Keep one frame every frame_skip emulation chunks
+            queue_size: Frames waiting to be encoded before new ones are dropped
+            chunk_size: Frames per .npz file
+            fmt: "npz" for compressed chunks or "raw" for rgb24 video files
+        """
+        from .recorder import EpisodeRecorder
 
-        # Print the table to the console
-        console.print(table)
+        self.stop_recording()
+        self.recorder = EpisodeRecorder(
+            output_dir, frame_skip, queue_size, chunk_size, fmt
+        )
+        self.battle_core.frame_hook = self.recorder.on_frame
+
+    def stop_recording(self):
+        """Flush and stop the recorder if any"""
+        if self.recorder is not None:
+            self.battle_core.frame_hook = None
+            self.recorder.close()
+            self.recorder = None
+
+    def _get_renderer(self, csv_path: Optional[str] = None):
+        """Get the renderer, building it on first use"""
+        csv_path = csv_path or POKEMON_CSV_PATH
+        if self.renderer is None or self._renderer_csv_path != csv_path:
+            from pkmn_rl_arena.data.name_index import get_name_index
+            from .render import BattleRenderer
+
+            self.renderer = BattleRenderer(get_name_index(csv_path))
+            self._renderer_csv_path = csv_path
+        return self.renderer
 
 
 # Example usage
@@ -0,0 +1,203 @@
+"""
+Per layer wall time profiler for PokemonRLCore.
+
+Enable it with PokemonRLCore(..., profile=True) or the PKMN_RL_PROFILE
+environment variable ("1", or a path for the collapsed stack file).
+PKMN_RL_PROFILE_EVERY sets the report period in steps. Every process writes
+its own file, the pid is inserted before the extension of the path
+(pkmn_rl_profile.<pid>.folded by default), so that workers do not overwrite
+each other's profile. The files can be concatenated to merge the profiles.
+
+Profiled methods are wrapped on the instances only, so a core built without
+profiling runs the plain methods with no overhead. Time is attributed to
+nested layers ("step;turn_logic;emulation") and dumped in the collapsed stack
+format read by flamegraph.pl, inferno or speedscope. Summaries are logged at
+INFO level on this module's logger, e.g. enable them with
+pkmn_rl_arena.log.configure({"env.profiler": "INFO"}).
+"""
+
+import functools
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENV_VAR = "PKMN_RL_PROFILE"
+PROFILE_EVERY_ENV_VAR = "PKMN_RL_PROFILE_EVERY"
+DEFAULT_COLLAPSED_PATH = "pkmn_rl_profile.folded"
+
+# (attribute path on the core, method name, layer)
+CORE_LAYERS = [
+    ("battle_core", "run_to_next_stop", "emulation"),
+    ("battle_core", "read_team_data", "memory"),
+    ("battle_core", "read_watched", "memory"),
+    ("battle_core", "write_team_data", "memory"),
+    ("battle_core", "write_action", "memory"),
+    ("battle_core", "clear_stop_condition", "memory"),
+    ("action_manager", "get_legal_actions", "memory"),
+    ("observation_manager", "get_observations", "observation"),
+    ("turn_manager", "process_turn", "turn_logic"),
+    ("turn_manager", "advance_to_next_turn", "turn_logic"),
+    ("save_state_manager", "load_state", "savestate"),
+    ("save_state_manager", "save_state", "savestate"),
+    ("save_state_manager", "snapshot", "savestate"),
+    ("save_state_manager", "restore", "savestate"),
+    (None, "_create_random_team", "team_sampling"),
+    (None, "_capture_pixels", "pixels"),
+    (None, "reset", "reset"),
+]
+
+
+def profiling_requested() -> bool:
+    """Check whether the environment asks for profiling"""
+    return os.environ.get(PROFILE_ENV_VAR, "") not in ("", "0")
+
+
+class StepProfiler:
+    """
+    Accumulates self wall time per stack of layers.
+
+    Time spent outside step() between two consecutive calls is attributed to
+    the "callback" layer, i.e. the policy and user code driving the env,
+    minus the time of the profiled calls made in between such as reset().
+    """
+
+    def __init__(
+        self, report_every: int = 1000, collapsed_path: Optional[str] = None
+    ):
+        self.report_every = report_every
+        self.collapsed_path = collapsed_path
+        self.self_times: Dict[str, float] = defaultdict(float)
+        self.calls: Counter = Counter()
+        self.steps = 0
+        self._stack: List[List] = []  # [layer, start, time spent in children]
+        self._last_step_end: Optional[float] = None
+        # Time of the root layers run since the last step, e.g. reset()
+        self._between_steps = 0.0
+
+    @classmethod
+    def from_env(cls) -> "StepProfiler":
+        """Build a profiler configured by PKMN_RL_PROFILE / PKMN_RL_PROFILE_EVERY"""
+        value = os.environ.get(PROFILE_ENV_VAR, "")
+        collapsed_path = (
+            value if value not in ("", "0", "1") else DEFAULT_COLLAPSED_PATH
+        )
+        report_every = int(os.environ.get(PROFILE_EVERY_ENV_VAR, "1000"))
+        return cls(report_every=report_every, collapsed_path=collapsed_path)
+
+    def _push(self, layer: str):
+        self._stack.append([layer, time.perf_counter(), 0.0])
+
+    def _pop(self):
+        layer, start, children = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        key = ";".join(frame[0] for frame in self._stack)
+        key = f"{key};{layer}" if key else layer
+        self.self_times[key] += elapsed - children
+        self.calls[key] += 1
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        else:
+            self._between_steps += elapsed
+
+    def wrap(self, func: Callable, layer: str) -> Callable:
+        """Wrap func so its time is attributed to layer"""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            self._push(layer)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._pop()
+
+        return wrapper
+
+    def wrap_step(self, func: Callable) -> Callable:
+        """Wrap PokemonRLCore.step, the root layer closing every profiled step"""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            now = time.perf_counter()
+            if self._last_step_end is not None and not self._stack:
+                callback = now - self._last_step_end - self._between_steps
+                self.self_times["callback"] += max(callback, 0.0)
+                self.calls["callback"] += 1
+            self._push("step")
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._pop()
+                self._last_step_end = time.perf_counter()
+                self._between_steps = 0.0
+                self.steps += 1
+                if self.report_every and self.steps % self.report_every == 0:
+                    self.report()
+
+        return wrapper
+
+    def attach(self, core):
+        """Instrument the methods of a PokemonRLCore instance and its managers"""
+        for owner_name, method_name, layer in CORE_LAYERS:
+            owner = core if owner_name is None else getattr(core, owner_name)
+            setattr(owner, method_name, self.wrap(getattr(owner, method_name), layer))
+        core.step = self.wrap_step(core.step)
+
+    def inclusive_times(self) -> Dict[str, float]:
+        """Total time per stack prefix, children included"""
+        totals: Dict[str, float] = defaultdict(float)
+        for key, seconds in self.self_times.items():
+            parts = key.split(";")
+            for i in range(1, len(parts) + 1):
+                totals[";".join(parts[:i])] += seconds
+        return totals
+
+    def summary(self, width: int = 30) -> str:
+        """Flame style text summary, one line per stack with its share of time"""
+        totals = self.inclusive_times()
+        roots = sum(t for key, t in totals.items() if ";" not in key)
+        if not roots:
+            return "profile: no samples"
+        lines = [f"profile over {self.steps} steps ({roots:.3f} s)"]
+        for key in sorted(totals, key=lambda k: (k.split(";")[0] != "step", k)):
+            parts = key.split(";")
+            share = totals[key] / roots
+            per_step_us = totals[key] / max(self.steps, 1) * 1e6
+            lines.append(
+                f"{'  ' * len(parts)}{parts[-1]:<{24 - 2 * len(parts)}}"
+                f" {share:7.1%} {per_step_us:10.1f} us/step"
+                f" {'#' * round(share * width)}"
+            )
+        return "\n".join(lines)
+
+    def dump_collapsed(self, path: Optional[str] = None) -> Optional[str]:
+        """
+        Write self times (in microseconds) as collapsed stacks, to path or
+        else to collapsed_path with the pid of the current process inserted.
+        """
+        if path is None and self.collapsed_path is not None:
+            # Resolved here since the profiler may be forked after creation
+            root, ext = os.path.splitext(self.collapsed_path)
+            path = f"{root}.{os.getpid()}{ext}"
+        if path is None:
+            return None
+        with open(path, "w") as f:
+            for key, seconds in sorted(self.self_times.items()):
+                f.write(f"{key} {int(seconds * 1e6)}\n")
+        return path
+
+    def report(self):
+        """Log the summary and refresh the collapsed stack file"""
+        logger.info("%s", self.summary())
+        self.dump_collapsed()
+
+    def reset(self):
+        """Drop accumulated samples"""
+        self.self_times.clear()
+        self.calls.clear()
+        self.steps = 0
+        self._last_step_end = None
+        self._between_steps = 0.0
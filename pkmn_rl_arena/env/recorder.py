@@ -0,0 +1,185 @@
+"""
+Background recording of battles as frame chunks.
+
+    core.start_recording("recordings", frame_skip=8)
+    ...
+    core.stop_recording()
+
+Frames are grabbed between emulation chunks, every `frame_skip` chunks, and
+written by a background thread either as compressed .npz chunks holding a
+(N, 160, 240, 3) uint8 "frames" array, or appended to one raw rgb24 video
+per episode, e.g. for ffmpeg:
+
+    ffmpeg -f rawvideo -pix_fmt rgb24 -s 240x160 -i episode_00000.rgb out.mp4
+"""
+
+from pkmn_rl_arena.log import counters
+from .pixels import SCREEN_HEIGHT, SCREEN_WIDTH, supports_buffer_fill
+
+import logging
+import os
+import queue
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("npz", "raw")
+
+
+class EpisodeRecorder:
+    """
+    Copies emulator frames into a bounded queue and encodes them on a
+    background thread.
+
+    Grabbing a frame costs one buffer copy on the stepping thread. Skipped
+    frames, and frames arriving while the queue is full, are dropped before
+    anything is copied so recording never blocks the env.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        frame_skip: int = 1,
+        queue_size: int = 64,
+        chunk_size: int = 256,
+        fmt: str = "npz",
+    ):
+        """
+        Args:
+            output_dir: Directory receiving the recordings, created if needed
+            frame_skip: Keep one grabbed frame every frame_skip calls
+            queue_size: Frames waiting to be encoded before new ones are dropped
+            chunk_size: Frames per .npz file
+            fmt: "npz" for compressed chunks or "raw" for rgb24 video files
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown recording format: {fmt}")
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.frame_skip = max(1, frame_skip)
+        self.chunk_size = chunk_size
+        self.fmt = fmt
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.episode = 0
+        self.recorded = 0
+        self.dropped = 0
+        self.files: List[str] = []
+        self._calls = 0
+
+        # Owned by the writer thread
+        self._chunk: List[np.ndarray] = []
+        self._chunk_index = 0
+        self._chunk_episode = 0
+        self._raw_file = None
+        self._thread = threading.Thread(
+            target=self._run, name="pkmn-recorder", daemon=True
+        )
+        self._thread.start()
+
+    def on_frame(self, gba) -> bool:
+        """
+        Grab the current emulator frame unless skipped or the queue is full.
+        Returns False if no frame was queued.
+        """
+        self._calls += 1
+        if self._calls % self.frame_skip:
+            return False
+        if self.queue.full():
+            self.dropped += 1
+            counters.incr("env.recorder_dropped")
+            return False
+        if supports_buffer_fill(gba):
+            frame = np.empty((SCREEN_HEIGHT, SCREEN_WIDTH, 4), dtype=np.uint8)
+            gba.fill_frame_buffer(frame)
+        else:
+            frame = np.array(gba.get_frame_buffer(), dtype=np.uint32)
+        try:
+            self.queue.put_nowait((self.episode, frame))
+        except queue.Full:
+            self.dropped += 1
+            counters.incr("env.recorder_dropped")
+            return False
+        self.recorded += 1
+        return True
+
+    def new_episode(self):
+        """Start writing the following frames to the files of a new episode"""
+        self.episode += 1
+        self._calls = 0
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self._flush()
+                return
+            episode, frame = item
+            if episode != self._chunk_episode:
+                self._flush()
+                self._chunk_episode = episode
+                self._chunk_index = 0
+            # Little endian u32 words are B, G, R, A bytes
+            bgra = frame.view(np.uint8).reshape(SCREEN_HEIGHT, SCREEN_WIDTH, 4)
+            rgb = np.ascontiguousarray(bgra[..., 2::-1])
+            if self.fmt != "raw":
+                self._chunk.append(rgb)
+                if len(self._chunk) >= self.chunk_size:
+                    self._flush()
+                continue
+            try:
+                self._write_raw(rgb)
+            except OSError as e:
+                logger.warning("Recording write failed: %s", e)
+
+    def _path(self, suffix: str) -> str:
+        return os.path.join(self.output_dir, f"episode_{self._chunk_episode:05d}{suffix}")
+
+    def _write_raw(self, rgb: np.ndarray):
+        if self._raw_file is None:
+            path = self._path(".rgb")
+            self._raw_file = open(path, "ab")
+            self.files.append(path)
+        self._raw_file.write(rgb.tobytes())
+
+    def _flush(self):
+        """
+        Write the pending chunk, or close the raw file of the episode. A
+        failed write is logged and its frames are dropped, so that the writer
+        thread keeps running.
+        """
+        if self._raw_file is not None:
+            raw_file, self._raw_file = self._raw_file, None
+            try:
+                raw_file.close()
+            except OSError as e:
+                logger.warning("Recording write failed: %s", e)
+        if self._chunk:
+            path = self._path(f"_{self._chunk_index:04d}.npz")
+            frames, self._chunk = self._chunk, []
+            self._chunk_index += 1
+            try:
+                np.savez_compressed(path, frames=np.stack(frames))
+            except OSError as e:
+                logger.warning("Recording write failed: %s", e)
+                return
+            self.files.append(path)
+
+    def close(self, timeout: Optional[float] = None):
+        """Encode the frames still queued, write the last chunk and stop"""
+        # A writer thread that died no longer empties the queue
+        while self._thread.is_alive():
+            try:
+                self.queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self._thread.join(timeout)
+        if self.dropped:
+            logger.info(
+                "Recorder dropped %d of %d frames",
+                self.dropped,
+                self.dropped + self.recorded,
+            )
@@ -0,0 +1,141 @@
+from pkmn_rl_arena.data.name_index import NameIndex, get_name_index
+
+import queue
+import threading
+import time
+from typing import Dict, Optional
+
+import pandas as pd
+from rich.console import Console
+from rich.table import Table
+
+
+class BattleRenderer:
+    """
+    Renders the battle state with the rich library.
+    The name index and the console are built once and reused for every frame.
+    """
+
+    def __init__(
+        self, name_index: Optional[NameIndex] = None, console: Optional[Console] = None
+    ):
+        self.name_index = name_index if name_index is not None else get_name_index()
+        self.console = console if console is not None else Console()
+
+    def _active_details(self, team: pd.DataFrame) -> str:
+        """Describe the active mon of a team with its moves and PP"""
+        current = team[team["isActive"] == 1]
+        if current.empty:
+            return ""
+        mon = current.iloc[0]
+        pps = [mon["move1_pp"], mon["move2_pp"], mon["move3_pp"], mon["move4_pp"]]
+        details = (
+            f"[bold]{self.name_index.species_name(mon['id'])}[/bold]"
+            f" - HP: {mon['current_hp']}/{mon['max_hp']}\n"
+        )
+        for move, pp in zip(mon["moves"], pps):
+            details += f"{self.name_index.move_name(move)}: PP {pp}\n"
+        return details
+
+    def _bench_details(self, team: pd.DataFrame) -> str:
+        """Describe the non active mons of a team with their HP"""
+        details = ""
+        for _, mon in team[team["isActive"] != 1].iterrows():
+            details += (
+                f"{self.name_index.species_name(mon['id'])}:"
+                f" HP {mon['current_hp']}/{mon['max_hp']}\n"
+            )
+        return details
+
+    def build_table(self, observations: Dict[str, pd.DataFrame]) -> Table:
+        """Build a table with the player and enemy teams side by side"""
+        table = Table(
+            title="Battle State", show_header=True, header_style="bold magenta"
+        )
+        table.add_column("Player", justify="center", style="cyan", no_wrap=True)
+        table.add_column("Enemy", justify="center", style="red", no_wrap=True)
+
+        table.add_row(
+            self._active_details(observations["player"]),
+            self._active_details(observations["enemy"]),
+        )
+        table.add_row(
+            self._bench_details(observations["player"]),
+            self._bench_details(observations["enemy"]),
+        )
+        return table
+
+    def render(self, observations: Dict[str, pd.DataFrame]):
+        """Print the current state of the battle to the console"""
+        self.console.print(self.build_table(observations))
+
+
+class AsyncBattleRenderer:
+    """
+    Renders observations on a background thread so stepping never waits on
+    the console.
+
+    Observations are copied into a bounded queue at most `rate` times per
+    second. Frames submitted faster than that, or while the queue is full,
+    are dropped.
+    """
+
+    def __init__(
+        self, renderer: BattleRenderer, rate: float = 2.0, queue_size: int = 4
+    ):
+        self.renderer = renderer
+        self.min_interval = 1.0 / rate if rate > 0 else 0.0
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._last_submit = 0.0
+        self._thread = threading.Thread(
+            target=self._run, name="pkmn-render", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, observations: Dict[str, pd.DataFrame]) -> bool:
+        """
+        Queue a copy of the observations for rendering.
+        Returns False if the frame was dropped.
+        """
+        now = time.perf_counter()
+        if now - self._last_submit < self.min_interval or self.queue.full():
+            self.dropped += 1
+            return False
+        snapshot = {agent: obs.copy() for agent, obs in observations.items()}
+        try:
+            self.queue.put_nowait(snapshot)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self._last_submit = now
+        return True
+
+    def _run(self):
+        while True:
+            observations = self.queue.get()
+            if observations is None:
+                return
+            self.renderer.render(observations)
+
+    def close(self, timeout: Optional[float] = None):
+        """
+        Render the frames still queued then stop the thread. Once timeout
+        passed, queued frames are dropped to make room for the stop request.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._thread.is_alive():
+            try:
+                self.queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                if deadline is None or time.monotonic() < deadline:
+                    continue
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+        if deadline is not None:
+            timeout = max(deadline - time.monotonic(), 0.0)
+        self._thread.join(timeout)
@@ -1,9 +1,124 @@
 from pkmn_rl_arena import SAVE_PATH
 
-from .battle_core import BattleCore
+from .battle_state import BattleState
 
+import copy
+import functools
 import os
-from typing import List
+import weakref
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .battle_core import BattleCore
+
+
+@dataclass
+class Snapshot:
+    """In memory emulator state with the battle state it was taken at"""
+
+    data: bytes
+    battle_state: BattleState
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data)
+
+    @functools.cached_property
+    def digest(self) -> Tuple[int, int]:
+        """Size and crc32 of the state, identifies a reference across processes"""
+        return len(self.data), zlib.crc32(self.data)
+
+
+# Digest -> reference snapshot, to decode unpickled SlimSnapshots
+_references: "weakref.WeakValueDictionary[Tuple[int, int], Snapshot]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def register_reference(reference: Snapshot):
+    """
+    Make reference available to the SlimSnapshots encoded against it that
+    are unpickled in this process. encode() registers its reference.
+    """
+    _references[reference.digest] = reference
+
+
+@dataclass
+class SlimSnapshot:
+    """
+    Snapshot stored as the zlib compressed XOR delta against a reference
+    snapshot. Most of a savestate (bios, video memory, frame buffer, rom
+    mapped state) barely changes during a battle, so the delta is mostly
+    zeros and compresses to a small fraction of the full state.
+
+    Pickling leaves the reference out, only its digest is kept. Unpickling
+    resolves it among the references registered in the receiving process,
+    e.g. inherited through fork or passed to register_reference, and decode()
+    raises ValueError if it is not there.
+    """
+
+    delta: bytes
+    size: int
+    battle_state: BattleState
+    reference: Optional[Snapshot]
+    reference_digest: Tuple[int, int]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.delta)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["reference"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.reference = _references.get(self.reference_digest)
+
+    @staticmethod
+    def _xor(data: bytes, reference: bytes, size: int) -> bytes:
+        a = np.zeros(size, dtype=np.uint8)
+        a[: len(data)] = np.frombuffer(data, dtype=np.uint8)
+        b = np.zeros(size, dtype=np.uint8)
+        n = min(size, len(reference))
+        b[:n] = np.frombuffer(reference, dtype=np.uint8, count=n)
+        return np.bitwise_xor(a, b, out=a).tobytes()
+
+    @classmethod
+    def encode(
+        cls, snapshot: Snapshot, reference: Snapshot, level: int = 1
+    ) -> "SlimSnapshot":
+        """Encode snapshot against reference"""
+        size = len(snapshot.data)
+        delta = cls._xor(snapshot.data, reference.data, size)
+        register_reference(reference)
+        return cls(
+            zlib.compress(delta, level),
+            size,
+            snapshot.battle_state,
+            reference,
+            reference.digest,
+        )
+
+    def decode(self) -> Snapshot:
+        """Rebuild the full snapshot"""
+        if self.reference is None:
+            raise ValueError(
+                "Reference snapshot not registered in this process, "
+                "see register_reference"
+            )
+        delta = zlib.decompress(self.delta)
+        return Snapshot(
+            self._xor(delta, self.reference.data, self.size), self.battle_state
+        )
+
+
+AnySnapshot = Union[Snapshot, SlimSnapshot]
 
 
 class SaveStateManager:
@@ -11,9 +126,17 @@ class SaveStateManager:
     Manages emulator save states for quick save/load functionality.
     """
 
-    def __init__(self, battle_core: BattleCore):
+    def __init__(self, battle_core: "BattleCore", slim: bool = False):
+        """
+        Args:
+            battle_core: Emulator to save and restore
+            slim: snapshot() returns SlimSnapshot deltas against the first
+                snapshot taken, which becomes the reference
+        """
         self.battle_core = battle_core
         self.save_dir = SAVE_PATH
+        self.slim = slim
+        self.reference: Optional[Snapshot] = None
         os.makedirs(self.save_dir, exist_ok=True)
 
     def save_state(self, name: str):
@@ -23,9 +146,38 @@ class SaveStateManager:
     def load_state(self, name: str) -> bool:
         """Load a saved state by name. Returns True if successful, False otherwise."""
         self.battle_core.load_savestate(name)
+        self._setup_after_load()
+        return True
+
+    def snapshot(
+        self, battle_state: BattleState, slim: Optional[bool] = None
+    ) -> AnySnapshot:
+        """
+        Take an in memory snapshot of the emulator and of battle_state.
+        slim overrides the manager default.
+        """
+        snapshot = Snapshot(
+            self.battle_core.save_savestate_bytes(), copy.deepcopy(battle_state)
+        )
+        if not (self.slim if slim is None else slim):
+            return snapshot
+        if self.reference is None:
+            self.reference = snapshot
+        return SlimSnapshot.encode(snapshot, self.reference)
+
+    def restore(self, snapshot: AnySnapshot) -> BattleState:
+        """Restore a snapshot, returns a copy of its battle state"""
+        if isinstance(snapshot, SlimSnapshot):
+            snapshot = snapshot.decode()
+        self.battle_core.load_savestate_bytes(snapshot.data)
+        self._setup_after_load()
+        return copy.deepcopy(snapshot.battle_state)
+
+    def _setup_after_load(self):
+        """Restore the stops and watches, which are not part of a savestate"""
         self.battle_core.setup_addresses()
         self.battle_core.setup_stops()
-        return True
+        self.battle_core.setup_watches()
 
     def list_save_states(self) -> List[str]:
         """List all available save state names (without extension)."""
@@ -0,0 +1,90 @@
+"""
+Battle state hashing and a bounded LRU transposition table.
+
+The hash covers the team dumps of both sides, the game RNG state and the
+pending turn type. Battle fields outside the team dumps (stat stages,
+weather, ...) are not part of it, so two states with the same hash are
+treated as the same search node.
+"""
+
+import hashlib
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, Optional
+
+if TYPE_CHECKING:
+    from .save_state import AnySnapshot
+
+HASH_SIZE = 16
+
+
+def battle_hash(
+    player: List[int], enemy: List[int], rng: int = 0, turn: Optional[str] = None
+) -> bytes:
+    """Hash the raw team dumps (u32 lists), the RNG state and the turn type"""
+    digest = hashlib.blake2b(digest_size=HASH_SIZE)
+    digest.update(array("I", player).tobytes())
+    digest.update(array("I", enemy).tobytes())
+    digest.update(rng.to_bytes(4, "little"))
+    digest.update((turn or "").encode())
+    return digest.digest()
+
+
+@dataclass
+class Transition:
+    """Cached result of playing actions from a state"""
+
+    snapshot: "AnySnapshot"
+    rewards: Dict[str, float]
+    done: bool
+    info: Dict[str, Any] = field(default_factory=dict)
+
+
+class TranspositionTable:
+    """
+    Least recently used cache of search results.
+
+    Keys are state hashes (node values) or (state hash, actions) pairs
+    (transitions), both kinds sharing the capacity.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        self.capacity = capacity
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get an entry and mark it as recently used, None if missing"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, entry: Any):
+        """Insert or refresh an entry, evicting the least recently used ones"""
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def actions_key(actions: Dict[str, int]) -> tuple:
+    """Hashable, order independent form of an actions dict"""
+    return tuple(sorted(actions.items()))
+
@@ -1,4 +1,4 @@
-from .battle_core import BattleCore
+from .battle_core import BattleCore, OUTCOME_DECIDED_STOP_ID
 from .battle_state import BattleState, TurnType
 from .action import ActionManager
 
@@ -42,8 +42,14 @@ class TurnManager:
 
     def advance_to_next_turn(self) -> TurnType:
         """Advance to the next turn"""
-        stop_id = self.battle_core.run_to_next_stop()
+        # Only look for a decided outcome once the battle has actually started
+        check_outcome = self.battle_core.early_termination and (
+            self.state.current_turn
+            in (TurnType.GENERAL, TurnType.PLAYER, TurnType.ENEMY)
+        )
+        stop_id = self.battle_core.run_to_next_stop(check_outcome=check_outcome)
         self.state.current_turn = self.battle_core.get_turn_type(stop_id)
+        self.state.outcome_decided_early = stop_id == OUTCOME_DECIDED_STOP_ID
         self.state.waiting_for_action = True
         self.state.current_step += 1
 
@@ -0,0 +1,215 @@
+"""
+Batched stepping of PokemonRLCore instances in worker processes.
+
+    env = VectorEnv(num_envs=16)
+    obs, masks, infos = env.reset()
+    while True:
+        actions = [
+            {agent: pick(obs[i], masks[i]) for agent in info["required_agents"]}
+            for i, info in enumerate(infos)
+        ]
+        obs, masks, rewards, dones, infos = env.step(actions)
+
+Observations are the encoded features of ObservationManager stacked as
+(num_envs, 2, 6, MON_FEATURE_SIZE) float32, masks the legal actions as
+(num_envs, 2, 10) bool, agents in (player, enemy) order.
+
+With autoreset, an env whose episode ends is reset within the same step
+call: it returns the first observation of its next episode, and the last
+observation of the finished one is kept in info["final_observation"].
+Prefetch processes keep a queue of ready initial states (teams sampled,
+emulated to the first decision) filled in the background, so the reset is
+a snapshot restore instead of a savestate load, team sampling and
+emulation to the first decision.
+"""
+
+from pkmn_rl_arena.data.trajectory import AGENTS
+from .fork_server import ForkServer
+
+import logging
+import queue
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# step() info entries referring to buffers of the worker process
+WORKER_ONLY_INFO = ("pixels", "changed_slots")
+
+
+class VectorEnv:
+    """
+    num_envs PokemonRLCore workers forked from one booted emulator, stepped
+    in parallel. See the module doc for the observation layout.
+    """
+
+    def __init__(
+        self,
+        num_envs: int,
+        autoreset: bool = True,
+        prefetch_workers: int = 1,
+        prefetch_size: int = 8,
+        server: Optional[ForkServer] = None,
+        **server_kwargs,
+    ):
+        """
+        Args:
+            num_envs: Number of env worker processes
+            autoreset: Reset finished envs within the step call
+            prefetch_workers: Processes preparing initial states, 0 disables
+                prefetching (finished envs then run a full reset)
+            prefetch_size: Initial states kept ready
+            server: Fork server to start workers from, built from
+                server_kwargs if None
+            server_kwargs: ForkServer arguments
+        """
+        self.server = server or ForkServer(**server_kwargs)
+        self.num_envs = num_envs
+        self.autoreset = autoreset
+        ctx = self.server.ctx
+        self.prefetch_queue = None
+        self.prefetchers = []
+        if prefetch_workers:
+            self.prefetch_queue = ctx.Queue(maxsize=prefetch_size)
+            self.prefetchers = self.server.spawn(
+                _prefetch_worker, prefetch_workers, args=(self.prefetch_queue,)
+            )
+        self.connections: List[Connection] = []
+        for _ in range(num_envs):
+            parent_conn, child_conn = ctx.Pipe()
+            self.server.spawn(
+                _env_worker, 1, args=(child_conn, self.prefetch_queue, autoreset)
+            )
+            child_conn.close()
+            self.connections.append(parent_conn)
+
+    def _gather(self) -> List[Any]:
+        results = [conn.recv() for conn in self.connections]
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+    def reset(self) -> Tuple[np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+        """Reset every env, returns observations, masks and infos"""
+        for conn in self.connections:
+            conn.send(("reset", None))
+        results = self._gather()
+        obs = np.stack([r[0] for r in results])
+        masks = np.stack([r[1] for r in results])
+        return obs, masks, [r[2] for r in results]
+
+    def step(
+        self, actions: List[Dict[str, int]]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+        """
+        Step every env with its actions dict.
+
+        Returns:
+            obs: (num_envs, 2, 6, MON_FEATURE_SIZE) float32
+            masks: (num_envs, 2, 10) bool
+            rewards: (num_envs, 2) float32
+            dones: (num_envs,) bool
+            infos: Per env info, with "required_agents" for the next call
+        """
+        if len(actions) != self.num_envs:
+            raise ValueError(f"Expected {self.num_envs} actions, got {len(actions)}")
+        for conn, env_actions in zip(self.connections, actions):
+            conn.send(("step", env_actions))
+        results = self._gather()
+        obs = np.stack([r[0] for r in results])
+        masks = np.stack([r[1] for r in results])
+        rewards = np.array([r[2] for r in results], dtype=np.float32)
+        dones = np.array([r[3] for r in results], dtype=bool)
+        return obs, masks, rewards, dones, [r[4] for r in results]
+
+    def close(self):
+        """Stop the env and prefetch workers"""
+        for conn in self.connections:
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for conn in self.connections:
+            conn.close()
+        self.connections = []
+        self.server.terminate()
+
+    def __enter__(self) -> "VectorEnv":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _observe(core) -> Tuple[np.ndarray, np.ndarray]:
+    """Encoded observations (2, 6, F) and legal action masks (2, 10) of core"""
+    encoded = core.observation_manager.get_encoded_observations()
+    obs = np.stack([encoded[agent] for agent in AGENTS])
+    mask = np.array(
+        [core.action_manager.get_legal_action_mask(agent) for agent in AGENTS],
+        dtype=bool,
+    )
+    return obs, mask
+
+
+def _reset(core, prefetch_queue) -> bool:
+    """Reset, from a prefetched initial state if one is ready (returns True)"""
+    if prefetch_queue is not None:
+        try:
+            snapshot = prefetch_queue.get_nowait()
+        except queue.Empty:
+            pass
+        else:
+            core.reset_from_snapshot(snapshot)
+            return True
+    core.reset()
+    return False
+
+
+def _prefetch_worker(core, worker_id: int, prefetch_queue):
+    while True:
+        core.reset()
+        prefetch_queue.put(
+            core.save_state_manager.snapshot(core.turn_manager.state, slim=False)
+        )
+
+
+def _env_worker(
+    core, worker_id: int, conn: Connection, prefetch_queue, autoreset: bool
+):
+    while True:
+        try:
+            command, data = conn.recv()
+        except EOFError:
+            return
+        if command == "close":
+            return
+        try:
+            if command == "reset":
+                prefetched = _reset(core, prefetch_queue)
+                obs, mask = _observe(core)
+                info = {
+                    "required_agents": core.get_required_agents(),
+                    "prefetched_reset": prefetched,
+                }
+                conn.send((obs, mask, info))
+            elif command == "step":
+                _, rewards, done, info = core.step(data)
+                info = {k: v for k, v in info.items() if k not in WORKER_ONLY_INFO}
+                obs, mask = _observe(core)
+                if done and autoreset:
+                    info["final_observation"] = obs
+                    info["final_mask"] = mask
+                    info["prefetched_reset"] = _reset(core, prefetch_queue)
+                    obs, mask = _observe(core)
+                info["required_agents"] = core.get_required_agents()
+                reward = [rewards.get(agent, 0.0) for agent in AGENTS]
+                conn.send((obs, mask, reward, done, info))
+            else:
+                raise ValueError(f"Unknown command: {command}")
+        except Exception as e:
+            logger.exception("Env worker %d failed", worker_id)
+            conn.send(e)
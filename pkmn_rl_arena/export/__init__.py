@@ -1,12 +1,17 @@
-from .base import Exporter, LayerExporter
+import importlib
 
-from .enums import CallPosition
-
-from .exporters.parameters import ExportParameters
-from .exporters.forward import ExportForward
-
-from .exporters.layers.relu import ReLUExporter
-from .exporters.layers.fc import FullyConnectedExporter
+# Public name -> defining submodule. Submodules (and jinja2, onnx, numpy behind
+# them) are only imported on first attribute access.
+_LAZY_ATTRS = {
+    'Exporter': '.base',
+    'LayerExporter': '.base',
+    'CallPosition': '.enums',
+    'ExportParameters': '.exporters.parameters',
+    'ExportForward': '.exporters.forward',
+    'ReLUExporter': '.exporters.layers.relu',
+    'FullyConnectedExporter': '.exporters.layers.fc',
+    'Int8Engine': '.engine',
+}
 
 __all__ = [
     'Exporter', 
@@ -15,5 +20,18 @@ __all__ = [
     'ExportParameters',
     'ExportForward',
     'ReLUExporter',
-    'FullyConnectedExporter'
-]
\ No newline at end of file
+    'FullyConnectedExporter',
+    'Int8Engine',
+]
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
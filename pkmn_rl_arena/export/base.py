@@ -1,5 +1,4 @@
 import os
-import jinja2
 from typing import Dict, Any, List, Optional, Union
 from abc import ABC, abstractmethod
 
@@ -17,7 +16,9 @@ class Exporter:
         self.template_dir = os.path.dirname(template_path)
         self.template_name = os.path.basename(template_path)
         
-        # Set up Jinja environment
+        # Set up Jinja environment, jinja2 is only needed once exporting
+        import jinja2
+
         self.env = jinja2.Environment(
             loader=jinja2.FileSystemLoader(self.template_dir),
             trim_blocks=True,
@@ -0,0 +1,186 @@
+"""
+Host side int8 engine running an export plan bit exactly like the GBA build.
+
+    engine = Int8Engine.from_onnx("fused_model.onnx")
+    outputs = engine.run(inputs)  # (batch, in_size) int8 -> (batch, out_size) int8
+
+The engine replays the forward() function generated from the same plan:
+layers run in call order and read and write mem_buffer at the offsets of
+the memory allocator. Every row of the batch has its own mem_buffer.
+
+Kernels follow nn_functions.h: qgemm_int8_t accumulates in int32 starting
+from the bias, requantizes with (int64)acc * multiplier, adds
+1 << (shift - 1) and shifts right (left for a negative shift), then clamps
+to int8. fc_int8_t accumulates the same way without requantization and
+saturates to int8.
+"""
+
+from .enums import CallPosition
+from .exporters.layers.fc import FullyConnectedExporter, QGemmCustomExporter
+from .exporters.layers.relu import ReLUExporter
+from .onnx_exporter import ExportPlan, ONNXExporter
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+
+def _accumulate(x, weights, biases):
+    """
+    int32 accumulators of biases + weights . x, with C int32 wraparound.
+
+    int8 products summed in float64 are exact below 2**53, so the matmul
+    runs on BLAS instead of numpy's integer loops.
+    """
+    acc = np.rint(x.astype(np.float64) @ weights.T.astype(np.float64))
+    acc = acc.astype(np.int64) + biases.astype(np.int64)
+    return acc.astype(np.int32)
+
+
+def requantize(acc, multiplier, shift):
+    """Requantize int32 accumulators to int8 like qgemm_int8_t"""
+    multiplier = np.int64(np.int32(multiplier))
+    scaled = acc.astype(np.int64) * multiplier
+    if shift > 0:
+        scaled += np.int64(1) << np.int64(shift - 1)
+        result = (scaled >> np.int64(shift)).astype(np.int32)
+    elif shift == 0:
+        result = scaled.astype(np.int32)
+    else:
+        result = (scaled << np.int64(-shift)).astype(np.int32)
+    return np.clip(result, -128, 127).astype(np.int8)
+
+
+def qgemm(x, weights, biases, multiplier, shift):
+    """qgemm_int8_t on a batch: x (B, in), weights (out, in) int8"""
+    return requantize(_accumulate(x, weights, biases), multiplier, shift)
+
+
+def fc(x, weights, biases):
+    """fc_int8_t on a batch: x (B, in), weights (out, in) int8"""
+    return np.clip(_accumulate(x, weights, biases), -128, 127).astype(np.int8)
+
+
+def relu(x):
+    """relu_int8_t on a batch"""
+    return np.maximum(x, 0).astype(np.int8)
+
+
+@dataclass
+class _Step:
+    """One forward() call: kernel and buffer slices it reads and writes"""
+
+    kind: str
+    in_size: int
+    out_size: int
+    # None for the input / output arguments of forward()
+    src: Optional[int]
+    dst: Optional[int]
+    weights: Optional[np.ndarray] = None
+    biases: Optional[np.ndarray] = None
+    multiplier: int = 0
+    shift: int = 0
+
+
+class Int8Engine:
+    """Batched NumPy execution of an ExportPlan, see module doc"""
+
+    def __init__(self, plan: ExportPlan):
+        self.buffer_size = plan.buffer_size
+        self.steps: List[_Step] = [self._compile(layer) for layer in plan.layers]
+        if not self.steps:
+            raise ValueError("Export plan has no layer")
+        self.input_size = max(
+            (s.in_size for s in self.steps if s.src is None), default=0
+        )
+        self.output_size = max(
+            (s.out_size for s in self.steps if s.dst is None), default=0
+        )
+
+    @classmethod
+    def from_onnx(cls, onnx_path: str) -> "Int8Engine":
+        """Build the plan of an ONNX model the way ONNXExporter.export does"""
+        return cls(ONNXExporter(onnx_path).build_plan())
+
+    def _compile(self, layer) -> _Step:
+        src = (
+            None
+            if layer.call_position in (CallPosition.FIRST, CallPosition.BOTH)
+            else layer.input_idx
+        )
+        dst = (
+            None
+            if layer.call_position in (CallPosition.LAST, CallPosition.BOTH)
+            else layer.output_idx
+        )
+        if isinstance(layer, ReLUExporter):
+            # Same size as the _SIZE define of the generated code
+            size = layer.input_shape[1]
+            return _Step("relu", size, size, src, dst)
+
+        in_size, out_size = layer.input_shape[-1], layer.output_shape[-1]
+        # Values as written in the generated headers
+        biases = layer.biases.flatten().astype(np.int32)
+        if isinstance(layer, QGemmCustomExporter):
+            weights = layer.weights.flatten().astype(np.int8)
+            return _Step(
+                "qgemm",
+                in_size,
+                out_size,
+                src,
+                dst,
+                weights.reshape(out_size, in_size),
+                biases,
+                layer.multiplier,
+                layer.shift,
+            )
+        if isinstance(layer, FullyConnectedExporter):
+            # Emitted as int32 values in an int8_t array
+            weights = layer.weights.flatten().astype(np.int32).astype(np.int8)
+            return _Step(
+                "fc",
+                in_size,
+                out_size,
+                src,
+                dst,
+                weights.reshape(out_size, in_size),
+                biases,
+            )
+        raise NotImplementedError(f"No engine kernel for {type(layer).__name__}")
+
+    def run(self, inputs) -> np.ndarray:
+        """
+        Run forward() on a batch.
+
+        Args:
+            inputs: (batch, input_size) or (input_size,) int8 inputs
+
+        Returns:
+            (batch, output_size) int8 outputs, (output_size,) for a single input
+        """
+        inputs = np.asarray(inputs)
+        single = inputs.ndim == 1
+        x = inputs.reshape(1 if single else len(inputs), -1).astype(np.int8)
+        batch = len(x)
+        mem = np.zeros((batch, self.buffer_size), dtype=np.int8)
+        output = np.zeros((batch, self.output_size), dtype=np.int8)
+
+        for step in self.steps:
+            if step.src is None:
+                a = x[:, : step.in_size]
+            else:
+                a = mem[:, step.src : step.src + step.in_size]
+            if step.kind == "relu":
+                result = relu(a)
+            elif step.kind == "qgemm":
+                result = qgemm(
+                    a, step.weights, step.biases, step.multiplier, step.shift
+                )
+            else:
+                result = fc(a, step.weights, step.biases)
+            if step.dst is None:
+                output[:, : step.out_size] = result
+            else:
+                mem[:, step.dst : step.dst + step.out_size] = result
+        return output[0] if single else output
@@ -1,6 +1,9 @@
+import logging
 import os
 from ..exporters.forward import ExportForward
 
+logger = logging.getLogger(__name__)
+
 class CodeGenerator:
     """Generates C code from layer exporters"""
     
@@ -39,7 +42,7 @@ class CodeGenerator:
         for exporter in self.exporters:
             exporter.template_path = template_parameters_path
             exporter.export_layer(include_dir)
-            print(f"Exported layer {exporter.name} parameters to {include_dir}")
+            logger.debug("Exported layer %s parameters to %s", exporter.name, include_dir)
         
         # Generate forward function
         c_output_path = os.path.join(source_dir, "forward.c")
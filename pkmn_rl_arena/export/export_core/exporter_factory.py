@@ -1,3 +1,4 @@
+import logging
 from typing import Dict, List, Tuple, Type, Callable
 import numpy as np
 from onnx import numpy_helper
@@ -7,6 +8,8 @@ from ..base import LayerExporter
 from ..exporters.layers.relu import ReLUExporter
 from ..exporters.layers.fc import FullyConnectedExporter, QGemmCustomExporter
 
+logger = logging.getLogger(__name__)
+
 class ExporterFactory:
     """Creates layer exporters based on ONNX graph nodes"""
     
@@ -135,13 +138,13 @@ class ExporterFactory:
         if input_name in self.value_info:
             input_shape = tuple(d.dim_value for d in self.value_info[input_name].type.tensor_type.shape.dim)
         else:
-            print(f"Warning: Input tensor '{input_name}' not found in value_info.")
+            logger.warning("Input tensor '%s' not found in value_info.", input_name)
             input_shape = None  # ou une valeur par défaut ou raise
 
         if output_name in self.value_info:
             output_shape = tuple(d.dim_value for d in self.value_info[output_name].type.tensor_type.shape.dim)
         else:
-            print(f"Warning: Output tensor '{output_name}' not found in value_info.")
+            logger.warning("Output tensor '%s' not found in value_info.", output_name)
             output_shape = None  # ou valeur par défaut ou raise
 
         return ExporterClass(
@@ -1,6 +1,9 @@
+import logging
 import onnx
 from onnx import shape_inference
 
+logger = logging.getLogger(__name__)
+
 class ONNXGraphLoader:
     def __init__(self, onnx_path):
         self.onnx_path = onnx_path
@@ -14,7 +17,7 @@ class ONNXGraphLoader:
             inferred_model = shape_inference.infer_shapes(self.model)
             self.model = inferred_model
         except Exception as e:
-            print(f"Warning: Shape inference failed: {e}")
+            logger.warning("Shape inference failed: %s", e)
         
         self._extract_value_info()
         
@@ -43,7 +46,7 @@ class ONNXGraphLoader:
                 if output_name not in self.value_info:
                     for input_name in node.input:
                         if input_name in self.value_info:
-                            print(f"Warning: Derived shape for {output_name} from {input_name}")
+                            logger.debug("Derived shape for %s from %s", output_name, input_name)
                             self.value_info[output_name] = self.value_info[input_name]
                             break
     
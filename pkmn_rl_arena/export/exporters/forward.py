@@ -1,8 +1,10 @@
+import logging
 import os
-import jinja2
 from typing import List, Optional
 from ..base import Exporter
 
+logger = logging.getLogger(__name__)
+
 class ExportForward(Exporter):
     """Class for exporting forward function implementation and header."""
     
@@ -74,7 +76,7 @@ class ExportForward(Exporter):
         with open(output_path, 'w') as f:
             f.write(output_content)
         
-        print(f"Forward function exported to: {output_path}")
+        logger.debug("Forward function exported to: %s", output_path)
         return output_path
     
     def export_forward_header(self, template_path: str, output_path: Optional[str] = None) -> str:
@@ -91,6 +93,8 @@ class ExportForward(Exporter):
         if output_path is None:
             output_path = os.path.join(os.path.dirname(self.output_path), "forward.h")
             
+        import jinja2
+
         template_dir = os.path.dirname(template_path)
         template_name = os.path.basename(template_path)
         env = jinja2.Environment(
@@ -115,5 +119,5 @@ class ExportForward(Exporter):
         with open(output_path, 'w') as f:
             f.write(output_content)
         
-        print(f"Forward function header exported to: {output_path}")
+        logger.debug("Forward function header exported to: %s", output_path)
         return output_path
\ No newline at end of file
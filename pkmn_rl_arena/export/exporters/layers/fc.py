@@ -1,3 +1,4 @@
+import logging
 import os
 import numpy as np
 from typing import Dict, List, Tuple
@@ -5,6 +6,8 @@ from ...enums import CallPosition
 from ...exporters.parameters import ExportParameters
 from .layer_base import BaseLayerExporter
 
+logger = logging.getLogger(__name__)
+
 class FullyConnectedExporter(BaseLayerExporter):
     """Exporter for fully connected (dense) layers."""
     def __init__(self, name, input_shape, output_shape, input_idx, output_idx, 
@@ -64,7 +67,7 @@ class FullyConnectedExporter(BaseLayerExporter):
         biases_file = biases_exporter.export_array()
         files_generated["biases"] = biases_file
 
-        print(f"Exported FC layer parameters for {self.name}")
+        logger.debug("Exported FC layer parameters for %s", self.name)
         return files_generated
 
     
@@ -181,7 +184,7 @@ class QGemmCustomExporter(BaseLayerExporter):
         biases_file = biases_exporter.export_array()
         files_generated["biases"] = biases_file
 
-        print(f"Exported QGemm layer parameters for {self.name}")
+        logger.debug("Exported QGemm layer parameters for %s", self.name)
         return files_generated
     
     def get_defines(self) -> List[str]:
@@ -1,6 +1,6 @@
 from typing import Dict, List, Tuple
 
-from export.base import LayerExporter
+from ...base import LayerExporter
 from ...enums import CallPosition
 from .layer_base import BaseLayerExporter
 
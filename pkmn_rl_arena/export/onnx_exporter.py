@@ -5,11 +5,38 @@ from .export_core.code_generator import CodeGenerator
 from .passes.pass_manager import PassManager
 from .passes.delete_pass import DeleteQuantizePass
 
+from dataclasses import dataclass
+from typing import Any, Dict
+
+
+@dataclass
+class ExportPlan:
+    """Optimized graph, layer exporters in call order and memory layout"""
+
+    graph: Any
+    exporters: Dict[str, Any]
+    allocator: MemoryAllocator
+
+    @property
+    def layers(self):
+        """Layer exporters in forward() call order"""
+        return self.exporters['exporters']
+
+    @property
+    def buffer_size(self):
+        """Size in bytes of mem_buffer"""
+        return self.allocator.total_buffer_size
+
+
 class ONNXExporter:
     def __init__(self, onnx_path):
         self.onnx_path = onnx_path
-        
-    def export(self, output_dir="gba"):
+
+    def build_plan(self):
+        """
+        Load the model, run the optimization passes, allocate mem_buffer and
+        create the layer exporters, without generating any code.
+        """
         # Load the model
         loader = ONNXGraphLoader(self.onnx_path)
         model = loader.load_model()
@@ -33,9 +60,13 @@ class ONNXExporter:
             allocator.tensor_offsets
         )
         exporters = exporter_factory.create_exporters()
+        return ExportPlan(optimized_graph, exporters, allocator)
         
-        code_generator = CodeGenerator(exporters, allocator)
+    def export(self, output_dir="gba"):
+        plan = self.build_plan()
+        code_generator = CodeGenerator(plan.exporters, plan.allocator)
         code_generator.generate(output_dir)
+        return plan
 
     def _update_value_info(self, value_info, graph):
         """
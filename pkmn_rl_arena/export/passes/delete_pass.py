@@ -1,3 +1,11 @@
+import logging
+
+from pkmn_rl_arena.log import counters
+from .graph_index import GraphIndex
+
+logger = logging.getLogger(__name__)
+
+
 class DeletePass:
     """
     A pass that deletes a specified node from the graph.
@@ -6,160 +14,112 @@ class DeletePass:
     def __init__(self, node_name: str):
         self.node_name = node_name
 
-    def run(self, graph):
+    def run(self, graph, index=None):
         """
         Apply the delete pass to the graph.
-        
+
         Args:
             graph: The graph to modify.
+            index: GraphIndex of graph shared with other passes, built if None
         """
-        for node in graph.node:
-            if node.name == self.node_name:
-                graph.node.remove(node)
-                print(f"Node '{self.node_name}' has been deleted from the graph.")
-                return
-        
-        print(f"Node '{self.node_name}' not found in the graph.")
+        index = index or GraphIndex(graph)
+        node = index.find_by_name(self.node_name)
+        if node is not None:
+            index.remove_node(node)
+            index.commit()
+            logger.debug("Node '%s' has been deleted from the graph.", self.node_name)
+            return
+
+        logger.warning("Node '%s' not found in the graph.", self.node_name)
 
 class DeleteQuantizePass:
     """
     Deletes QuantizeLinear -> DequantizeLinear pairs from the graph
     and reconnects the inputs/outputs properly.
     """
-    def run(self, graph):
+    def run(self, graph, index=None):
         """
         Find and delete QuantizeLinear -> DequantizeLinear pairs,
         reconnecting the graph properly.
         """
+        index = index or GraphIndex(graph)
         pairs_to_delete = []
         tensor_remap = {}
-        
-        for quant_node in graph.node:
-            if quant_node.op_type == "QuantizeLinear":
-                quant_output = quant_node.output[0]
-                dequant_node = self._find_consumer(graph, quant_output, "DequantizeLinear")
-                
-                if dequant_node is not None:
-                    pairs_to_delete.append((quant_node, dequant_node))
-                    tensor_remap[dequant_node.output[0]] = quant_node.input[0]
-        
-        nodes_to_remove = []
+
+        for quant_node in index.nodes("QuantizeLinear"):
+            quant_output = quant_node.output[0]
+            dequant_node = index.consumer(quant_output, "DequantizeLinear")
+
+            if dequant_node is not None:
+                pairs_to_delete.append((quant_node, dequant_node))
+                tensor_remap[dequant_node.output[0]] = quant_node.input[0]
+
         for quant_node, dequant_node in pairs_to_delete:
-            nodes_to_remove.extend([quant_node, dequant_node])
-            print(f"Deleting QuantizeLinear -> DequantizeLinear pair: {quant_node.name} -> {dequant_node.name}")
-        
-        for node in nodes_to_remove:
-            if node in graph.node:
-                graph.node.remove(node)
-        
-        for node in graph.node:
-            for i, input_name in enumerate(node.input):
-                if input_name in tensor_remap:
-                    old_name = input_name
-                    new_name = tensor_remap[input_name]
-                    node.input[i] = new_name
-                    print(f"Remapped input: {old_name} -> {new_name} in node {node.name}")
-        
-        for i, output in enumerate(graph.output):
-            if output.name in tensor_remap:
-                old_name = output.name
-                new_name = tensor_remap[output.name]
-                output.name = new_name
-                print(f"Remapped graph output: {old_name} -> {new_name}")
-    
-    def _find_consumer(self, graph, tensor_name, op_type):
-        """Find the node that consumes tensor_name and has the specified op_type"""
-        for node in graph.node:
-            if node.op_type == op_type and tensor_name in node.input:
-                return node
-        return None
-    
+            index.remove_node(quant_node)
+            index.remove_node(dequant_node)
+            logger.debug("Deleting QuantizeLinear -> DequantizeLinear pair: %s -> %s", quant_node.name, dequant_node.name)
+        counters.incr("export.qdq_pairs_deleted", len(pairs_to_delete))
+
+        for node, input_name, new_name in index.remap_inputs(tensor_remap):
+            counters.incr("export.inputs_remapped")
+            logger.debug("Remapped input: %s -> %s in node %s", input_name, new_name, node.name)
+        index.commit()
+
 class DeleteFirstLastQuantizeDequantizePass:
     """
     Deletes the first QuantizeLinear/DequantizeLinear pair after input and before output.
     """
-    def run(self, graph):
+    def run(self, graph, index=None):
+        index = index or GraphIndex(graph)
         input_names = {inp.name for inp in graph.input}
         output_names = {out.name for out in graph.output}
         tensor_remap = {}
 
-        for node in graph.node:
-            if node.op_type == "QuantizeLinear" and node.input[0] in input_names:
-                quant_node = node
+        for quant_node in index.nodes("QuantizeLinear"):
+            if quant_node.input[0] in input_names:
                 quant_output = quant_node.output[0]
-                dequant_node = self._find_consumer(graph, quant_output, "DequantizeLinear")
+                dequant_node = index.consumer(quant_output, "DequantizeLinear")
                 if dequant_node:
                     tensor_remap[dequant_node.output[0]] = quant_node.input[0]
-                    graph.node.remove(quant_node)
-                    graph.node.remove(dequant_node)
-                    print(f"Deleted QuantizeLinear/DequantizeLinear after input: {quant_node.name} -> {dequant_node.name}")
+                    index.remove_node(quant_node)
+                    index.remove_node(dequant_node)
+                    logger.debug("Deleted QuantizeLinear/DequantizeLinear after input: %s -> %s", quant_node.name, dequant_node.name)
                 break  # Only first pair
 
-        for node in graph.node:
-            if node.op_type == "DequantizeLinear" and node.output[0] in output_names:
-                dequant_node = node
+        for dequant_node in index.nodes("DequantizeLinear"):
+            if dequant_node.output[0] in output_names:
                 dequant_input = dequant_node.input[0]
-                quant_node = self._find_producer(graph, dequant_input, "QuantizeLinear")
+                quant_node = index.producer(dequant_input, "QuantizeLinear")
                 if quant_node:
                     tensor_remap[dequant_node.output[0]] = quant_node.input[0]
-                    graph.node.remove(quant_node)
-                    graph.node.remove(dequant_node)
-                    print(f"Deleted QuantizeLinear/DequantizeLinear before output: {quant_node.name} -> {dequant_node.name}")
+                    index.remove_node(quant_node)
+                    index.remove_node(dequant_node)
+                    logger.debug("Deleted QuantizeLinear/DequantizeLinear before output: %s -> %s", quant_node.name, dequant_node.name)
                 break  # Only first pair
 
-        for node in graph.node:
-            for i, input_name in enumerate(node.input):
-                if input_name in tensor_remap:
-                    node.input[i] = tensor_remap[input_name]
-
-        for output in graph.output:
-            if output.name in tensor_remap:
-                output.name = tensor_remap[output.name]
-
-    def _find_consumer(self, graph, tensor_name, op_type):
-        for node in graph.node:
-            if node.op_type == op_type and tensor_name in node.input:
-                return node
-        return None
-
-    def _find_producer(self, graph, tensor_name, op_type):
-        for node in graph.node:
-            if node.op_type == op_type and tensor_name in node.output:
-                return node
-        return None
-    
+        index.remap_inputs(tensor_remap)
+        index.commit()
+
 class DeleteFirstInputQDQPass:
     """
     Deletes only the first QuantizeLinear -> DequantizeLinear pair immediately after the input.
     """
-    def run(self, graph):
+    def run(self, graph, index=None):
+        index = index or GraphIndex(graph)
         input_names = {inp.name for inp in graph.input}
         tensor_remap = {}
 
-        for node in graph.node:
-            if node.op_type == "QuantizeLinear" and node.input[0] in input_names:
-                quant_node = node
+        for quant_node in index.nodes("QuantizeLinear"):
+            if quant_node.input[0] in input_names:
                 quant_output = quant_node.output[0]
-                dequant_node = self._find_consumer(graph, quant_output, "DequantizeLinear")
+                dequant_node = index.consumer(quant_output, "DequantizeLinear")
                 if dequant_node:
                     # Remap output of dequant to input of quant
                     tensor_remap[dequant_node.output[0]] = quant_node.input[0]
-                    graph.node.remove(quant_node)
-                    graph.node.remove(dequant_node)
-                    print(f"Deleted first QDQ pair after input: {quant_node.name} -> {dequant_node.name}")
+                    index.remove_node(quant_node)
+                    index.remove_node(dequant_node)
+                    logger.debug("Deleted first QDQ pair after input: %s -> %s", quant_node.name, dequant_node.name)
                 break  # Only the first pair
 
-        for node in graph.node:
-            for i, input_name in enumerate(node.input):
-                if input_name in tensor_remap:
-                    node.input[i] = tensor_remap[input_name]
-
-        for output in graph.output:
-            if output.name in tensor_remap:
-                output.name = tensor_remap[output.name]
-
-    def _find_consumer(self, graph, tensor_name, op_type):
-        for node in graph.node:
-            if node.op_type == op_type and tensor_name in node.input:
-                return node
-        return None
\ No newline at end of file
+        index.remap_inputs(tensor_remap)
+        index.commit()
@@ -2,42 +2,37 @@ import onnx
 from onnx import helper
 from onnx import numpy_helper
 
+from .graph_index import GraphIndex
+
 class GemmQuantDequantFusionPass:
-    def run(self, graph):
+    def run(self, graph, index=None):
         """
         Fuse Gemm -> QuantizeLinear -> DequantizeLinear into QGemmCustom
         """
+        index = index or GraphIndex(graph)
         nodes_to_remove = []
         nodes_to_add = []
         
-        for i, node in enumerate(graph.node):
-            if node.op_type == 'Gemm':
-                quant_node = self._find_next_node_by_input(graph, node.output[0], 'QuantizeLinear')
-                if quant_node is None:
-                    continue
-                    
-                dequant_node = self._find_next_node_by_input(graph, quant_node.output[0], 'DequantizeLinear')
-                if dequant_node is None:
-                    continue
-                
-                fused_node = self._create_qgemm_custom_node(node, quant_node, dequant_node)
-                nodes_to_add.append(fused_node)
+        for node in index.nodes('Gemm'):
+            quant_node = index.consumer(node.output[0], 'QuantizeLinear')
+            if quant_node is None:
+                continue
                 
-                nodes_to_remove.extend([node, quant_node, dequant_node])
+            dequant_node = index.consumer(quant_node.output[0], 'DequantizeLinear')
+            if dequant_node is None:
+                continue
+            
+            fused_node = self._create_qgemm_custom_node(node, quant_node, dequant_node)
+            nodes_to_add.append(fused_node)
+            
+            nodes_to_remove.extend([node, quant_node, dequant_node])
         
         for node in nodes_to_remove:
-            if node in graph.node:
-                graph.node.remove(node)
+            index.remove_node(node)
         
         for node in nodes_to_add:
-            graph.node.append(node)
-    
-    def _find_next_node_by_input(self, graph, output_name, op_type):
-        """Find the next node that uses output_name as input and has the specified op_type"""
-        for node in graph.node:
-            if node.op_type == op_type and output_name in node.input:
-                return node
-        return None
+            index.add_node(node)
+        index.commit()
     
     def _create_qgemm_custom_node(self, gemm_node, quant_node, dequant_node):
         """Create a QGemmCustom node from Gemm, QuantizeLinear, and DequantizeLinear nodes"""
@@ -102,37 +97,30 @@ class GemmQuantDequantFusionPass:
             return None
         
 class QGemmReluFusionPass:
-    def run(self, graph):
+    def run(self, graph, index=None):
         """
         Fuse QGemmCustom -> Relu into QGemmReluCustom
         """
+        index = index or GraphIndex(graph)
         nodes_to_remove = []
         nodes_to_add = []
         
-        for node in graph.node:
-            if node.op_type == 'QGemmCustom':
-                relu_node = self._find_next_node_by_input(graph, node.output[0], 'Relu')
-                if relu_node is None:
-                    continue
-                
-                fused_node = self._create_qgemm_relu_custom_node(node, relu_node)
-                nodes_to_add.append(fused_node)
-                
-                nodes_to_remove.extend([node, relu_node])
+        for node in index.nodes('QGemmCustom'):
+            relu_node = index.consumer(node.output[0], 'Relu')
+            if relu_node is None:
+                continue
+            
+            fused_node = self._create_qgemm_relu_custom_node(node, relu_node)
+            nodes_to_add.append(fused_node)
+            
+            nodes_to_remove.extend([node, relu_node])
         
         for node in nodes_to_remove:
-            if node in graph.node:
-                graph.node.remove(node)
+            index.remove_node(node)
         
         for node in nodes_to_add:
-            graph.node.append(node)
-    
-    def _find_next_node_by_input(self, graph, output_name, op_type):
-        """Find the next node that uses output_name as input and has the specified op_type"""
-        for node in graph.node:
-            if node.op_type == op_type and output_name in node.input:
-                return node
-        return None
+            index.add_node(node)
+        index.commit()
     
     def _create_qgemm_relu_custom_node(self, qgemm_node, relu_node):
         """Create a QGemmReluCustom node from QGemmCustom and Relu nodes"""
@@ -0,0 +1,172 @@
+"""
+Producer / consumer index of an ONNX graph shared by the export passes.
+
+    index = GraphIndex(graph)
+    for quant_node in index.nodes("QuantizeLinear"):
+        dequant_node = index.consumer(quant_node.output[0], "DequantizeLinear")
+        ...
+        index.remove_node(quant_node)
+    index.commit()
+
+Lookups are dictionary hits instead of scans of graph.node. Edits made
+through the index keep it up to date. Removed nodes disappear from every
+lookup at once but stay in graph.node until commit(), which rebuilds
+graph.node in a single pass instead of one linear remove per node.
+
+Protobuf messages are not hashable, so nodes are keyed by id(node). The
+index holds a reference to every node it maps, which keeps these ids
+stable. Node references taken before commit() must not be used after it:
+compaction copies the kept nodes back into graph.node.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class GraphIndex:
+    """Producer and consumer maps of graph.node, see module doc"""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.rebuild()
+
+    def rebuild(self):
+        """Index graph.node from scratch, e.g. after edits made without the index"""
+        # id(node) -> node, for the live nodes
+        self._nodes: Dict[int, object] = {}
+        # op_type -> {id(node): node}, in graph order
+        self._by_op: Dict[str, Dict[int, object]] = {}
+        # tensor -> id of the producing node
+        self._producers: Dict[str, int] = {}
+        # tensor -> {id(node): None}, consuming nodes in graph order
+        self._consumers: Dict[str, Dict[int, None]] = {}
+        # id(node) -> node, referenced so that their ids are not reused
+        self._removed: Dict[int, object] = {}
+        for node in self.graph.node:
+            self._register(node)
+
+    def _register(self, node):
+        key = id(node)
+        self._nodes[key] = node
+        self._by_op.setdefault(node.op_type, {})[key] = node
+        for name in node.output:
+            if name:
+                self._producers[name] = key
+        for name in node.input:
+            if name:
+                self._consumers.setdefault(name, {})[key] = None
+
+    def _unregister(self, node):
+        key = id(node)
+        del self._nodes[key]
+        del self._by_op[node.op_type][key]
+        for name in node.output:
+            if self._producers.get(name) == key:
+                del self._producers[name]
+        for name in node.input:
+            consumers = self._consumers.get(name)
+            if consumers is not None:
+                consumers.pop(key, None)
+
+    def __contains__(self, node) -> bool:
+        return id(node) in self._nodes
+
+    def nodes(self, op_type: Optional[str] = None) -> List[object]:
+        """Live nodes, all of them or those of op_type, in graph order"""
+        if op_type is None:
+            return list(self._nodes.values())
+        return list(self._by_op.get(op_type, {}).values())
+
+    def producer(self, tensor: str, op_type: Optional[str] = None):
+        """Node producing tensor, None if there is none or it is not of op_type"""
+        key = self._producers.get(tensor)
+        if key is None:
+            return None
+        node = self._nodes[key]
+        if op_type is not None and node.op_type != op_type:
+            return None
+        return node
+
+    def consumers(self, tensor: str, op_type: Optional[str] = None) -> List[object]:
+        """Nodes consuming tensor, optionally only those of op_type"""
+        nodes = [self._nodes[key] for key in self._consumers.get(tensor, ())]
+        if op_type is not None:
+            nodes = [node for node in nodes if node.op_type == op_type]
+        return nodes
+
+    def consumer(self, tensor: str, op_type: Optional[str] = None):
+        """First node consuming tensor (of op_type if given), None if none"""
+        for key in self._consumers.get(tensor, ()):
+            node = self._nodes[key]
+            if op_type is None or node.op_type == op_type:
+                return node
+        return None
+
+    def add_node(self, node):
+        """Append node to the graph, returns the message stored in graph.node"""
+        self.graph.node.append(node)
+        stored = self.graph.node[-1]
+        self._register(stored)
+        return stored
+
+    def remove_node(self, node):
+        """Drop node from the lookups, graph.node is compacted at commit()"""
+        if id(node) in self._nodes:
+            self._unregister(node)
+            self._removed[id(node)] = node
+
+    def set_input(self, node, i: int, tensor: str):
+        """Replace input i of node"""
+        key = id(node)
+        old = node.input[i]
+        node.input[i] = tensor
+        if old not in node.input:
+            self._consumers.get(old, {}).pop(key, None)
+        if tensor:
+            self._consumers.setdefault(tensor, {})[key] = None
+
+    def remap_inputs(
+        self, tensor_remap: Dict[str, str]
+    ) -> List[Tuple[object, str, str]]:
+        """
+        Replace every consumed tensor in tensor_remap by its new name, graph
+        outputs included. Names are looked up once, so a remapped name is not
+        remapped again. Returns the (node, old, new) input replacements.
+        """
+        replacements = []
+        for old, new in tensor_remap.items():
+            for node in self.consumers(old):
+                for i, name in enumerate(node.input):
+                    if name == old:
+                        replacements.append((node, i, old, new))
+        for node, i, old, new in replacements:
+            self.set_input(node, i, new)
+        for output in self.graph.output:
+            if output.name in tensor_remap:
+                old_name = output.name
+                output.name = tensor_remap[old_name]
+                logger.debug("Remapped graph output: %s -> %s", old_name, output.name)
+        return [(node, old, new) for node, _, old, new in replacements]
+
+    def find_by_name(self, name: str):
+        """First live node called name, None if there is none"""
+        for node in self._nodes.values():
+            if node.name == name:
+                return node
+        return None
+
+    def commit(self):
+        """Remove the removed nodes from graph.node in one pass and reindex"""
+        if not self._removed:
+            return
+        kept = []
+        for node in self.graph.node:
+            if id(node) not in self._removed:
+                copy = type(node)()
+                copy.CopyFrom(node)
+                kept.append(copy)
+        del self.graph.node[:]
+        self.graph.node.extend(kept)
+        self.rebuild()
@@ -1,15 +1,44 @@
+import inspect
+
+from .graph_index import GraphIndex
+
+
+def _accepts_index(optimization_pass) -> bool:
+    """Whether optimization_pass.run takes the shared GraphIndex"""
+    try:
+        parameters = inspect.signature(optimization_pass.run).parameters
+    except (TypeError, ValueError):
+        return False
+    return "index" in parameters or any(
+        p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters.values()
+    )
+
+
 class PassManager:
     def __init__(self, graph):
         self.graph = graph
         self.passes = []
+        self.index = None
         
     def add_pass(self, optimization_pass):
         self.passes.append(optimization_pass)
         
     def run_passes(self):
-        """Run all registered passes in order"""
+        """
+        Run all registered passes in order, sharing one GraphIndex between the
+        passes whose run takes an index argument. Passes with a plain
+        run(graph) edit graph.node directly, so the index is rebuilt after them.
+        """
         for p in self.passes:
-            p.run(self.graph)
+            if not _accepts_index(p):
+                p.run(self.graph)
+                self.index = None
+                continue
+            if self.index is None:
+                self.index = GraphIndex(self.graph)
+            p.run(self.graph, index=self.index)
+        if self.index is None:
+            self.index = GraphIndex(self.graph)
         
     def get_optimized_graph(self):
-        return self.graph
\ No newline at end of file
+        return self.graph
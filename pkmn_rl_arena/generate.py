@@ -0,0 +1,221 @@
+"""
+Generate offline trajectory datasets with parallel env workers.
+
+    python -m pkmn_rl_arena.generate --output dataset --workers 8 --episodes 1000
+    python -m pkmn_rl_arena.generate --output dataset --policy my_module:my_policy
+
+Every worker is forked from one booted emulator (see env/fork_server.py) and
+writes its own shard with data/trajectory.py. Running the same command again
+resumes: each shard skips the episodes it already holds, so --episodes can
+also be raised to extend a dataset. The rows of an episode interrupted by a
+crash (after the last done flag of a shard) are dropped before resuming, so
+every episode in a shard ends with a done flag once the run completes.
+
+A policy is called as policy(core, agent, legal_actions) -> action, for
+every agent required by the current turn.
+"""
+
+from pkmn_rl_arena.data.trajectory import (
+    AGENTS,
+    TrajectoryReader,
+    TrajectoryWriter,
+    drop_partial_episode,
+    shard_dir,
+)
+
+import argparse
+import importlib
+import json
+import os
+import queue
+import random
+import sys
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+MANIFEST_FILE = "manifest.json"
+
+Policy = Callable[..., int]
+
+
+def load_policy(spec: str) -> Policy:
+    """Resolve "random" or a "module:callable" policy spec"""
+    if spec == "random":
+        from pkmn_rl_arena.env.evaluation import random_policy
+
+        return random_policy
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Policy must be 'random' or 'module:callable', got {spec!r}")
+    policy = getattr(importlib.import_module(module_name), attr)
+    if not callable(policy):
+        raise TypeError(f"Policy {spec!r} is not callable")
+    return policy
+
+
+def count_episodes(output_dir: str, shard: int) -> int:
+    """Count the complete episodes of a shard (done flags)"""
+    if not os.path.isdir(shard_dir(output_dir, shard)):
+        return 0
+    reader = TrajectoryReader(output_dir, shards=[shard])
+    return int(sum(chunk["done"].sum() for chunk in reader.iter_chunks()))
+
+
+def _generate_worker(
+    core,
+    worker_id: int,
+    output_dir: str,
+    policy_spec: str,
+    episodes: int,
+    chunk_size: int,
+    seed: int,
+    progress,
+    report_every: float,
+):
+    policy = load_policy(policy_spec)
+    if os.path.isdir(shard_dir(output_dir, worker_id)):
+        # New episodes must not continue the one a crash interrupted
+        drop_partial_episode(output_dir, worker_id)
+    start = count_episodes(output_dir, worker_id)
+    if start:
+        # Do not replay the random stream of the episodes already written
+        random.seed(f"{seed}:{worker_id}:{start}")
+        np.random.seed(random.getrandbits(32))
+
+    steps = 0
+    done_episodes = 0
+    last_report = time.perf_counter()
+    with TrajectoryWriter(output_dir, worker_id, chunk_size) as writer:
+        for _ in range(start, episodes):
+            core.reset()
+            done = False
+            while not done:
+                obs = core.observation_manager.get_raw_observations()
+                mask = {
+                    agent: core.action_manager.get_legal_action_mask(agent)
+                    for agent in AGENTS
+                }
+                actions = {}
+                for agent in core.get_required_agents():
+                    legal_actions = core.action_manager.get_legal_actions(agent)
+                    if legal_actions:
+                        actions[agent] = policy(core, agent, legal_actions)
+                _, rewards, done, _ = core.step(actions)
+                writer.append(obs, mask, actions, rewards, done)
+                steps += 1
+
+                now = time.perf_counter()
+                if now - last_report >= report_every:
+                    progress.put((worker_id, steps, done_episodes, False))
+                    steps, done_episodes, last_report = 0, 0, now
+            done_episodes += 1
+    progress.put((worker_id, steps, done_episodes, True))
+
+
+def check_manifest(output_dir: str, config: dict) -> dict:
+    """
+    Write the dataset manifest, or check a resumed run against it.
+    Returns the manifest in effect.
+    """
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+        for key in ("policy", "chunk_size"):
+            if manifest[key] != config[key]:
+                raise ValueError(
+                    f"{output_dir} was generated with {key}={manifest[key]!r}, "
+                    f"got {config[key]!r}"
+                )
+        if config["seed"] is None:
+            config["seed"] = manifest["seed"]
+    elif config["seed"] is None:
+        config["seed"] = random.randrange(2**31)
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(config, f, indent=2)
+    return config
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", required=True, help="dataset directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--episodes", type=int, default=100, help="episodes per worker shard"
+    )
+    parser.add_argument(
+        "--policy", default="random", help="'random' or 'module:callable'"
+    )
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--report-every", type=float, default=5.0, help="seconds between reports"
+    )
+    args = parser.parse_args(argv)
+
+    load_policy(args.policy)  # fail before forking on a bad spec
+    config = check_manifest(
+        args.output,
+        {
+            "policy": args.policy,
+            "chunk_size": args.chunk_size,
+            "episodes_per_worker": args.episodes,
+            "seed": args.seed,
+        },
+    )
+
+    from pkmn_rl_arena.env.fork_server import ForkServer
+
+    with ForkServer(base_seed=config["seed"]) as server:
+        progress = server.ctx.Queue()
+        server.spawn(
+            _generate_worker,
+            args.workers,
+            args=(
+                args.output,
+                args.policy,
+                args.episodes,
+                args.chunk_size,
+                config["seed"],
+                progress,
+                args.report_every,
+            ),
+        )
+
+        start = time.perf_counter()
+        total_steps = total_episodes = 0
+        running = set(range(args.workers))
+        while running:
+            try:
+                worker_id, steps, episodes, finished = progress.get(
+                    timeout=args.report_every
+                )
+            except queue.Empty:
+                crashed = [
+                    i for i in running if not server.workers[i].is_alive()
+                ]
+                if crashed:
+                    print(f"workers {crashed} exited early", file=sys.stderr)
+                    return 1
+                continue
+            total_steps += steps
+            total_episodes += episodes
+            if finished:
+                running.discard(worker_id)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{total_steps} steps, {total_episodes} episodes, "
+                f"{total_steps / elapsed:.0f} steps/s, "
+                f"{len(running)} workers running",
+                file=sys.stderr,
+            )
+        server.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Logging and instrumentation helpers.
+
+Every module logs through `logging.getLogger(__name__)`, so the logger
+hierarchy mirrors the package layout ("pkmn_rl_arena.env.battle_core",
+"pkmn_rl_arena.export.passes.delete_pass", ...) and levels can be set per
+subsystem. Messages use lazy %-formatting, so disabled levels cost a single
+level check. Nothing is printed unless the application configures logging.
+
+High frequency events (turns, remapped tensors, ...) are counted with
+`counters` instead of being logged one by one. Counting is off by default.
+"""
+
+import logging
+import os
+from collections import Counter
+from typing import Dict, Optional, Union
+
+ROOT_LOGGER_NAME = "pkmn_rl_arena"
+LOG_LEVELS_ENV_VAR = "PKMN_RL_LOG"
+
+
+def get_logger(subsystem: Optional[str] = None) -> logging.Logger:
+    """Get the logger of a subsystem, e.g. "env" or "export.passes" """
+    if not subsystem:
+        return logging.getLogger(ROOT_LOGGER_NAME)
+    if subsystem.startswith(ROOT_LOGGER_NAME):
+        return logging.getLogger(subsystem)
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{subsystem}")
+
+
+def set_level(subsystem: Optional[str], level: Union[int, str]):
+    """Set the log level of a subsystem and everything below it"""
+    if isinstance(level, str):
+        level = level.upper()
+    get_logger(subsystem).setLevel(level)
+
+
+def configure(
+    levels: Optional[Dict[str, Union[int, str]]] = None,
+    handler: Optional[logging.Handler] = None,
+):
+    """
+    Attach a handler to the package logger and set per subsystem levels.
+
+    Args:
+        levels: Mapping subsystem -> level, e.g. {"env": "DEBUG", "export": "INFO"}.
+            Defaults to the PKMN_RL_LOG environment variable, formatted as
+            "env=DEBUG,export.passes=INFO".
+        handler: Handler to attach, defaults to a stderr StreamHandler
+    """
+    if levels is None:
+        levels = parse_levels(os.environ.get(LOG_LEVELS_ENV_VAR, ""))
+    if handler is None:
+        handler = logging.StreamHandler()
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s %(name)s %(levelname)s: %(message)s")
+        )
+    get_logger().addHandler(handler)
+    for subsystem, level in levels.items():
+        set_level(subsystem, level)
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Parse a "subsystem=LEVEL,..." string, a bare LEVEL applies to the package"""
+    levels = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if "=" in item:
+            subsystem, level = item.split("=", 1)
+            levels[subsystem.strip()] = level.strip()
+        else:
+            levels[""] = item
+    return levels
+
+
+class EventCounters:
+    """
+    Named event counters used in place of per event log lines.
+    Disabled counters only cost an attribute check.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.counts = Counter()
+
+    def incr(self, name: str, n: int = 1):
+        """Increment counter `name` by n if counting is enabled"""
+        if self.enabled:
+            self.counts[name] += n
+
+    def snapshot(self) -> Dict[str, int]:
+        """Get a copy of the current counts"""
+        return dict(self.counts)
+
+    def reset(self):
+        """Reset all counts to zero"""
+        self.counts.clear()
+
+
+counters = EventCounters()
@@ -1,5 +1,3 @@
-import torch
-import torch.nn as nn
 from onnxruntime.quantization import quantize_static, CalibrationDataReader, QuantType, QuantFormat
 from onnxruntime.quantization import QDQQuantizer
 from onnxruntime.quantization import shape_inference
@@ -4,6 +4,8 @@ import pkmn_rl_arena.data.parser
 import pkmn_rl_arena.data.pokemon_data
 
 from pkmn_rl_arena import ROM_PATH, BIOS_PATH, MAP_PATH, POKEMON_CSV_PATH
+import multiprocessing
+import pickle
 import unittest
 import sys
 import os
@@ -15,10 +17,40 @@ sys.path.insert(0, project_root)
 MAIN_STEPS = 64000
 
 
+def _fail_on_zero(core, item):
+    """Pool function failing on item 0, slow enough to leave others in flight"""
+    if item == 0:
+        raise ValueError("item 0")
+    core.turn_manager.advance_to_next_turn()
+    return item
+
+
+def _report_worker(core, worker_id, queue):
+    """
+    ForkServer target reporting that it started, the stop its core was forked
+    at, a nested child process exit code and the turn reached after a reset
+    """
+    queue.put(("started", worker_id))
+    turn = core.get_current_turn_type()
+    child = multiprocessing.get_context("fork").Process(target=int)
+    child.start()
+    child.join()
+    core.reset()
+    queue.put(("done", (turn, child.exitcode, core.get_current_turn_type())))
+
+
 class TestPokemonRLCore(unittest.TestCase):
     def setUp(self):
         self.core = PokemonRLCore(ROM_PATH, BIOS_PATH, MAP_PATH)
 
+    def _first_legal_actions(self, core=None):
+        """First legal action of every agent required by the current turn"""
+        core = core or self.core
+        return {
+            agent: core.action_manager.get_legal_actions(agent)[0]
+            for agent in core.get_required_agents()
+        }
+
     def test_advance_to_next_turn(self):
         # self.core.reset()
         turn = self.core.turn_manager.advance_to_next_turn()
@@ -709,6 +741,339 @@ class TestPokemonRLCore(unittest.TestCase):
             "The active Pokémon in the player team should have ID 26.",
         )
 
+    def _run_decided_battle(self, early_termination):
+        """
+        Pikachu lvl 99 using shock wave against a Squirtle with 10% HP, returns
+        the core, the step info and the number of emulation chunks run.
+        """
+        core = PokemonRLCore(
+            ROM_PATH, BIOS_PATH, MAP_PATH, early_termination=early_termination
+        )
+        empty_slots = [0, 10, 0, 0, 0, 0, 0, 0] * 5
+        player_team = [25, 99, 84, 84, 84, 84, 100, 0] + empty_slots
+        enemy_team = [7, 10, 45, 45, 45, 45, 10, 0] + empty_slots
+
+        turn = core.turn_manager.advance_to_next_turn()
+        self.assertEqual(turn, TurnType.CREATE_TEAM)
+        core.battle_core.write_team_data("player", player_team)
+        core.battle_core.write_team_data("enemy", enemy_team)
+        core.battle_core.clear_stop_condition(turn)
+
+        turn = core.turn_manager.advance_to_next_turn()
+        self.assertEqual(turn, TurnType.GENERAL)
+
+        chunks = []
+        core.battle_core.frame_hook = lambda gba: chunks.append(None)
+        _, _, done, info = core.step({"player": 0, "enemy": 0})
+        self.assertTrue(done)
+        self.assertEqual(info["current_turn"], TurnType.DONE)
+        self.assertTrue(
+            pkmn_rl_arena.data.pokemon_data.is_team_defeated(
+                core.battle_core.read_team_data("enemy")
+            )
+        )
+        return core, info, len(chunks)
+
+    def test_early_termination(self):
+        _, info, early_chunks = self._run_decided_battle(early_termination=True)
+        self.assertTrue(info["outcome_decided_early"])
+
+        # Control: without early termination the end of battle is emulated
+        _, info, full_chunks = self._run_decided_battle(early_termination=False)
+        self.assertFalse(info["outcome_decided_early"])
+        self.assertGreater(full_chunks, early_chunks)
+
+    def test_changed_slots(self):
+        self.core.reset()
+        mask = self.core.observation_manager.get_changed_mask()
+        self.assertTrue(mask["player"].all())
+        self.assertTrue(mask["enemy"].all())
+
+        # Nothing was emulated since the reset, no slot changed
+        self.core.observation_manager.get_observations()
+        self.assertFalse(mask["player"].any())
+        self.assertFalse(mask["enemy"].any())
+
+        actions = self._first_legal_actions()
+        _, _, _, info = self.core.step(actions)
+        self.assertEqual(info["changed_slots"]["player"].shape, (6,))
+        encoded = self.core.observation_manager.get_encoded_observations()
+        self.assertEqual(
+            encoded["player"].shape,
+            (6, pkmn_rl_arena.data.pokemon_data.MON_FEATURE_SIZE),
+        )
+
+    def test_observation_history(self):
+        core = PokemonRLCore(ROM_PATH, BIOS_PATH, MAP_PATH, observation_history=4)
+        core.reset()
+        history = core.get_observation_history()
+        self.assertEqual(history.shape[:3], (4, 2, 6))
+        self.assertFalse(history[:3].any())
+        first = core.observation_manager.get_encoded_observations()["player"].copy()
+        self.assertTrue((history[-1, 0] == first).all())
+
+        for _ in range(5):
+            actions = self._first_legal_actions(core)
+            _, _, done, _ = core.step(actions)
+            if done:
+                break
+        history = core.get_observation_history()
+        latest = core.observation_manager.get_encoded_observations()
+        self.assertTrue((history[-1, 1] == latest["enemy"]).all())
+
+        core.reset()
+        self.assertFalse(core.get_observation_history()[:3].any())
+
+    def test_pixel_observations(self):
+        core = PokemonRLCore(
+            ROM_PATH,
+            BIOS_PATH,
+            MAP_PATH,
+            pixel_observations=True,
+            pixel_grayscale=True,
+            pixel_downsample=2,
+        )
+        core.reset()
+        pixels = core.get_pixel_observation()
+        self.assertEqual(pixels.shape, (80, 120, 1))
+        self.assertEqual(str(pixels.dtype), "uint8")
+
+    def test_recording(self):
+        import numpy as np
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            self.core.start_recording(output_dir, frame_skip=4, chunk_size=16)
+            self.core.reset()
+            for _ in range(3):
+                actions = self._first_legal_actions()
+                _, _, done, _ = self.core.step(actions)
+                if done:
+                    break
+            recorder = self.core.recorder
+            self.core.stop_recording()
+
+            self.assertGreater(recorder.recorded, 0)
+            self.assertTrue(recorder.files)
+            with np.load(recorder.files[-1]) as chunk:
+                self.assertEqual(chunk["frames"].shape[1:], (160, 240, 3))
+
+    def test_state_pool_reset(self):
+        from pkmn_rl_arena.env.curriculum import StatePool
+
+        pool = StatePool(capacity=4, collect_every=1, reset_probability=1.0, seed=0)
+        self.core.reset(state_pool=pool)
+        for _ in range(6):
+            actions = self._first_legal_actions()
+            _, _, done, _ = self.core.step(actions)
+            if done:
+                break
+        self.assertGreater(len(pool), 0)
+        self.assertLessEqual(len(pool), 4)
+
+        self.core.reset(state_pool=pool)
+        self.assertIsNotNone(self.core.pool_slot)
+        self.assertIn(self.core.get_current_turn_type(), (
+            TurnType.GENERAL, TurnType.PLAYER, TurnType.ENEMY
+        ))
+        actions = self._first_legal_actions()
+        _, _, _, info = self.core.step(actions)
+        self.assertEqual(info["state_pool_slot"], self.core.pool_slot)
+
+    def test_rng_control(self):
+        from pkmn_rl_arena.env.battle_core import RNG_SYMBOL
+        from pkmn_rl_arena.env.evaluation import evaluate_paired, random_policy
+
+        if RNG_SYMBOL not in self.core.battle_core.addrs:
+            self.skipTest(f"{RNG_SYMBOL} is not in the map file")
+        self.core.reset()
+        self.core.battle_core.set_rng(1234)
+        self.assertEqual(self.core.battle_core.get_rng(), 1234)
+
+        # The same policy on the same seeds scores exactly the same
+        result = evaluate_paired(
+            self.core, random_policy, random_policy, episodes=2, base_seed=7
+        )
+        self.assertEqual(result.scores_a, result.scores_b)
+        self.assertEqual(result.difference, 0.0)
+
+    def test_paired_opponent_stream(self):
+        import random
+
+        from pkmn_rl_arena.env.evaluation import play_episode, random_policy
+
+        def first_legal(core, agent, legal_actions):
+            return legal_actions[0]
+
+        def greedy_random(core, agent, legal_actions):
+            # Draws more than random_policy would
+            random.random()
+            return random_policy(core, agent, legal_actions)
+
+        def recording_opponent(draws):
+            def policy(core, agent, legal_actions):
+                draws.append(random.random())
+                return legal_actions[0]
+
+            return policy
+
+        # Opponent draws do not depend on what the player policy draws
+        draws_a, draws_b = [], []
+        play_episode(self.core, first_legal, recording_opponent(draws_a), seed=3)
+        play_episode(self.core, greedy_random, recording_opponent(draws_b), seed=3)
+        length = min(len(draws_a), len(draws_b))
+        self.assertGreater(length, 0)
+        self.assertEqual(draws_a[:length], draws_b[:length])
+
+    def test_transposition_table(self):
+        core = PokemonRLCore(ROM_PATH, BIOS_PATH, MAP_PATH, transposition_capacity=8)
+        core.reset()
+        root = core.save_state_manager.snapshot(core.turn_manager.state)
+        root_hash = core.state_hash()
+        actions = self._first_legal_actions(core)
+
+        observations, _, _, info = core.branch_step(actions)
+        self.assertFalse(info["transposition_hit"])
+        child_hash = core.state_hash()
+
+        core.turn_manager.state = core.save_state_manager.restore(root)
+        self.assertEqual(core.state_hash(), root_hash)
+        cached_observations, _, _, info = core.branch_step(actions)
+        self.assertTrue(info["transposition_hit"])
+        self.assertEqual(core.state_hash(), child_hash)
+        self.assertTrue(
+            cached_observations["player"].equals(observations["player"])
+        )
+
+    def test_one_turn_oracle(self):
+        from pkmn_rl_arena.env.emulator_pool import EmulatorPool
+        from pkmn_rl_arena.env.oracle import OneTurnOracle
+
+        self.core.reset()
+        while self.core.get_current_turn_type() != TurnType.GENERAL:
+            actions = self._first_legal_actions()
+            self.core.step(actions)
+
+        with EmulatorPool(2) as pool:
+            outcomes, valid = OneTurnOracle(pool).query_core(self.core)
+
+        legal_player = self.core.action_manager.get_legal_actions("player")
+        legal_enemy = self.core.action_manager.get_legal_actions("enemy")
+        self.assertEqual(outcomes.shape, (10, 10, 2, 210))
+        self.assertEqual(int(valid.sum()), len(legal_player) * len(legal_enemy))
+
+        # Same outcome as playing the pair serially
+        p, e = legal_player[0], legal_enemy[0]
+        self.core.step({"player": p, "enemy": e})
+        self.assertEqual(
+            outcomes[p, e, 0].tolist(), self.core.battle_core.read_team_data("player")
+        )
+
+    def test_emulator_pool_error_recovery(self):
+        from pkmn_rl_arena.env.emulator_pool import EmulatorPool
+
+        with EmulatorPool(2) as pool:
+            with self.assertRaises(RuntimeError):
+                pool.map(_fail_on_zero, [0, 1, 2, 3])
+            # Replies of the failed call must not leak into the next one
+            self.assertEqual(pool.map(_fail_on_zero, [5, 6, 7]), [5, 6, 7])
+
+    def test_fork_server_workers(self):
+        import time
+
+        from pkmn_rl_arena.env.fork_server import ForkServer
+
+        startup = {}
+        with ForkServer() as server:
+            for count in (1, 8):
+                queue = server.ctx.Queue()
+                start = time.perf_counter()
+                server.spawn(_report_worker, count, args=(queue,))
+                messages = [queue.get(timeout=120) for _ in range(2 * count)]
+                started = [m for kind, m in messages if kind == "started"]
+                reports = [m for kind, m in messages if kind == "done"]
+                self.assertEqual(len(started), count)
+                server.join(timeout=60)
+                startup[count] = time.perf_counter() - start
+
+                # Every worker starts at the server's stop, owns a working
+                # core and can start processes of its own
+                self.assertEqual(len(reports), count)
+                for turn, child_exitcode, turn_after_reset in reports:
+                    self.assertEqual(turn, TurnType.CREATE_TEAM)
+                    self.assertEqual(child_exitcode, 0)
+                    self.assertEqual(turn_after_reset, reports[0][2])
+        print(f"ForkServer start, reset and join: {startup}")
+        # Workers are forked from the booted core instead of booting each
+        self.assertLess(startup[8], 8 * startup[1])
+
+    def test_mcts_agent(self):
+        from pkmn_rl_arena.agents.mcts import MCTSAgent
+        from pkmn_rl_arena.env.emulator_pool import EmulatorPool
+
+        self.core.reset()
+        with EmulatorPool(2) as pool:
+            agent = MCTSAgent(pool, simulations=8, rollout_depth=2, seed=0)
+            for _ in range(2):
+                actions = {}
+                for name in self.core.get_required_agents():
+                    legal_actions = self.core.action_manager.get_legal_actions(name)
+                    actions[name] = agent(self.core, name, legal_actions)
+                    self.assertIn(actions[name], legal_actions)
+                self.assertGreaterEqual(agent.root.visits, 8)
+                _, _, done, _ = self.core.step(actions)
+                if done:
+                    break
+
+    def test_slim_snapshots(self):
+        core = PokemonRLCore(ROM_PATH, BIOS_PATH, MAP_PATH, slim_snapshots=True)
+        core.reset()
+        core.save_state_manager.snapshot(core.turn_manager.state)  # reference
+        actions = self._first_legal_actions(core)
+        core.step(actions)
+
+        state_hash = core.state_hash()
+        self.assertTrue(core.validate_snapshots())
+        self.assertEqual(core.state_hash(), state_hash)
+        slim = core.save_state_manager.snapshot(core.turn_manager.state)
+        full = core.save_state_manager.snapshot(core.turn_manager.state, slim=False)
+        self.assertLess(slim.nbytes, full.nbytes)
+        self.assertEqual(slim.decode().data, full.data)
+
+        # Pickles leave the reference out and resolve it when loaded
+        pickled = pickle.dumps(slim)
+        self.assertLess(len(pickled), len(pickle.dumps(full)))
+        self.assertEqual(pickle.loads(pickled).decode().data, full.data)
+
+    def test_vector_env_autoreset(self):
+        from pkmn_rl_arena.env.vector import VectorEnv
+
+        with VectorEnv(num_envs=2, prefetch_workers=1) as env:
+            obs, masks, infos = env.reset()
+            self.assertEqual(obs.shape[:3], (2, 2, 6))
+            self.assertEqual(masks.shape, (2, 2, 10))
+            finished = False
+            for _ in range(500):
+                actions = [
+                    {
+                        agent: int(masks[i, a].nonzero()[0][0])
+                        for a, agent in enumerate(("player", "enemy"))
+                        if agent in info["required_agents"]
+                    }
+                    for i, info in enumerate(infos)
+                ]
+                obs, masks, rewards, dones, infos = env.step(actions)
+                self.assertEqual(rewards.shape, (2, 2))
+                for done, info in zip(dones, infos):
+                    if done:
+                        finished = True
+                        self.assertIn("final_observation", info)
+                        # The fresh episode is already waiting for actions
+                        self.assertTrue(info["required_agents"])
+                if finished:
+                    break
+            self.assertTrue(finished)
+
     # def test_special_moves():
     #     #ROAR FLEE FLY MULTIMOVE MULTIHIT ENCORE move 5 also
     #     pass
@@ -0,0 +1,68 @@
+from pkmn_rl_arena.env.benchmark import compare, flatten_metrics, summarize
+
+import unittest
+
+
+def report(step_p50, steps_per_s, extra=None):
+    """Fake benchmark report with one latency summary and one throughput"""
+    results = {
+        "step": {"GENERAL": {"count": 10, "p50": step_p50}},
+        "steps_per_s": steps_per_s,
+        "emulation": {"share_of_step_time": 0.5},
+    }
+    results.update(extra or {})
+    return {"meta": {}, "results": results}
+
+
+class TestBenchmarkReport(unittest.TestCase):
+    def test_summarize(self):
+        summary = summarize([5.0, 1.0, 3.0, 2.0, 4.0])
+        self.assertEqual(summary["count"], 5)
+        self.assertEqual(summary["min"], 1.0)
+        self.assertEqual(summary["max"], 5.0)
+        self.assertEqual(summary["mean"], 3.0)
+        self.assertEqual(summary["p50"], 3.0)
+        # Linear interpolation between the closest ranks
+        self.assertAlmostEqual(summary["p90"], 4.6)
+        self.assertAlmostEqual(summary["p99"], 4.96)
+
+        self.assertEqual(summarize([2.0])["p99"], 2.0)
+        self.assertEqual(summarize([]), {"count": 0})
+
+    def test_flatten_metrics(self):
+        metrics = flatten_metrics(
+            report(
+                0.01,
+                100.0,
+                {
+                    "reset": {"count": 0},
+                    "scaling": {"2": {"steps_per_s": float("nan")}},
+                },
+            )
+        )
+        self.assertEqual(
+            metrics,
+            {"step.GENERAL.p50": (0.01, False), "steps_per_s": (100.0, True)},
+        )
+
+    def test_compare_thresholds(self):
+        baseline = report(0.010, 100.0)
+        # Slower and faster within the threshold
+        self.assertEqual(compare(report(0.0105, 95.0), baseline, 0.1), [])
+        self.assertEqual(compare(report(0.005, 200.0), baseline, 0.1), [])
+
+        regressions = compare(report(0.012, 80.0), baseline, 0.1)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("step.GENERAL.p50"))
+        self.assertTrue(regressions[1].startswith("steps_per_s"))
+
+        # A tighter threshold catches smaller changes
+        self.assertEqual(len(compare(report(0.0105, 95.0), baseline, 0.01)), 2)
+
+    def test_compare_skips_missing_and_zero(self):
+        baseline = report(0.0, 100.0, {"reset": {"count": 3, "p50": 0.2}})
+        self.assertEqual(compare(report(0.5, 100.0), baseline), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
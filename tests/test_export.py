@@ -6,6 +6,10 @@ from pkmn_rl_arena.export.passes.delete_pass import (
     DeleteQuantizePass,
     DeleteFirstLastQuantizeDequantizePass,
 )
+from pkmn_rl_arena.export.passes.graph_index import GraphIndex
+from pkmn_rl_arena.export.passes.pass_manager import PassManager
+from pkmn_rl_arena.export.engine import Int8Engine, qgemm
+from pkmn_rl_arena.export.exporters.layers.fc import QGemmCustomExporter
 from pkmn_rl_arena.export.exporters.parameters import ExportParameters
 from pkmn_rl_arena.export.onnx_exporter import ONNXExporter
 
@@ -19,6 +23,7 @@ import rustboyadvance_py
 
 import sys
 import os
+import tempfile
 import unittest
 
 import numpy as np
@@ -31,6 +36,7 @@ import torch.nn as nn
 from onnx import shape_inference
 from onnx import numpy_helper
 import torch.nn.functional as F
+from onnx import helper
 
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
@@ -97,22 +103,21 @@ def apply_fusion_passes(
         output_path = model_path
 
     onnx_model = onnx.load(model_path)
+    pass_manager = PassManager(onnx_model.graph)
 
     if use_gemm_fusion:
-        fusion_pass = GemmQuantDequantFusionPass()
-        fusion_pass.run(onnx_model.graph)
+        pass_manager.add_pass(GemmQuantDequantFusionPass())
 
     if use_delete_pass:
-        delete_pass = DeleteQuantizePass()
-        delete_pass.run(onnx_model.graph)
+        pass_manager.add_pass(DeleteQuantizePass())
 
     if use_delete_first_last_pass:
-        delete_first_pass = DeleteFirstLastQuantizeDequantizePass()
-        delete_first_pass.run(onnx_model.graph)
+        pass_manager.add_pass(DeleteFirstLastQuantizeDequantizePass())
 
     if use_delete_first_pass:
-        delete_first_pass = DeleteFirstInputQDQPass()
-        delete_first_pass.run(onnx_model.graph)
+        pass_manager.add_pass(DeleteFirstInputQDQPass())
+
+    pass_manager.run_passes()
 
     onnx.save(onnx_model, output_path)
     return output_path
@@ -209,6 +214,209 @@ def run_onnx_inference(onnx_path, input_data):
     return np.clip(np.round(ort_outs[0]), -128, 127).astype(np.int8).reshape(-1)
 
 
+def c_qgemm(x, weights, biases, multiplier, shift):
+    """Scalar transcription of qgemm_int8_t from nn_functions.h"""
+
+    def wrap32(v):
+        return (v + 2**31) % 2**32 - 2**31
+
+    output_size, input_size = weights.shape
+    output = []
+    for out in range(output_size):
+        acc = int(biases[out])
+        for k in range(input_size):
+            acc = wrap32(acc + int(weights[out, k]) * int(x[k]))
+        scaled = acc * multiplier
+        if shift > 0:
+            scaled += 1 << (shift - 1)
+            value = wrap32(scaled >> shift)
+        elif shift == 0:
+            value = wrap32(scaled)
+        else:
+            value = wrap32(scaled << -shift)
+        output.append(min(max(value, -128), 127))
+    return np.array(output, dtype=np.int8)
+
+
+def qdq_chain_graph():
+    """input -> Q -> DQ -> Gemm -> Q -> DQ -> Relu -> output"""
+    nodes = [
+        helper.make_node("QuantizeLinear", ["input", "s", "z"], ["q0"], name="q0"),
+        helper.make_node("DequantizeLinear", ["q0", "s", "z"], ["dq0"], name="dq0"),
+        helper.make_node("Gemm", ["dq0", "w", "b"], ["gemm"], name="gemm"),
+        helper.make_node("QuantizeLinear", ["gemm", "s", "z"], ["q1"], name="q1"),
+        helper.make_node("DequantizeLinear", ["q1", "s", "z"], ["dq1"], name="dq1"),
+        helper.make_node("Relu", ["dq1"], ["output"], name="relu"),
+    ]
+    return helper.make_graph(
+        nodes,
+        "qdq_chain",
+        [helper.make_tensor_value_info("input", onnx.TensorProto.FLOAT, [1, 4])],
+        [helper.make_tensor_value_info("output", onnx.TensorProto.FLOAT, [1, 2])],
+    )
+
+
+class TestGraphIndex(unittest.TestCase):
+    def test_lookups_and_edits(self):
+        graph = qdq_chain_graph()
+        index = GraphIndex(graph)
+        gemm = index.producer("gemm")
+        self.assertEqual(gemm.name, "gemm")
+        self.assertIsNone(index.producer("gemm", "Relu"))
+        self.assertEqual(index.consumer("gemm", "QuantizeLinear").name, "q1")
+        self.assertEqual(
+            [n.name for n in index.consumers("s")], ["q0", "dq0", "q1", "dq1"]
+        )
+        self.assertEqual(
+            [n.name for n in index.nodes("DequantizeLinear")], ["dq0", "dq1"]
+        )
+
+        index.remove_node(index.producer("q1"))
+        index.remove_node(index.producer("dq1"))
+        self.assertIsNone(index.consumer("gemm"))
+        self.assertEqual(len(graph.node), 6)  # compacted on commit
+        index.remap_inputs({"dq1": "gemm"})
+        self.assertEqual(index.consumer("gemm").name, "relu")
+        self.assertEqual(index.consumers("dq1"), [])
+
+        index.commit()
+        self.assertEqual([n.name for n in graph.node], ["q0", "dq0", "gemm", "relu"])
+        self.assertEqual(index.producer("dq0").name, "dq0")
+        self.assertEqual(list(index.producer("output").input), ["gemm"])
+
+    def test_pass_manager_shares_index(self):
+        graph = qdq_chain_graph()
+        pass_manager = PassManager(graph)
+        pass_manager.add_pass(GemmQuantDequantFusionPass())
+        pass_manager.add_pass(DeleteQuantizePass())
+        pass_manager.run_passes()
+
+        # Fused nodes are appended, as graph.node.append did before the index
+        self.assertEqual([n.op_type for n in graph.node], ["Relu", "QGemmCustom"])
+        relu, fused = graph.node
+        self.assertEqual(fused.input[0], "input")
+        self.assertEqual(list(relu.input), [fused.output[0]])
+        index = pass_manager.index
+        self.assertEqual(index.consumer(fused.output[0]).name, "relu")
+        self.assertEqual(index.nodes(), list(graph.node))
+
+    def test_pass_manager_plain_run(self):
+        class AppendIdentityPass:
+            """Pass written before the shared index, run(graph) only"""
+
+            def run(self, graph):
+                graph.node.append(
+                    helper.make_node("Identity", ["output"], ["copy"], name="copy")
+                )
+
+        graph = qdq_chain_graph()
+        pass_manager = PassManager(graph)
+        pass_manager.add_pass(GemmQuantDequantFusionPass())
+        pass_manager.add_pass(AppendIdentityPass())
+        pass_manager.add_pass(DeleteQuantizePass())
+        pass_manager.run_passes()
+
+        # The index used after the plain pass sees the node it appended
+        self.assertEqual(
+            [n.op_type for n in graph.node], ["Relu", "QGemmCustom", "Identity"]
+        )
+        index = pass_manager.index
+        self.assertEqual(index.consumer("output").name, "copy")
+        self.assertEqual(index.nodes(), list(graph.node))
+
+
+class TestInt8Engine(unittest.TestCase):
+    def test_qgemm_matches_c_kernel(self):
+        rng = np.random.default_rng(0)
+        x = rng.integers(-128, 128, (6, 37), dtype=np.int8)
+        weights = rng.integers(-128, 128, (9, 37), dtype=np.int8)
+        biases = rng.integers(-(2**20), 2**20, 9, dtype=np.int32)
+        layer = QGemmCustomExporter("qgemm", (1, 37), (1, 9))
+        layer.set_quantization_params(input_scale=0.02, output_scale=3.0)
+        for m, s in ((layer.multiplier, layer.shift), (3, 0), (1, -2)):
+            batched = qgemm(x, weights, biases, m, s)
+            for row, expected in zip(batched, x):
+                np.testing.assert_array_equal(
+                    row, c_qgemm(expected, weights, biases, m, s)
+                )
+
+    def test_fc_relu_matches_onnx(self):
+        class FCReLU(nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.fc = nn.Linear(10, 5, bias=True)
+                self.fc.weight.data = torch.randint(-5, 10, self.fc.weight.shape).float()
+                self.fc.bias.data = torch.randint(-5, 12, self.fc.bias.shape).float()
+
+            def forward(self, x):
+                return F.relu(self.fc(x))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            onnx_path = os.path.join(tmp, "fc_relu.onnx")
+            export_model_to_onnx(FCReLU(), torch.randn(1, 10), onnx_path)
+            engine = Int8Engine.from_onnx(onnx_path)
+
+            inputs = np.random.randint(-18, 12, (16, 10), dtype=np.int8)
+            outputs = engine.run(inputs)
+            self.assertEqual(outputs.shape, (16, 5))
+            for row, output in zip(inputs, outputs):
+                np.testing.assert_array_equal(
+                    output, run_onnx_inference(onnx_path, row.reshape(1, 10))
+                )
+
+    def test_quantized_plan_matches_onnx(self):
+        class TwoFCQuantRelu(nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.w0 = nn.Parameter(torch.randn(10, 8))
+                self.b0 = nn.Parameter(torch.randn(8))
+                self.w1 = nn.Parameter(torch.randn(8, 5))
+                self.b1 = nn.Parameter(torch.randn(5))
+
+            def forward(self, x):
+                x = F.relu(torch.matmul(x, self.w0) + self.b0)
+                return F.relu(torch.matmul(x, self.w1) + self.b1)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            onnx_path = os.path.join(tmp, "fc2.onnx")
+            quantized_path = os.path.join(tmp, "fc2_quant.onnx")
+            fused_path = os.path.join(tmp, "fc2_fused.onnx")
+            export_model_to_onnx(
+                TwoFCQuantRelu(), torch.randn(1, 10), onnx_path, opset_version=13
+            )
+            quantize_onnx_model(onnx_path, quantized_path)
+            quantized_graph = onnx.load(quantized_path).graph
+            input_scale = get_first_qdq_scaling_factor(quantized_graph)[0]
+            output_scale = get_last_qdq_scaling_factor(quantized_graph)[0]
+            apply_fusion_passes(
+                quantized_path,
+                fused_path,
+                use_gemm_fusion=True,
+                use_delete_pass=True,
+                use_delete_first_pass=False,
+                use_delete_first_last_pass=False,
+            )
+            engine = Int8Engine.from_onnx(fused_path)
+
+            inputs = np.random.uniform(-1, 1, (8, 10)).astype(np.float32)
+            outputs = engine.run(np.round(inputs / input_scale).astype(np.int8))
+            ort_session = ort.InferenceSession(quantized_path)
+            name = ort_session.get_inputs()[0].name
+            for row, output in zip(inputs, outputs):
+                np.testing.assert_array_equal(
+                    output, engine.run(np.round(row / input_scale).astype(np.int8))
+                )
+                onnx_output = ort_session.run(None, {name: row.reshape(1, 10)})[0]
+                self.assertTrue(
+                    np.allclose(
+                        onnx_output.reshape(-1),
+                        output.astype(np.float32) * output_scale,
+                        rtol=1e-2,
+                        atol=1e-2,
+                    )
+                )
+
+
 class TestExportParameters(unittest.TestCase):
     def setUp(self):
         self.template_path = os.path.join(
@@ -0,0 +1,97 @@
+from pkmn_rl_arena.data.trajectory import TrajectoryWriter
+from pkmn_rl_arena.generate import (
+    MANIFEST_FILE,
+    check_manifest,
+    count_episodes,
+    load_policy,
+)
+
+import json
+import os
+import tempfile
+import unittest
+
+
+def transition(step):
+    obs = {"player": [step] * 210, "enemy": [step + 1] * 210}
+    mask = {"player": [True] * 10, "enemy": [True] * 10}
+    actions = {"player": 0, "enemy": 0}
+    rewards = {"player": 0.0, "enemy": 0.0}
+    return obs, mask, actions, rewards, step % 5 == 4
+
+
+def config(**overrides):
+    values = {
+        "policy": "random",
+        "chunk_size": 64,
+        "episodes_per_worker": 10,
+        "seed": None,
+    }
+    values.update(overrides)
+    return values
+
+
+class TestLoadPolicy(unittest.TestCase):
+    def test_specs(self):
+        from pkmn_rl_arena.env.evaluation import random_policy
+
+        self.assertIs(load_policy("random"), random_policy)
+        self.assertIs(load_policy("os.path:join"), os.path.join)
+
+    def test_bad_specs(self):
+        with self.assertRaises(ValueError):
+            load_policy("os.path.join")
+        with self.assertRaises(ValueError):
+            load_policy("os.path:")
+        with self.assertRaises(TypeError):
+            load_policy("os.path:sep")
+        with self.assertRaises(ImportError):
+            load_policy("pkmn_rl_arena.no_such_module:policy")
+        with self.assertRaises(AttributeError):
+            load_policy("os.path:no_such_policy")
+
+
+class TestManifest(unittest.TestCase):
+    def test_new_dataset(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_dir = os.path.join(tmp_dir, "dataset")
+            manifest = check_manifest(output_dir, config())
+            self.assertIsInstance(manifest["seed"], int)
+            with open(os.path.join(output_dir, MANIFEST_FILE)) as f:
+                self.assertEqual(json.load(f), manifest)
+
+    def test_resume(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            seed = check_manifest(output_dir, config(seed=3))["seed"]
+            # The seed is taken from the manifest, the episode count may grow
+            manifest = check_manifest(output_dir, config(episodes_per_worker=20))
+            self.assertEqual(manifest["seed"], seed)
+            self.assertEqual(manifest["episodes_per_worker"], 20)
+
+    def test_mismatch(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            check_manifest(output_dir, config())
+            with self.assertRaises(ValueError):
+                check_manifest(output_dir, config(policy="my_module:policy"))
+            with self.assertRaises(ValueError):
+                check_manifest(output_dir, config(chunk_size=128))
+
+
+class TestCountEpisodes(unittest.TestCase):
+    def test_count(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            # Done at steps 4, 9 and 14 over chunks of 4 rows, 16 is unfinished
+            with TrajectoryWriter(output_dir, 0, chunk_size=4) as writer:
+                for step in range(17):
+                    writer.append(*transition(step))
+            with TrajectoryWriter(output_dir, 1, chunk_size=4) as writer:
+                for step in range(3):
+                    writer.append(*transition(step))
+
+            self.assertEqual(count_episodes(output_dir, 0), 3)
+            self.assertEqual(count_episodes(output_dir, 1), 0)
+            self.assertEqual(count_episodes(output_dir, 2), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+
+# Seconds allowed for a cold import in a fresh interpreter, override with
+# PKMN_RL_IMPORT_BUDGET on slow machines
+IMPORT_BUDGET = float(os.environ.get("PKMN_RL_IMPORT_BUDGET", "0.5"))
+
+# Dependencies that env workers must not pay for at import time
+HEAVY_MODULES = ["pandas", "rich", "jinja2", "onnx", "onnxruntime", "torch"]
+
+MEASURE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"elapsed": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure_import(module):
+    """Import `module` in a fresh interpreter, return (seconds, heavy modules loaded)"""
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE_SCRIPT.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=project_root,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return report["elapsed"], report["heavy"]
+
+
+class TestImportTime(unittest.TestCase):
+    def test_env_package_import_budget(self):
+        elapsed, heavy = measure_import("pkmn_rl_arena.env")
+        self.assertEqual(heavy, [])
+        self.assertLess(elapsed, IMPORT_BUDGET)
+
+    def test_pokemon_rl_core_import_budget(self):
+        elapsed, heavy = measure_import("pkmn_rl_arena.env.pokemon_rl_core")
+        self.assertEqual(heavy, [], f"heavy modules imported: {heavy}")
+        self.assertLess(elapsed, IMPORT_BUDGET)
+
+    def test_export_package_is_lazy(self):
+        _, heavy = measure_import("pkmn_rl_arena.export")
+        self.assertEqual(heavy, [], f"heavy modules imported: {heavy}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+from pkmn_rl_arena.agents.inference_server import InferenceServer
+
+import threading
+import unittest
+
+import numpy as np
+
+
+def last_legal_policy():
+    """Batch policy playing the highest legal action, checking obs on the way"""
+
+    def policy(obs, masks):
+        assert obs.shape[1:] == (3,)
+        assert (obs[:, 0] == masks.sum(axis=1)).all()
+        return masks.shape[1] - 1 - np.argmax(masks[:, ::-1], axis=1)
+
+    return policy
+
+
+def failing_factory():
+    raise ValueError("no model")
+
+
+class TestInferenceServer(unittest.TestCase):
+    def test_batched_requests(self):
+        num_slots = 8
+        with InferenceServer(
+            last_legal_policy, num_slots, max_latency=0.01, obs_shape=(3,)
+        ) as server:
+            results = {}
+
+            def worker(client):
+                for step in range(20):
+                    legal = (client.slot + step) % 10 + 1
+                    mask = [i < legal for i in range(10)]
+                    obs = np.full(3, legal, dtype=np.float32)
+                    results[(client.slot, step)] = (client.act(obs, mask), legal)
+
+            threads = [
+                threading.Thread(target=worker, args=(client,))
+                for client in server.clients()
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(results), num_slots * 20)
+        for action, legal in results.values():
+            self.assertEqual(action, legal - 1)
+
+    def test_factory_failure(self):
+        with InferenceServer(failing_factory, 2, obs_shape=(3,)) as server:
+            client = server.client(0)
+            with self.assertRaises(RuntimeError):
+                client.act(np.ones(3, dtype=np.float32), [True] * 10)
+            server.process.join(timeout=5)
+            self.assertFalse(client.server_alive())
+
+    def test_killed_server(self):
+        with InferenceServer(last_legal_policy, 2, obs_shape=(3,)) as server:
+            client = server.client(0)
+            server.process.kill()
+            server.process.join(timeout=5)
+            with self.assertRaises(RuntimeError):
+                client.act(np.ones(3, dtype=np.float32), [True] * 10, timeout=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
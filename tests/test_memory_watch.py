@@ -0,0 +1,98 @@
+from pkmn_rl_arena.env.memory_watch import MemoryWatch
+
+import unittest
+
+
+class FakeGba:
+    """Word addressed memory counting the reads"""
+
+    def __init__(self):
+        self.memory = {}
+        self.reads = 0
+
+    def read_u32_list(self, addr, count):
+        self.reads += 1
+        return [self.memory.get(addr + 4 * i, 0) for i in range(count)]
+
+    def read_u16_list(self, addr, count):
+        self.reads += 1
+        return [self.memory.get(addr + 2 * i, 0) & 0xFFFF for i in range(count)]
+
+    def write(self, addr, value):
+        self.memory[addr] = value
+
+
+class FakeTrackingGba(FakeGba):
+    """FakeGba with the write tracking of watch_range / take_dirty"""
+
+    def __init__(self):
+        super().__init__()
+        self.watched = []
+        self.dirty = []
+
+    def watch_range(self, addr, size):
+        self.watched.append((addr, size))
+        self.dirty.append(True)
+        return len(self.watched) - 1
+
+    def take_dirty(self, handle):
+        dirty, self.dirty[handle] = self.dirty[handle], False
+        return dirty
+
+    def write(self, addr, value):
+        super().write(addr, value)
+        for handle, (start, size) in enumerate(self.watched):
+            if start <= addr < start + size:
+                self.dirty[handle] = True
+
+
+class TestMemoryWatch(unittest.TestCase):
+    def check_dirty_clean_invalidate(self, gba):
+        watch = MemoryWatch(gba)
+        watch.watch("team", 0x100, 4)
+
+        data, changed = watch.read("team")
+        self.assertEqual((data, changed), ([0, 0, 0, 0], True))
+        data, changed = watch.read("team")
+        self.assertEqual((data, changed), ([0, 0, 0, 0], False))
+
+        gba.write(0x104, 7)
+        data, changed = watch.read("team")
+        self.assertEqual((data, changed), ([0, 7, 0, 0], True))
+        self.assertFalse(watch.read("team")[1])
+
+        # Outside the range
+        gba.write(0x200, 1)
+        self.assertFalse(watch.read("team")[1])
+
+        watch.invalidate()
+        data, changed = watch.read("team")
+        self.assertEqual((data, changed), ([0, 7, 0, 0], True))
+        return watch
+
+    def test_fallback(self):
+        gba = FakeGba()
+        watch = self.check_dirty_clean_invalidate(gba)
+        self.assertFalse(watch.native)
+        # The fallback reads on every call, it only saves the decoding
+        self.assertEqual(gba.reads, 6)
+
+    def test_native(self):
+        gba = FakeTrackingGba()
+        watch = self.check_dirty_clean_invalidate(gba)
+        self.assertTrue(watch.native)
+        # Only the dirty and invalidated reads touch emulator memory
+        self.assertEqual(gba.reads, 3)
+
+    def test_half_words(self):
+        gba = FakeGba()
+        watch = MemoryWatch(gba)
+        watch.watch("flags", 0x10, 2, word_size=2)
+        gba.write(0x12, 0x1FFFF)
+        self.assertEqual(watch.read("flags"), ([0, 0xFFFF], True))
+        with self.assertRaises(ValueError):
+            watch.watch("bytes", 0x10, 2, word_size=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
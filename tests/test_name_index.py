@@ -0,0 +1,49 @@
+from pkmn_rl_arena.data.name_index import NameIndex, get_name_index
+
+import os
+import tempfile
+import unittest
+
+
+def write_csv(path, header, rows):
+    with open(path, "w", newline="") as f:
+        f.write(",".join(header) + "\n")
+        for row in rows:
+            f.write(",".join(str(value) for value in row) + "\n")
+
+
+class TestNameIndex(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.pokemon_csv = os.path.join(tmp_dir.name, "pokemon.csv")
+        self.moves_csv = os.path.join(tmp_dir.name, "moves.csv")
+        write_csv(
+            self.pokemon_csv,
+            ["id", "speciesName", "baseHP"],
+            [[7, "Squirtle", 44], [25, "Pikachu", 35]],
+        )
+        write_csv(self.moves_csv, ["id", "moveName"], [[84, "Thunder Shock"]])
+
+    def test_lookups(self):
+        index = NameIndex(self.pokemon_csv, self.moves_csv)
+        self.assertEqual(index.species_name(25), "Pikachu")
+        # Ids read from emulator memory may come as numpy or string values
+        self.assertEqual(index.species_name("7"), "Squirtle")
+        self.assertEqual(index.species_name(999), "Unknown")
+        self.assertEqual(index.move_name(84), "Thunder Shock")
+        self.assertEqual(index.move_name(45), "Move 45")
+
+    def test_without_moves(self):
+        index = NameIndex(self.pokemon_csv, None)
+        self.assertEqual(index.moves, {})
+        self.assertEqual(index.move_name(84), "Move 84")
+
+    def test_cached_per_files(self):
+        index = get_name_index(self.pokemon_csv, self.moves_csv)
+        self.assertIs(get_name_index(self.pokemon_csv, self.moves_csv), index)
+        self.assertIsNot(get_name_index(self.pokemon_csv, None), index)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+from pkmn_rl_arena.env.profiler import CORE_LAYERS, StepProfiler
+
+import os
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+
+class FakeClock:
+    """perf_counter replacement advanced by hand"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def fake_core(clock):
+    """Object with every method profiled on a PokemonRLCore, each taking 1 s"""
+
+    def method(*args, **kwargs):
+        clock.advance(1.0)
+
+    core = types.SimpleNamespace()
+    for owner_name, method_name, _ in CORE_LAYERS:
+        if owner_name is None:
+            owner = core
+        else:
+            if not hasattr(core, owner_name):
+                setattr(core, owner_name, types.SimpleNamespace())
+            owner = getattr(core, owner_name)
+        setattr(owner, method_name, method)
+
+    def step(actions):
+        clock.advance(0.5)
+        core.battle_core.run_to_next_stop()
+        core.battle_core.read_watched("team")
+
+    core.step = step
+    return core
+
+
+class TestStepProfiler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("pkmn_rl_arena.env.profiler.time.perf_counter", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.profiler = StepProfiler(report_every=0)
+        self.core = fake_core(self.clock)
+        self.profiler.attach(self.core)
+
+    def test_nested_layers(self):
+        self.core.step({})
+        self.core.step({})
+        self.assertEqual(self.profiler.steps, 2)
+        self.assertEqual(self.profiler.self_times["step"], 1.0)
+        self.assertEqual(self.profiler.self_times["step;emulation"], 2.0)
+        self.assertEqual(self.profiler.self_times["step;memory"], 2.0)
+        self.assertEqual(self.profiler.calls["step;memory"], 2)
+        self.assertEqual(self.profiler.inclusive_times()["step"], 5.0)
+
+    def test_callback_excludes_reset(self):
+        self.core.step({})
+        self.clock.advance(2.0)  # policy
+        self.core.reset()
+        self.clock.advance(3.0)  # policy
+        self.core.step({})
+        self.assertEqual(self.profiler.self_times["reset"], 1.0)
+        self.assertEqual(self.profiler.self_times["callback"], 5.0)
+        self.assertEqual(self.profiler.calls["callback"], 1)
+
+        # The reset time is not subtracted again from the next callback
+        self.clock.advance(4.0)
+        self.core.step({})
+        self.assertEqual(self.profiler.self_times["callback"], 9.0)
+
+    def test_reset_samples(self):
+        self.core.step({})
+        self.profiler.reset()
+        self.clock.advance(2.0)
+        self.core.step({})
+        self.assertNotIn("callback", self.profiler.self_times)
+        self.assertEqual(self.profiler.steps, 1)
+
+
+class TestCollapsedDump(unittest.TestCase):
+    def test_one_file_per_process(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            collapsed_path = os.path.join(tmp_dir, "profile.folded")
+            paths = []
+            for pid, seconds in ((101, 1.0), (102, 2.0)):
+                profiler = StepProfiler(collapsed_path=collapsed_path)
+                profiler.self_times["step"] = seconds
+                with mock.patch(
+                    "pkmn_rl_arena.env.profiler.os.getpid", return_value=pid
+                ):
+                    paths.append(profiler.dump_collapsed())
+
+            self.assertEqual(
+                paths,
+                [
+                    os.path.join(tmp_dir, "profile.101.folded"),
+                    os.path.join(tmp_dir, "profile.102.folded"),
+                ],
+            )
+            for path, line in zip(paths, ["step 1000000\n", "step 2000000\n"]):
+                with open(path) as f:
+                    self.assertEqual(f.read(), line)
+
+            # An explicit path is used as is
+            explicit = os.path.join(tmp_dir, "explicit.folded")
+            self.assertEqual(profiler.dump_collapsed(explicit), explicit)
+
+    def test_from_env(self):
+        with mock.patch.dict(os.environ, {"PKMN_RL_PROFILE": "1"}):
+            profiler = StepProfiler.from_env()
+        profiler.self_times["step"] = 1.0
+        with mock.patch("pkmn_rl_arena.env.profiler.os.getpid", return_value=7):
+            with mock.patch("builtins.open", mock.mock_open()) as opened:
+                path = profiler.dump_collapsed()
+        self.assertEqual(path, "pkmn_rl_profile.7.folded")
+        opened.assert_called_once_with(path, "w")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+from pkmn_rl_arena.env.recorder import EpisodeRecorder
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+SCREEN_PIXELS = 240 * 160
+
+
+class FakeGba:
+    """Binding returning a frame of 0x00RRGGBB words, without fill_frame_buffer"""
+
+    def __init__(self):
+        self.frames = 0
+
+    def get_frame_buffer(self):
+        self.frames += 1
+        return [0x00102030] * SCREEN_PIXELS
+
+
+class TestEpisodeRecorder(unittest.TestCase):
+    def test_npz_chunks(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            recorder = EpisodeRecorder(output_dir, frame_skip=2, chunk_size=2)
+            gba = FakeGba()
+            for _ in range(6):
+                recorder.on_frame(gba)
+            recorder.new_episode()
+            recorder.on_frame(gba)
+            recorder.close(timeout=10)
+
+            self.assertEqual(gba.frames, 3)
+            self.assertEqual(
+                [os.path.basename(path) for path in recorder.files],
+                ["episode_00000_0000.npz", "episode_00000_0001.npz"],
+            )
+            with np.load(recorder.files[0]) as chunk:
+                frames = chunk["frames"]
+            self.assertEqual(frames.shape, (2, 160, 240, 3))
+            self.assertEqual(frames[0, 0, 0].tolist(), [0x10, 0x20, 0x30])
+
+    def test_write_failure(self):
+        output_dir = tempfile.mkdtemp()
+        recorder = EpisodeRecorder(output_dir, chunk_size=2, queue_size=4)
+        shutil.rmtree(output_dir)
+        gba = FakeGba()
+        # Failed chunk writes on chunk size, episode change and close
+        for _ in range(2):
+            for _ in range(3):
+                recorder.on_frame(gba)
+            recorder.new_episode()
+        recorder.close(timeout=10)
+        self.assertFalse(recorder._thread.is_alive())
+        self.assertEqual(recorder.files, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+from pkmn_rl_arena.env.render import AsyncBattleRenderer
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+
+class BlockingRenderer:
+    """Renderer holding its first frame until released"""
+
+    def __init__(self):
+        self.frames = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def render(self, observations):
+        self.started.set()
+        self.release.wait(timeout=10)
+        self.frames.append(observations)
+
+
+def observations(step):
+    # Plain dicts stand in for the observation DataFrames, both have copy()
+    return {"player": {"step": step}, "enemy": {"step": step}}
+
+
+class TestAsyncBattleRenderer(unittest.TestCase):
+    def test_drop_when_full(self):
+        renderer = BlockingRenderer()
+        async_renderer = AsyncBattleRenderer(renderer, rate=0, queue_size=2)
+        self.assertTrue(async_renderer.submit(observations(0)))
+        self.assertTrue(renderer.started.wait(timeout=10))
+
+        # The render thread is busy, two frames fit in the queue
+        self.assertTrue(async_renderer.submit(observations(1)))
+        self.assertTrue(async_renderer.submit(observations(2)))
+        self.assertFalse(async_renderer.submit(observations(3)))
+        self.assertEqual(async_renderer.dropped, 1)
+
+        renderer.release.set()
+        async_renderer.close(timeout=10)
+        steps = [frame["player"]["step"] for frame in renderer.frames]
+        self.assertEqual(steps, [0, 1, 2])
+
+    def test_close_with_full_queue(self):
+        renderer = BlockingRenderer()
+        async_renderer = AsyncBattleRenderer(renderer, rate=0, queue_size=2)
+        async_renderer.submit(observations(0))
+        self.assertTrue(renderer.started.wait(timeout=10))
+        async_renderer.submit(observations(1))
+        async_renderer.submit(observations(2))
+
+        # The renderer is stuck on frame 0, close gives up on the queued ones
+        start = time.monotonic()
+        async_renderer.close(timeout=0.3)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertGreaterEqual(async_renderer.dropped, 1)
+
+        renderer.release.set()
+        async_renderer._thread.join(timeout=10)
+        self.assertFalse(async_renderer._thread.is_alive())
+
+    def test_submitted_frames_are_copies(self):
+        renderer = BlockingRenderer()
+        renderer.release.set()
+        async_renderer = AsyncBattleRenderer(renderer, rate=0)
+        frame = observations(0)
+        async_renderer.submit(frame)
+        frame["player"]["step"] = 1
+        async_renderer.close(timeout=10)
+        self.assertEqual(renderer.frames[0]["player"]["step"], 0)
+
+    def test_rate_limit(self):
+        renderer = BlockingRenderer()
+        renderer.release.set()
+        async_renderer = AsyncBattleRenderer(renderer, rate=2.0)
+        clock = mock.Mock(side_effect=[100.0, 100.2, 100.4, 100.5, 100.7])
+        with mock.patch("pkmn_rl_arena.env.render.time.perf_counter", clock):
+            submitted = [async_renderer.submit(observations(i)) for i in range(5)]
+        async_renderer.close(timeout=10)
+        self.assertEqual(submitted, [True, False, False, True, False])
+        self.assertEqual(async_renderer.dropped, 3)
+        self.assertEqual(len(renderer.frames), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
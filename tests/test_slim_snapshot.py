@@ -0,0 +1,61 @@
+from pkmn_rl_arena.env import save_state
+from pkmn_rl_arena.env.battle_state import BattleState
+from pkmn_rl_arena.env.save_state import SlimSnapshot, Snapshot, register_reference
+
+import pickle
+import random
+import unittest
+
+
+def state_bytes(seed: int, size: int = 4096) -> bytes:
+    """Fake savestate: mostly constant with a few bytes depending on seed"""
+    data = bytearray(b"\x42" * size)
+    rng = random.Random(seed)
+    for _ in range(16):
+        data[rng.randrange(size)] = rng.randrange(256)
+    return bytes(data)
+
+
+class TestSlimSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.reference = Snapshot(state_bytes(0), BattleState())
+        self.snapshot = Snapshot(state_bytes(1), BattleState(current_step=3))
+
+    def test_round_trip(self):
+        slim = SlimSnapshot.encode(self.snapshot, self.reference)
+        self.assertLess(slim.nbytes, self.snapshot.nbytes)
+        decoded = slim.decode()
+        self.assertEqual(decoded.data, self.snapshot.data)
+        self.assertEqual(decoded.battle_state.current_step, 3)
+
+    def test_sizes_differing_from_reference(self):
+        for size in (1000, 8000):
+            snapshot = Snapshot(state_bytes(2, size), BattleState())
+            slim = SlimSnapshot.encode(snapshot, self.reference)
+            self.assertEqual(slim.decode().data, snapshot.data)
+
+    def test_pickle_without_reference(self):
+        slim = SlimSnapshot.encode(self.snapshot, self.reference)
+        pickled = pickle.dumps(slim)
+        self.assertLess(len(pickled), len(pickle.dumps(self.snapshot)))
+        self.assertEqual(pickle.loads(pickled).decode().data, self.snapshot.data)
+
+    def test_missing_reference(self):
+        slim = SlimSnapshot.encode(self.snapshot, self.reference)
+        pickled = pickle.dumps(slim)
+        # As in a process that never saw the reference
+        save_state._references.clear()
+        unpickled = pickle.loads(pickled)
+        self.assertIsNone(unpickled.reference)
+        with self.assertRaises(ValueError):
+            unpickled.decode()
+
+        # Registering the reference there makes later loads decodable
+        reference = Snapshot(self.reference.data, BattleState())
+        register_reference(reference)
+        decoded = pickle.loads(pickled).decode()
+        self.assertEqual(decoded.data, self.snapshot.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
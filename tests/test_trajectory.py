@@ -0,0 +1,84 @@
+from pkmn_rl_arena.data.trajectory import (
+    TrajectoryReader,
+    TrajectoryWriter,
+    drop_partial_episode,
+    read_index,
+    shard_dir,
+)
+
+import tempfile
+import unittest
+
+
+def transition(step):
+    obs = {"player": [step] * 210, "enemy": [step + 1] * 210}
+    mask = {"player": [True] * 4 + [False] * 6, "enemy": [False] * 9 + [True]}
+    actions = {"player": step % 4}
+    rewards = {"player": 1.0, "enemy": -1.0}
+    return obs, mask, actions, rewards, step % 5 == 4
+
+
+class TestTrajectory(unittest.TestCase):
+    def test_write_read(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            for shard in range(2):
+                with TrajectoryWriter(output_dir, shard, chunk_size=4) as writer:
+                    for step in range(10):
+                        writer.append(*transition(step))
+
+            self.assertEqual(
+                [c["rows"] for c in read_index(shard_dir(output_dir, 0))["chunks"]],
+                [4, 4, 2],
+            )
+            reader = TrajectoryReader(output_dir)
+            self.assertEqual(len(reader), 20)
+            obs = reader.column("obs")
+            self.assertEqual(obs.shape, (20, 2, 210))
+            self.assertEqual(int(obs[9, 1, 0]), 10)
+            actions = reader.column("action")
+            self.assertEqual(actions[:4, 0].tolist(), [0, 1, 2, 3])
+            self.assertEqual(actions[:4, 1].tolist(), [-1] * 4)
+            self.assertEqual(reader.column("done")[:10].sum(), 2)
+
+    def test_resume(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            with TrajectoryWriter(output_dir, chunk_size=4) as writer:
+                for step in range(6):
+                    writer.append(*transition(step))
+            with TrajectoryWriter(output_dir, chunk_size=4) as writer:
+                self.assertEqual(writer.rows, 6)
+                for step in range(6, 8):
+                    writer.append(*transition(step))
+            obs = TrajectoryReader(output_dir).column("obs")
+            self.assertEqual(obs[:, 0, 0].tolist(), list(range(8)))
+
+    def test_resume_drops_partial_episode(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            # Episodes end at steps 4 and 9, steps 10-12 are an interrupted one
+            with TrajectoryWriter(output_dir, chunk_size=4) as writer:
+                for step in range(13):
+                    writer.append(*transition(step))
+            self.assertEqual(drop_partial_episode(output_dir, 0), 3)
+            self.assertEqual(drop_partial_episode(output_dir, 0), 0)
+
+            with TrajectoryWriter(output_dir, chunk_size=4) as writer:
+                self.assertEqual(writer.rows, 10)
+                for step in range(10, 15):
+                    writer.append(*transition(step))
+            reader = TrajectoryReader(output_dir)
+            obs = reader.column("obs")
+            self.assertEqual(obs[:, 0, 0].tolist(), list(range(15)))
+            done = reader.column("done")
+            self.assertEqual(done.nonzero()[0].tolist(), [4, 9, 14])
+
+    def test_drop_episode_without_done(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            with TrajectoryWriter(output_dir, chunk_size=4) as writer:
+                for step in range(4):
+                    writer.append(*transition(step))
+            self.assertEqual(drop_partial_episode(output_dir, 0), 4)
+            self.assertEqual(len(TrajectoryReader(output_dir)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
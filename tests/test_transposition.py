@@ -0,0 +1,63 @@
+from pkmn_rl_arena.env.transposition import (
+    Transition,
+    TranspositionTable,
+    actions_key,
+    battle_hash,
+)
+
+import unittest
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_lru_eviction(self):
+        table = TranspositionTable(capacity=2)
+        table.put("a", 1)
+        table.put("b", 2)
+        self.assertEqual(table.get("a"), 1)  # "b" is now the oldest
+        table.put("c", 3)
+        self.assertEqual(len(table), 2)
+        self.assertNotIn("b", table)
+        self.assertIn("a", table)
+
+        # Refreshing an entry also marks it as recently used
+        table.put("a", 4)
+        table.put("d", 5)
+        self.assertEqual(list(table.entries), ["a", "d"])
+        self.assertEqual(table.get("a"), 4)
+
+    def test_hits_and_misses(self):
+        table = TranspositionTable(capacity=4)
+        table.put(b"state", Transition(None, {"player": 1.0}, False))
+        self.assertIsNotNone(table.get(b"state"))
+        self.assertIsNone(table.get(b"other"))
+        self.assertIsNone(table.get(b"other"))
+        self.assertEqual((table.hits, table.misses), (1, 2))
+        # Membership tests do not count
+        self.assertIn(b"state", table)
+        self.assertEqual((table.hits, table.misses), (1, 2))
+
+        table.clear()
+        self.assertEqual((len(table), table.hits, table.misses), (0, 0, 0))
+
+    def test_actions_key(self):
+        self.assertEqual(
+            actions_key({"player": 1, "enemy": 2}),
+            actions_key({"enemy": 2, "player": 1}),
+        )
+        self.assertNotEqual(
+            actions_key({"player": 1, "enemy": 2}),
+            actions_key({"player": 2, "enemy": 1}),
+        )
+        self.assertEqual(actions_key({}), ())
+
+    def test_battle_hash(self):
+        player, enemy = [1] * 210, [2] * 210
+        base = battle_hash(player, enemy, 7, "general")
+        self.assertEqual(base, battle_hash(list(player), list(enemy), 7, "general"))
+        self.assertNotEqual(base, battle_hash(player, enemy, 8, "general"))
+        self.assertNotEqual(base, battle_hash(player, enemy, 7, "player"))
+        self.assertNotEqual(base, battle_hash(enemy, player, 7, "general"))
+
+
+if __name__ == "__main__":
+    unittest.main()